@@ -0,0 +1,12 @@
+from rest_framework.pagination import CursorPagination
+
+
+class PubDateCursorPagination(CursorPagination):
+    """Keyset pages over (pub_date, id), the order of every feed."""
+    ordering = ('-pub_date', '-id')
+    page_size_query_param = 'limit'
+    max_page_size = 100
+
+
+class IdCursorPagination(PubDateCursorPagination):
+    ordering = ('-id',)
@@ -0,0 +1,76 @@
+from rest_framework import serializers
+
+from posts.forms import MAX_ID
+from posts.models import Comment, Follow, Group, Post
+
+
+class SparseFieldsMixin:
+    """Drops the fields a client did not ask for with ?fields=a,b."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        wanted = requested_fields(request)
+        if wanted:
+            for name in set(self.fields) - wanted:
+                self.fields.pop(name)
+
+
+def requested_fields(request):
+    """Field names of ?fields=, or None when the parameter is absent."""
+    if request is None or not request.query_params.get('fields'):
+        return None
+    return {name.strip() for name in
+            request.query_params['fields'].split(',')} | {'id'}
+
+
+class PostSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    author = serializers.SlugRelatedField(slug_field='username',
+                                          read_only=True)
+    group = serializers.SlugRelatedField(slug_field='slug', read_only=True)
+
+    class Meta:
+        model = Post
+        fields = ('id', 'text', 'pub_date', 'author', 'group', 'image',
+                  'comments_count')
+
+
+class GroupSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Group
+        fields = ('id', 'title', 'slug', 'description', 'posts_count')
+
+
+class CommentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    author = serializers.SlugRelatedField(slug_field='username',
+                                          read_only=True)
+
+    class Meta:
+        model = Comment
+        fields = ('id', 'post', 'parent', 'author', 'text', 'pub_date')
+
+
+class FollowSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    user = serializers.SlugRelatedField(slug_field='username',
+                                        read_only=True)
+    author = serializers.SlugRelatedField(slug_field='username',
+                                          read_only=True)
+
+    class Meta:
+        model = Follow
+        fields = ('id', 'user', 'author')
+
+
+class PostWriteSerializer(serializers.Serializer):
+    """One item of a bulk write; the group is looked up for the batch."""
+    id = serializers.IntegerField(required=False)
+    text = serializers.CharField()
+    group = serializers.SlugField(required=False, allow_null=True)
+
+
+class CommentWriteSerializer(serializers.Serializer):
+    id = serializers.IntegerField(required=False)
+    post = serializers.IntegerField(min_value=1, max_value=MAX_ID)
+    parent = serializers.IntegerField(required=False, allow_null=True,
+                                      min_value=1, max_value=MAX_ID)
+    text = serializers.CharField()
@@ -0,0 +1,126 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from posts import conditional
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ReadOnlyApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        cls.posts = [
+            Post.objects.create(author=cls.author, group=cls.group,
+                                text=f'Пост {number}')
+            for number in range(25)
+        ]
+        cls.comment = Comment.objects.create(
+            post=cls.posts[-1], author=cls.reader, text='Комментарий')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.token = Token.objects.create(user=cls.reader)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_posts_are_paginated_by_cursor(self):
+        """Посты отдаются страницами по курсору, новые первыми."""
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('api:posts-list'))
+        data = response.json()
+        self.assertEqual(len(data['results']), 20)
+        self.assertEqual(data['results'][0], {
+            'id': self.posts[-1].id,
+            'text': 'Пост 24',
+            'pub_date': data['results'][0]['pub_date'],
+            'author': 'author',
+            'group': 'group',
+            'image': None,
+            'comments_count': 1,
+        })
+        self.assertIsNone(data['previous'])
+        rest = self.client.get(data['next']).json()['results']
+        self.assertEqual([post['id'] for post in rest],
+                         [post.id for post in self.posts[4::-1]])
+
+    def test_sparse_fieldsets(self):
+        """?fields= оставляет только запрошенные поля."""
+        response = self.client.get(reverse('api:posts-list'),
+                                   {'fields': 'text', 'limit': 1})
+        self.assertEqual(response.json()['results'],
+                         [{'id': self.posts[-1].id, 'text': 'Пост 24'}])
+
+    def test_posts_filter(self):
+        """Посты фильтруются по группе и автору."""
+        response = self.client.get(reverse('api:posts-list'),
+                                   {'group': 'other', 'author': 'author'})
+        self.assertEqual(response.json()['results'], [])
+
+    def test_comments_and_groups(self):
+        """Комментарии поста и группы доступны без авторизации."""
+        response = self.client.get(reverse(
+            'api:comments-list', args=[self.posts[-1].id]))
+        self.assertEqual(response.json()['results'][0]['author'], 'reader')
+        response = self.client.get(reverse(
+            'api:groups-detail', args=[self.group.id]))
+        self.assertEqual(response.json()['posts_count'], 25)
+        response = self.client.get(reverse('api:comments-list', args=[0]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_follow_requires_token(self):
+        """Подписки видны только их владельцу по токену."""
+        url = reverse('api:follow-list')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+        response = self.client.get(url)
+        self.assertEqual(response.json()['results'], [{
+            'id': Follow.objects.get().id,
+            'user': 'reader',
+            'author': 'author',
+        }])
+
+    def test_conditional_get(self):
+        """Неизменённый ответ перезапрашивается с кодом 304."""
+        url = reverse('api:comments-list', args=[self.posts[-1].id])
+        response = self.client.get(url)
+        self.assertTrue(response.has_header('Last-Modified'))
+        cached = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        cached = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(cached.status_code, 304)
+        Comment.objects.create(post=self.posts[-1], author=self.author,
+                               text='Ответ')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+
+    def test_edited_comments_are_modified(self):
+        """Правка и удаление комментария меняют Last-Modified."""
+        post = self.posts[0]
+        comment = Comment.objects.create(post=post, author=self.author,
+                                         text='Комментарий')
+        url = reverse('api:comments-list', args=[post.id])
+        self.client.force_authenticate(self.author)
+        for change in (
+                lambda: self.client.patch(reverse('api:bulk_comments'), [
+                    {'id': comment.id, 'text': 'Исправленный'},
+                ], format='json'),
+                comment.delete):
+            # The header has whole seconds, so the last change is older.
+            cache.set(conditional.KEY.format(f'post:{post.id}'),
+                      time.time() - 60, None)
+            since = self.client.get(url)['Last-Modified']
+            change()
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=since)
+            self.assertEqual(response.status_code, 200)
@@ -0,0 +1,141 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from posts import search, timeline
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class BulkWriteTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def hits(self, query):
+        return [hit.obj for hit in search.backend().search(query)[:10]]
+
+    def test_create_posts(self):
+        """Посты создаются пачкой, с результатом на каждый элемент."""
+        response = self.client.post(reverse('api:bulk_posts'), [
+            {'text': 'Первый', 'group': 'group'},
+            {'text': ''},
+            {'text': 'Второй', 'group': 'missing'},
+            {'text': 'Третий'},
+        ], format='json')
+        results = response.json()['results']
+        self.assertEqual([result['status'] for result in results],
+                         [201, 400, 400, 201])
+        self.assertIn('text', results[1]['errors'])
+        self.assertIn('group', results[2]['errors'])
+        first, third = (Post.objects.get(pk=results[index]['id'])
+                        for index in (0, 3))
+        self.assertEqual((first.text, first.group), ('Первый', self.group))
+        self.assertEqual((third.text, third.group), ('Третий', None))
+
+    def test_create_posts_keeps_derived_data(self):
+        """Счётчики, ленты и поиск обновляются без сигналов."""
+        self.client.post(reverse('api:bulk_posts'), [
+            {'text': f'Импорт {number}', 'group': 'group'}
+            for number in range(3)
+        ], format='json')
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 3)
+        self.author.stats.refresh_from_db()
+        self.assertEqual(self.author.stats.posts_count, 3)
+        self.assertEqual(list(timeline.feed(self.reader)),
+                         list(Post.objects.all()))
+        self.assertEqual(len(self.hits('импорт')), 3)
+
+    def test_update_posts(self):
+        """Обновлять можно только свои посты."""
+        own = Post.objects.create(author=self.author, text='Старый')
+        other = Post.objects.create(author=self.reader, text='Чужой')
+        response = self.client.patch(reverse('api:bulk_posts'), [
+            {'id': own.id, 'text': 'Новый', 'group': 'group'},
+            {'id': other.id, 'text': 'Взлом'},
+            {'text': 'Без id'},
+        ], format='json')
+        self.assertEqual(
+            [result['status'] for result in response.json()['results']],
+            [200, 404, 400])
+        own.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((own.text, own.group), ('Новый', self.group))
+        self.assertEqual(other.text, 'Чужой')
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(self.hits('новый'), [own])
+
+    def test_create_and_update_comments(self):
+        """Комментарии создаются и обновляются пачкой."""
+        post = Post.objects.create(author=self.reader, text='Пост')
+        response = self.client.post(reverse('api:bulk_comments'), [
+            {'post': post.id, 'text': 'Первый'},
+            {'post': 0, 'text': 'Потерянный'},
+            {'post': post.id, 'text': 'Второй'},
+        ], format='json')
+        results = response.json()['results']
+        self.assertEqual([result['status'] for result in results],
+                         [201, 400, 201])
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 2)
+        response = self.client.patch(reverse('api:bulk_comments'), [
+            {'id': results[0]['id'], 'text': 'Исправленный'},
+        ], format='json')
+        self.assertEqual(response.json()['results'][0]['status'], 200)
+        self.assertEqual(Comment.objects.get(pk=results[0]['id']).text,
+                         'Исправленный')
+        self.assertEqual([hit.pk for hit in self.hits('исправленный')],
+                         [results[0]['id']])
+
+    def test_replies_must_answer_same_post(self):
+        """Ответ возможен только на комментарий того же поста."""
+        post = Post.objects.create(author=self.reader, text='Пост')
+        other = Post.objects.create(author=self.reader, text='Другой')
+        root = Comment.objects.create(post=post, author=self.reader,
+                                      text='Корень')
+        response = self.client.post(reverse('api:bulk_comments'), [
+            {'post': post.id, 'parent': root.id, 'text': 'Ответ'},
+            {'post': other.id, 'parent': root.id, 'text': 'Чужой'},
+            {'post': post.id, 'parent': 10 ** 30, 'text': 'Далёкий'},
+        ], format='json')
+        results = response.json()['results']
+        self.assertEqual([result['status'] for result in results],
+                         [201, 400, 400])
+        self.assertIn('parent', results[1]['errors'])
+        self.assertIn('parent', results[2]['errors'])
+        reply = Comment.objects.get(pk=results[0]['id'])
+        self.assertEqual((reply.parent_id, reply.depth), (root.id, 1))
+
+    def test_batch_query_count_is_constant(self):
+        """Число запросов не зависит от размера пачки."""
+        items = [{'text': f'Пост {number}', 'group': 'group'}
+                 for number in range(200)]
+        with self.assertNumQueries(12):
+            self.client.post(reverse('api:bulk_posts'), items,
+                             format='json')
+
+    @override_settings(API_BULK_MAX_ITEMS=2)
+    def test_rejects_bad_payloads(self):
+        """Слишком большие пачки и не-списки отклоняются целиком."""
+        url = reverse('api:bulk_posts')
+        self.assertEqual(self.client.post(url, [{'text': 'а'}] * 3,
+                                          format='json').status_code, 400)
+        self.assertEqual(self.client.post(url, {'text': 'а'},
+                                          format='json').status_code, 400)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.post(url, [], format='json').status_code,
+                         401)
+        self.assertFalse(Post.objects.exists())
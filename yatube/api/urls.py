@@ -0,0 +1,20 @@
+from django.urls import include, path
+from rest_framework.routers import DefaultRouter
+
+from . import views
+
+app_name = 'api'
+
+router = DefaultRouter()
+router.register('posts', views.PostViewSet, basename='posts')
+router.register(r'posts/(?P<post_id>\d+)/comments', views.CommentViewSet,
+                basename='comments')
+router.register('groups', views.GroupViewSet, basename='groups')
+router.register('follow', views.FollowViewSet, basename='follow')
+
+urlpatterns = [
+    path('v1/bulk/posts/', views.BulkPostsView.as_view(), name='bulk_posts'),
+    path('v1/bulk/comments/', views.BulkCommentsView.as_view(),
+         name='bulk_comments'),
+    path('v1/', include(router.urls)),
+]
@@ -0,0 +1,256 @@
+from django.conf import settings
+from django.middleware.http import ConditionalGetMiddleware
+from django.shortcuts import get_object_or_404
+from django.utils.decorators import decorator_from_middleware, method_decorator
+from django.utils.http import http_date
+from rest_framework import permissions, status, viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.routers import use_replica
+from posts import bulk, conditional
+from posts.models import Comment, Group, Post
+
+from .pagination import IdCursorPagination
+from .serializers import (CommentSerializer, CommentWriteSerializer,
+                          FollowSerializer, GroupSerializer, PostSerializer,
+                          PostWriteSerializer, requested_fields)
+
+conditional_get = decorator_from_middleware(ConditionalGetMiddleware)
+
+
+@method_decorator(conditional_get, name='dispatch')
+@method_decorator(use_replica, name='list')
+@method_decorator(use_replica, name='retrieve')
+class ReadOnlyViewSet(viewsets.ReadOnlyModelViewSet):
+    """Read-only endpoint that loads only what the client asked for.
+
+    Responses carry an ETag of their body, so a client revalidating an
+    unchanged page gets 304 Not Modified without the JSON.
+    """
+    permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
+    # Relations rendered by the serializer, joined in the same query.
+    related = ()
+
+    def get_queryset(self):
+        return self.narrow(super().get_queryset())
+
+    def narrow(self, queryset):
+        wanted = requested_fields(self.request)
+        if wanted is None:
+            return queryset.select_related(*self.related)
+        ordering = [name.lstrip('-')
+                    for name in self.pagination_class.ordering]
+        return queryset.select_related(
+            *(name for name in self.related if name in wanted)
+        ).only(*(wanted & set(self.serializer_class.Meta.fields)), *ordering)
+
+    def last_modified(self):
+        """Time the served objects last changed, if it is known."""
+        return None
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs)
+        # A replica may lag behind the change times kept in the cache.
+        if (response.status_code == status.HTTP_200_OK
+                and not getattr(request, 'read_from_replica', False)):
+            changed = self.last_modified()
+            if changed is not None:
+                response['Last-Modified'] = http_date(changed)
+        return response
+
+
+class PostViewSet(ReadOnlyViewSet):
+    queryset = Post.objects.all()
+    serializer_class = PostSerializer
+    related = ('author', 'group')
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        group = self.request.query_params.get('group')
+        if group:
+            queryset = queryset.filter(group__slug=group)
+        author = self.request.query_params.get('author')
+        if author:
+            queryset = queryset.filter(author__username=author)
+        return queryset
+
+
+class GroupViewSet(ReadOnlyViewSet):
+    queryset = Group.objects.all()
+    serializer_class = GroupSerializer
+    pagination_class = IdCursorPagination
+
+
+class CommentViewSet(ReadOnlyViewSet):
+    queryset = Comment.objects.all()
+    serializer_class = CommentSerializer
+    related = ('author',)
+
+    def get_queryset(self):
+        post = get_object_or_404(Post.objects.only('id'),
+                                 pk=self.kwargs['post_id'])
+        return super().get_queryset().filter(post=post)
+
+    def last_modified(self):
+        # Edits and deletions, also the batch ones, touch the post scope,
+        # while the newest pub_date only moves for a new comment.
+        return conditional.changed_at([f'post:{self.kwargs["post_id"]}'])
+
+
+class FollowViewSet(ReadOnlyViewSet):
+    serializer_class = FollowSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = IdCursorPagination
+    related = ('user', 'author')
+
+    def get_queryset(self):
+        return self.narrow(self.request.user.follower.all())
+
+
+def failed(code, errors):
+    return {'status': code, 'errors': errors}
+
+
+class BulkWriteView(APIView):
+    """Creates (POST) or updates (PATCH) a batch of the user's objects.
+
+    Items are validated one by one, references are looked up for the whole
+    batch and the valid items are written together. The response has a
+    result per item in request order; invalid items do not stop the rest.
+    """
+    permission_classes = (permissions.IsAuthenticated,)
+    serializer_class = None
+
+    def post(self, request):
+        return self.write(request, self.create, status.HTTP_201_CREATED)
+
+    def patch(self, request):
+        return self.write(request, self.update, status.HTTP_200_OK)
+
+    def write(self, request, save, code):
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError('Ожидается список объектов.')
+        limit = settings.API_BULK_MAX_ITEMS
+        if len(items) > limit:
+            raise ValidationError(f'Не больше {limit} объектов за запрос.')
+        partial = save == self.update
+        results, valid = [None] * len(items), {}
+        for index, item in enumerate(items):
+            serializer = self.serializer_class(data=item, partial=partial)
+            if not serializer.is_valid():
+                results[index] = failed(status.HTTP_400_BAD_REQUEST,
+                                        serializer.errors)
+            elif partial and 'id' not in serializer.validated_data:
+                results[index] = failed(status.HTTP_400_BAD_REQUEST,
+                                        {'id': ['Обязательное поле.']})
+            else:
+                valid[index] = serializer.validated_data
+        for index, obj in save(valid, results).items():
+            results[index] = {'id': obj.pk, 'status': code}
+        return Response({'results': results})
+
+    def own(self, queryset, valid, results, message):
+        """The user's objects named by the items, failing the missing."""
+        found = queryset.in_bulk([data['id'] for data in valid.values()])
+        for index, data in valid.items():
+            if data['id'] not in found:
+                results[index] = failed(status.HTTP_404_NOT_FOUND,
+                                        {'id': [message]})
+        return found
+
+    def create(self, valid, results):
+        raise NotImplementedError
+
+    def update(self, valid, results):
+        raise NotImplementedError
+
+
+class BulkPostsView(BulkWriteView):
+    serializer_class = PostWriteSerializer
+
+    def groups(self, valid, results):
+        slugs = {data['group'] for data in valid.values()
+                 if data.get('group')}
+        groups = Group.objects.in_bulk(slugs, field_name='slug')
+        for index, data in list(valid.items()):
+            if data.get('group') and data['group'] not in groups:
+                results[index] = failed(status.HTTP_400_BAD_REQUEST,
+                                        {'group': ['Группа не найдена.']})
+                del valid[index]
+        return groups
+
+    def create(self, valid, results):
+        groups = self.groups(valid, results)
+        posts = {
+            index: Post(author=self.request.user, text=data['text'],
+                        group=groups.get(data.get('group')))
+            for index, data in valid.items()
+        }
+        bulk.create_posts(list(posts.values()))
+        return posts
+
+    def update(self, valid, results):
+        groups = self.groups(valid, results)
+        found = self.own(self.request.user.posts.all(), valid, results,
+                         'Пост не найден.')
+        posts, fields = {}, set()
+        for index, data in valid.items():
+            post = found.get(data['id'])
+            if post is None:
+                continue
+            if 'text' in data:
+                post.text = data['text']
+                fields.add('text')
+            if 'group' in data:
+                post.group = groups.get(data['group'])
+                fields.add('group')
+            posts[index] = post
+        if fields:
+            bulk.update_posts(list(set(posts.values())), fields)
+        return posts
+
+
+class BulkCommentsView(BulkWriteView):
+    serializer_class = CommentWriteSerializer
+
+    def create(self, valid, results):
+        post_ids = set(Post.objects.filter(
+            pk__in=[data['post'] for data in valid.values()]
+        ).values_list('pk', flat=True))
+        # Replies must answer a comment of the same post.
+        parents = dict(Comment.objects.filter(
+            pk__in=[data.get('parent') for data in valid.values()]
+        ).values_list('pk', 'post_id'))
+        comments = {}
+        for index, data in valid.items():
+            parent = data.get('parent')
+            if data['post'] not in post_ids:
+                results[index] = failed(status.HTTP_400_BAD_REQUEST,
+                                        {'post': ['Пост не найден.']})
+            elif parent is not None and parents.get(parent) != data['post']:
+                results[index] = failed(
+                    status.HTTP_400_BAD_REQUEST,
+                    {'parent': ['Комментарий не найден.']})
+            else:
+                comments[index] = Comment(author=self.request.user,
+                                          post_id=data['post'],
+                                          parent_id=parent,
+                                          text=data['text'])
+        bulk.create_comments(list(comments.values()))
+        return comments
+
+    def update(self, valid, results):
+        found = self.own(self.request.user.comments.all(), valid, results,
+                         'Комментарий не найден.')
+        comments = {}
+        for index, data in valid.items():
+            comment = found.get(data['id'])
+            if comment is not None:
+                comment.text = data.get('text', comment.text)
+                comments[index] = comment
+        bulk.update_comments(list(set(comments.values())))
+        return comments
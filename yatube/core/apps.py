@@ -1,5 +1,16 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from django.conf import settings
+
+        from . import metrics
+        from .sqlite import tune_connection
+        connection_created.connect(tune_connection,
+                                   dispatch_uid='core_tune_sqlite')
+        if 'core.metrics.MetricsMiddleware' in settings.MIDDLEWARE:
+            metrics.install()
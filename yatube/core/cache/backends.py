@@ -0,0 +1,304 @@
+"""Cache backends shared between worker processes.
+
+RedisCache talks to any server speaking the Redis protocol. TieredCache puts
+a small per-process LRU in front of a shared backend, so hot keys such as
+the content version are served without a network round trip.
+"""
+import logging
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import InvalidCacheBackendError
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.utils.module_loading import import_string
+
+from .resp import ConnectionFailed, ConnectionPool, RedisError
+
+logger = logging.getLogger(__name__)
+
+
+def relative_timeout(cache, timeout):
+    """Seconds to keep a value for, None meaning forever.
+
+    BaseCache.get_backend_timeout() returns an absolute deadline instead.
+    """
+    if timeout == DEFAULT_TIMEOUT:
+        return cache.default_timeout
+    return timeout
+
+
+class RedisCache(BaseCache):
+    """Cache stored on a Redis protocol server given by a redis:// URL.
+
+    Integers are stored as plain numbers, so incr() is atomic on the
+    server; everything else is pickled. While the server cannot be
+    reached, reads miss and writes do nothing, as with Django's memcached
+    backends, so a cache outage does not take the pages down.
+    """
+
+    def __init__(self, server, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.pool = ConnectionPool(
+            server,
+            size=options.get('POOL_SIZE', 10),
+            timeout=options.get('SOCKET_TIMEOUT', 1),
+        )
+
+    @staticmethod
+    def _dump(value):
+        if isinstance(value, int) and not isinstance(value, bool):
+            return str(value).encode()
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _load(raw):
+        if raw is None:
+            return None
+        try:
+            return int(raw)
+        except ValueError:
+            return pickle.loads(raw)
+
+    def _set_command(self, key, value, timeout, only_new=False):
+        command = ['SET', key, self._dump(value)]
+        timeout = relative_timeout(self, timeout)
+        if timeout is not None:
+            command += ['PX', max(int(timeout * 1000), 1)]
+        if only_new:
+            command.append('NX')
+        return command
+
+    def _execute(self, *commands):
+        """Replies of the commands, all None when the server is down."""
+        try:
+            with self.pool.connection() as conn:
+                return conn.pipeline(commands)
+        except ConnectionFailed:
+            logger.warning('Cache server unavailable', exc_info=True)
+            return [None] * len(commands)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        reply, = self._execute(
+            self._set_command(key, value, timeout, only_new=True))
+        return reply is not None
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        reply, = self._execute(['GET', key])
+        return default if reply is None else self._load(reply)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self._execute(self._set_command(key, value, timeout))
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        timeout = relative_timeout(self, timeout)
+        if timeout is None:
+            command = ['PERSIST', key]
+            exists, _ = self._execute(['EXISTS', key], command)
+            return bool(exists)
+        reply, = self._execute(
+            ['PEXPIRE', key, max(int(timeout * 1000), 1)])
+        return bool(reply)
+
+    def delete(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self._execute(['DEL', key])
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        reply, = self._execute(['EXISTS', key])
+        return bool(reply)
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        exists, = self._execute(['EXISTS', key])
+        if not exists:
+            raise ValueError("Key '%s' not found" % key)
+        try:
+            reply, = self._execute(['INCRBY', key, delta])
+        except RedisError as exc:
+            raise ValueError(str(exc)) from exc
+        return reply
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        made = [self.make_key(key, version=version) for key in keys]
+        for key in made:
+            self.validate_key(key)
+        reply, = self._execute(['MGET', *made])
+        return {key: self._load(raw)
+                for key, raw in zip(keys, reply or ()) if raw is not None}
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        commands = []
+        for key, value in data.items():
+            key = self.make_key(key, version=version)
+            self.validate_key(key)
+            commands.append(self._set_command(key, value, timeout))
+        if commands:
+            self._execute(*commands)
+        return []
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_key(key, version=version) for key in keys]
+        if keys:
+            self._execute(['DEL', *keys])
+
+    def clear(self):
+        self._execute(['FLUSHDB'])
+
+    def close(self, **kwargs):
+        # Connections stay pooled between requests, which is the point.
+        pass
+
+
+class LocalLRU:
+    """Thread-safe in-process LRU with a per-entry deadline."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.entries.get(key)
+            if item is None:
+                return None
+            if item[0] < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return item
+
+    def set(self, key, value, ttl):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class TieredCache(BaseCache):
+    """Small local LRU in front of a shared cache.
+
+    Local copies live for at most LOCAL_TIMEOUT seconds, which bounds how
+    long a worker may serve a value another worker has already replaced.
+    """
+
+    def __init__(self, server, params):
+        super().__init__(params)
+        options = dict(params.get('OPTIONS', {}))
+        backend = options.pop('SHARED_BACKEND',
+                              'core.cache.backends.RedisCache')
+        self.local_timeout = options.pop('LOCAL_TIMEOUT', 1)
+        self.local = LocalLRU(options.pop('LOCAL_MAX_ENTRIES', 1000))
+        try:
+            backend_cls = import_string(backend)
+        except ImportError as exc:
+            raise InvalidCacheBackendError(
+                f"Could not find backend '{backend}': {exc}") from exc
+        self.shared = backend_cls(server, {**params, 'OPTIONS': options})
+
+    def _local_ttl(self, timeout):
+        timeout = relative_timeout(self, timeout)
+        if timeout is None:
+            return self.local_timeout
+        return min(timeout, self.local_timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version)
+        if added:
+            self.local.set(self.make_key(key, version),
+                           value, self._local_ttl(timeout))
+        return added
+
+    def get(self, key, default=None, version=None):
+        local_key = self.make_key(key, version)
+        item = self.local.get(local_key)
+        if item is not None:
+            return item[1]
+        value = self.shared.get(key, self, version)
+        if value is self:
+            return default
+        self.local.set(local_key, value, self._local_ttl(DEFAULT_TIMEOUT))
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version)
+        self.local.set(self.make_key(key, version),
+                       value, self._local_ttl(timeout))
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version)
+
+    def delete(self, key, version=None):
+        self.local.delete(self.make_key(key, version))
+        self.shared.delete(key, version)
+
+    def has_key(self, key, version=None):
+        if self.local.get(self.make_key(key, version)) is not None:
+            return True
+        return self.shared.has_key(key, version)
+
+    def incr(self, key, delta=1, version=None):
+        self.local.delete(self.make_key(key, version))
+        return self.shared.incr(key, delta, version)
+
+    def get_many(self, keys, version=None):
+        found, missing = {}, []
+        for key in keys:
+            item = self.local.get(self.make_key(key, version))
+            if item is None:
+                missing.append(key)
+            else:
+                found[key] = item[1]
+        if missing:
+            shared = self.shared.get_many(missing, version)
+            ttl = self._local_ttl(DEFAULT_TIMEOUT)
+            for key, value in shared.items():
+                self.local.set(self.make_key(key, version), value, ttl)
+            found.update(shared)
+        return found
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version)
+        ttl = self._local_ttl(timeout)
+        for key, value in data.items():
+            self.local.set(self.make_key(key, version), value, ttl)
+        return failed
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        for key in keys:
+            self.local.delete(self.make_key(key, version))
+        self.shared.delete_many(keys, version)
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear()
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
@@ -0,0 +1,135 @@
+"""Minimal pooled client for the Redis serialization protocol (RESP)."""
+import queue
+import socket
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+
+class RedisError(Exception):
+    """Error reply of the server or a broken connection."""
+
+
+class ConnectionFailed(RedisError):
+    """The server could not be reached or the connection broke."""
+
+
+class Connection:
+    def __init__(self, host, port, db=0, timeout=None):
+        self.sock = socket.create_connection((host, port), timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile('rb')
+        self.broken = False
+        if db:
+            self.execute('SELECT', db)
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+    @staticmethod
+    def encode(args):
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        return b''.join(parts)
+
+    def read_reply(self):
+        line = self.reader.readline()
+        if not line.endswith(b'\r\n'):
+            self.broken = True
+            raise RedisError('Connection closed by the server.')
+        kind, payload = line[:1], line[1:-2]
+        if kind == b'+':
+            return payload
+        if kind == b'-':
+            raise RedisError(payload.decode())
+        if kind == b':':
+            return int(payload)
+        if kind == b'$':
+            length = int(payload)
+            if length < 0:
+                return None
+            return self.reader.read(length + 2)[:-2]
+        if kind == b'*':
+            length = int(payload)
+            if length < 0:
+                return None
+            return [self.read_reply() for _ in range(length)]
+        self.broken = True
+        raise RedisError(f'Unknown reply type {kind!r}.')
+
+    def pipeline(self, commands):
+        """Sends all commands at once and returns their replies in order.
+
+        Every reply is read even if one of them is an error, so the
+        connection stays usable; the first error is raised afterwards.
+        """
+        self.sock.sendall(b''.join(self.encode(args) for args in commands))
+        replies, error = [], None
+        for _ in commands:
+            try:
+                replies.append(self.read_reply())
+            except RedisError as exc:
+                if self.broken:
+                    raise
+                replies.append(None)
+                error = error or exc
+        if error is not None:
+            raise error
+        return replies
+
+    def execute(self, *args):
+        return self.pipeline([args])[0]
+
+
+class ConnectionPool:
+    """Keeps up to ``size`` idle connections for reuse between requests."""
+
+    def __init__(self, url, size=10, timeout=None):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or '127.0.0.1'
+        self.port = parsed.port or 6379
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self.timeout = timeout
+        self.idle = queue.LifoQueue(size)
+
+    def _connect(self):
+        try:
+            return Connection(self.host, self.port, self.db, self.timeout)
+        except OSError as exc:
+            raise ConnectionFailed(str(exc)) from exc
+
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self.idle.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            yield conn
+        except (OSError, RedisError) as exc:
+            if isinstance(exc, OSError) or conn.broken:
+                # The state of a broken socket is unknown, never reuse it.
+                conn.close()
+                raise ConnectionFailed(str(exc)) from exc
+            self._release(conn)
+            raise
+        except BaseException:
+            conn.close()
+            raise
+        self._release(conn)
+
+    def _release(self, conn):
+        try:
+            self.idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def disconnect(self):
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                return
@@ -0,0 +1,97 @@
+"""Edge caching of the public pages anonymous visitors see.
+
+EdgeCacheMiddleware marks anonymous responses of EDGE_CACHE_VIEWS as
+shareable by a CDN or reverse proxy for EDGE_CACHE_SECONDS, and lets it
+serve them stale for EDGE_STALE_SECONDS more while it refetches. The pages
+are tagged with the Surrogate-Key header from request.surrogate_keys, and
+purge() asks every EDGE_PURGE_URLS endpoint to drop the tagged pages once
+the change that made them stale has been committed.
+"""
+import logging
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def executor():
+    """Single thread sending the purges, so requests never wait for them."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix='edge-purge')
+        return _executor
+
+
+def purge(keys):
+    """Purges the pages tagged with the keys after the transaction commits."""
+    urls = settings.EDGE_PURGE_URLS
+    if urls and keys:
+        keys = ' '.join(sorted(set(keys)))
+        transaction.on_commit(lambda: executor().submit(send, urls, keys))
+
+
+def send(urls, keys):
+    for url in urls:
+        request = urllib.request.Request(
+            url, method='PURGE', headers={'Surrogate-Key': keys})
+        try:
+            urllib.request.urlopen(
+                request, timeout=settings.EDGE_PURGE_TIMEOUT).close()
+        except OSError:
+            logger.warning('Edge purge of %s failed at %s', keys, url,
+                           exc_info=True)
+
+
+class EdgeCacheMiddleware:
+    """Makes anonymous responses of the public views cacheable at the edge.
+
+    Has to come before the session and CSRF middleware, so it sees the
+    cookies they set and can drop them: a shared response must not hand
+    one visitor's cookies to everybody.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if self.shareable(request, response):
+            for name in (settings.SESSION_COOKIE_NAME,
+                         settings.CSRF_COOKIE_NAME):
+                response.cookies.pop(name, None)
+            # Logged in visitors carry a session cookie and never share.
+            patch_vary_headers(response, ('Cookie',))
+            patch_cache_control(
+                response, public=True, max_age=0,
+                s_maxage=settings.EDGE_CACHE_SECONDS,
+                stale_while_revalidate=settings.EDGE_STALE_SECONDS)
+            keys = getattr(request, 'surrogate_keys', ())
+            if keys:
+                response['Surrogate-Key'] = ' '.join(keys)
+        return response
+
+    @staticmethod
+    def shareable(request, response):
+        match = request.resolver_match
+        user = getattr(request, 'user', None)
+        return (
+            request.method in ('GET', 'HEAD')
+            and response.status_code in (200, 304)
+            and match is not None
+            and match.view_name in settings.EDGE_CACHE_VIEWS
+            and user is not None and not user.is_authenticated
+            # A page with a CSRF token in it belongs to a single visitor.
+            and not request.META.get('CSRF_COOKIE_USED')
+            # Purges follow the primary, a replica page may predate them.
+            and not getattr(request, 'read_from_replica', False)
+        )
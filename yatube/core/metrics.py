@@ -0,0 +1,251 @@
+"""Per-request instrumentation for production.
+
+MetricsMiddleware times every request and, through the hooks install()
+sets up, counts its queries and their time, the time spent rendering
+templates and the cache hits and misses. The numbers go into in-process
+histograms per view, exported by the metrics view in the Prometheus text
+format. Requests slower than METRICS_SLOW_REQUEST_MS are logged to
+core.metrics.slow together with their SQL.
+
+Each worker process keeps its own histograms; the scraper sums them.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.template.base import Template
+
+slow_logger = logging.getLogger('core.metrics.slow')
+
+_local = threading.local()
+_installed = False
+_missing = object()
+
+SECONDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERIES = (1, 2, 5, 10, 20, 50, 100, 200)
+HISTOGRAMS = {
+    'request_seconds': SECONDS,
+    'db_seconds': SECONDS,
+    'template_seconds': SECONDS,
+    'db_queries': QUERIES,
+}
+COUNTERS = ('cache_hits', 'cache_misses')
+
+
+class RequestStats:
+    __slots__ = ('queries', 'db_time', 'sql', 'template_time',
+                 'template_depth', 'cache_hits', 'cache_misses')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.sql = []
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+def current():
+    """Stats of the request the thread is serving, or None."""
+    return getattr(_local, 'stats', None)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # The last slot counts the observations above every bucket.
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Registry:
+    """Histograms and counters per view, shared by the worker threads."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.histograms = {}
+            self.counters = {}
+
+    def record(self, view, values, counts):
+        with self.lock:
+            for name, value in values.items():
+                histogram = self.histograms.get((name, view))
+                if histogram is None:
+                    histogram = self.histograms[name, view] = Histogram(
+                        HISTOGRAMS[name])
+                histogram.observe(value)
+            for name, value in counts.items():
+                self.counters[name, view] = (
+                    self.counters.get((name, view), 0) + value)
+
+    def export(self):
+        """Renders everything in the Prometheus text format."""
+        lines = []
+        with self.lock:
+            for name in HISTOGRAMS:
+                lines.append(f'# TYPE yatube_{name} histogram')
+                for (metric, view), histogram in sorted(
+                        self.histograms.items()):
+                    if metric == name:
+                        lines.extend(self._histogram(name, view, histogram))
+            for name in COUNTERS:
+                lines.append(f'# TYPE yatube_{name}_total counter')
+                for (metric, view), value in sorted(self.counters.items()):
+                    if metric == name:
+                        lines.append(
+                            f'yatube_{name}_total{{view="{view}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _histogram(name, view, histogram):
+        total = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            total += count
+            yield f'yatube_{name}_bucket{{view="{view}",le="{bound}"}} {total}'
+        total += histogram.counts[-1]
+        yield f'yatube_{name}_bucket{{view="{view}",le="+Inf"}} {total}'
+        yield f'yatube_{name}_sum{{view="{view}"}} {histogram.sum}'
+        yield f'yatube_{name}_count{{view="{view}"}} {total}'
+
+
+registry = Registry()
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper counting the query and its time."""
+    stats = current()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        stats.queries += 1
+        stats.db_time += elapsed
+        if len(stats.sql) < settings.METRICS_SLOW_SQL_LIMIT:
+            stats.sql.append((elapsed, sql))
+
+
+def _timed_render(render):
+    @wraps(render)
+    def wrapper(self, context):
+        stats = current()
+        if stats is None or stats.template_depth:
+            # Included templates are part of the outermost render.
+            return render(self, context)
+        stats.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            stats.template_time += time.perf_counter() - started
+            stats.template_depth -= 1
+    return wrapper
+
+
+def _counted_get(get):
+    @wraps(get)
+    def wrapper(self, key, default=None, version=None):
+        value = get(self, key, _missing, version)
+        stats = current()
+        if stats is not None:
+            if value is _missing:
+                stats.cache_misses += 1
+            else:
+                stats.cache_hits += 1
+        return default if value is _missing else value
+    return wrapper
+
+
+def _counted_get_many(get_many):
+    @wraps(get_many)
+    def wrapper(self, keys, version=None):
+        keys = list(keys)
+        found = get_many(self, keys, version)
+        stats = current()
+        if stats is not None:
+            stats.cache_hits += len(found)
+            stats.cache_misses += len(keys) - len(found)
+        return found
+    return wrapper
+
+
+def install():
+    """Hooks template rendering and the configured caches, once.
+
+    Django has no production signals for either, so the methods are
+    wrapped; outside a measured request the wrappers only pass through.
+    """
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    Template.render = _timed_render(Template.render)
+    # Only the configured classes: a tiered cache's shared backend is an
+    # implementation detail and would count the same lookup twice.
+    for backend in {type(caches[alias]) for alias in settings.CACHES}:
+        backend.get = _counted_get(backend.get)
+        # The inherited get_many() goes through get() and is counted there.
+        if 'get_many' in vars(backend):
+            backend.get_many = _counted_get_many(backend.get_many)
+
+
+class MetricsMiddleware:
+    """Records the latency and costs of each request per view."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = _local.stats = RequestStats()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(record_query))
+                response = self.get_response(request)
+        finally:
+            _local.stats = None
+        elapsed = time.perf_counter() - started
+        match = request.resolver_match
+        view = match.view_name if match is not None else 'unresolved'
+        registry.record(view, {
+            'request_seconds': elapsed,
+            'db_seconds': stats.db_time,
+            'template_seconds': stats.template_time,
+            'db_queries': stats.queries,
+        }, {
+            'cache_hits': stats.cache_hits,
+            'cache_misses': stats.cache_misses,
+        })
+        if elapsed * 1000 >= settings.METRICS_SLOW_REQUEST_MS:
+            self.log_slow(request, view, elapsed, stats)
+        return response
+
+    @staticmethod
+    def log_slow(request, view, elapsed, stats):
+        statements = '\n'.join(f'  {duration * 1000:8.2f} ms  {sql}'
+                               for duration, sql in stats.sql)
+        slow_logger.warning(
+            'Slow request %s %s (%s): %.0f ms, %d queries in %.0f ms, '
+            'templates %.0f ms\n%s',
+            request.method, request.get_full_path(), view, elapsed * 1000,
+            stats.queries, stats.db_time * 1000,
+            stats.template_time * 1000, statements)
@@ -0,0 +1,84 @@
+"""Routing of read-only listing traffic to a replica database.
+
+Views opt in with the ``use_replica`` decorator. A client that has just
+written is pinned to the primary for REPLICA_STICKY_SECONDS by
+ReplicaStickyMiddleware, so it always sees its own changes even while the
+replica lags behind.
+"""
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_state = threading.local()
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+def replica_alias():
+    """The configured replica alias, or None when there is no replica."""
+    alias = settings.REPLICA_DATABASE
+    return alias if alias in connections.databases else None
+
+
+@contextmanager
+def replica_reads():
+    """Routes reads made inside the block to the replica."""
+    previous = getattr(_state, 'replica', False)
+    _state.replica = True
+    try:
+        yield
+    finally:
+        _state.replica = previous
+
+
+def use_replica(view):
+    """View decorator sending its reads to the replica unless pinned.
+
+    Sets request.read_from_replica when the page is read from a replica,
+    which may lag behind the change times and content version kept in the
+    cache: such a page must not be cached or validated under them.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if getattr(request, 'pinned_to_primary', False):
+            return view(request, *args, **kwargs)
+        request.read_from_replica = replica_alias() is not None
+        with replica_reads():
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if getattr(_state, 'replica', False):
+            return replica_alias()
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, settings.REPLICA_DATABASE}
+        if {obj1._state.db, obj2._state.db} <= aliases:
+            return True
+        return None
+
+
+class ReplicaStickyMiddleware:
+    """Pins a client to the primary for a while after it writes."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        cookie = settings.REPLICA_STICKY_COOKIE
+        request.pinned_to_primary = cookie in request.COOKIES
+        response = self.get_response(request)
+        if request.method not in SAFE_METHODS:
+            response.set_cookie(cookie, '1',
+                                max_age=settings.REPLICA_STICKY_SECONDS,
+                                httponly=True, samesite='Lax')
+        return response
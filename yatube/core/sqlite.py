@@ -0,0 +1,20 @@
+"""Connection tuning for SQLite.
+
+WAL lets readers work while a writer commits, synchronous=NORMAL is durable
+in WAL mode without an fsync on every commit, and busy_timeout makes a
+writer wait for the lock instead of failing with "database is locked".
+"""
+from django.conf import settings
+
+
+def apply_pragmas(cursor, pragmas):
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def tune_connection(sender, connection, **kwargs):
+    """connection_created receiver applying settings.SQLITE_PRAGMAS."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor, settings.SQLITE_PRAGMAS)
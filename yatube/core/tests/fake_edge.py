@@ -0,0 +1,97 @@
+"""In-process stand-in for a caching reverse proxy in front of Django."""
+import http.server
+import threading
+from dataclasses import dataclass, field
+
+from django.test import Client
+
+
+@dataclass
+class Entry:
+    response: object
+    stored: float
+    fresh: float
+    stale: float
+    keys: set = field(default_factory=set)
+
+
+class PurgeHandler(http.server.BaseHTTPRequestHandler):
+    def do_PURGE(self):
+        keys = set(self.headers.get('Surrogate-Key', '').split())
+        self.server.purge(keys)
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeEdge(http.server.ThreadingHTTPServer):
+    """Caches pages the way a CDN honours our Cache-Control headers.
+
+    Responses are stored only when public with s-maxage, keyed by path and
+    Cookie header, which all of our pages vary on. Within
+    stale-while-revalidate a stale copy is served and then refreshed. The
+    server accepts the PURGE requests core.edge sends. Time only moves when
+    a test calls advance().
+    """
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), PurgeHandler)
+        self.client = Client()
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.now = 0.0
+        self.purged = []
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return 'http://%s:%d/' % self.server_address
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def advance(self, seconds):
+        self.now += seconds
+
+    def purge(self, keys):
+        with self.lock:
+            self.purged.append(keys)
+            for key, entry in list(self.entries.items()):
+                if entry.keys & keys:
+                    del self.entries[key]
+
+    def get(self, path, cookie=''):
+        """Returns the response and whether it was a HIT, STALE or MISS."""
+        with self.lock:
+            entry = self.entries.get((path, cookie))
+        if entry is not None and self.now < entry.fresh:
+            return entry.response, 'HIT'
+        if entry is not None and self.now < entry.stale:
+            self.fetch(path, cookie)
+            return entry.response, 'STALE'
+        return self.fetch(path, cookie), 'MISS'
+
+    def fetch(self, path, cookie):
+        self.client.cookies.clear()
+        response = self.client.get(path, HTTP_COOKIE=cookie)
+        control = {}
+        for directive in response.get('Cache-Control', '').split(','):
+            name, _, value = directive.strip().partition('=')
+            control[name.lower()] = value
+        if (response.status_code == 200 and 'public' in control
+                and 's-maxage' in control and not response.cookies):
+            fresh = self.now + int(control['s-maxage'])
+            with self.lock:
+                self.entries[(path, cookie)] = Entry(
+                    response, self.now, fresh,
+                    fresh + int(control.get('stale-while-revalidate', 0)),
+                    set(response.get('Surrogate-Key', '').split()))
+        return response
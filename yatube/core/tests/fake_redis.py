@@ -0,0 +1,137 @@
+"""In-process stand-in for a Redis server, enough for RedisCache."""
+import socketserver
+import threading
+import time
+
+
+class FakeRedisHandler(socketserver.StreamRequestHandler):
+    def read_command(self):
+        header = self.rfile.readline()
+        if not header:
+            return None
+        args = []
+        for _ in range(int(header[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self):
+        self.server.connections += 1
+        while True:
+            args = self.read_command()
+            if args is None:
+                return
+            name = args[0].decode().upper()
+            try:
+                reply = getattr(self.server, 'cmd_' + name.lower())(*args[1:])
+            except Exception as exc:
+                self.wfile.write(b'-ERR %s\r\n' % str(exc).encode())
+                continue
+            self.wfile.write(self.encode(reply))
+
+    def encode(self, reply):
+        if reply is True:
+            return b'+OK\r\n'
+        if isinstance(reply, int):
+            return b':%d\r\n' % reply
+        if reply is None:
+            return b'$-1\r\n'
+        if isinstance(reply, list):
+            return (b'*%d\r\n' % len(reply)
+                    + b''.join(self.encode(item) for item in reply))
+        return b'$%d\r\n%s\r\n' % (len(reply), reply)
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), FakeRedisHandler)
+        self.data = {}
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return 'redis://%s:%d/0' % self.server_address
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def _alive(self, key):
+        item = self.data.get(key)
+        if item is not None and item[1] is not None \
+                and item[1] < time.monotonic():
+            del self.data[key]
+            item = None
+        return item
+
+    def cmd_ping(self):
+        return True
+
+    def cmd_select(self, db):
+        return True
+
+    def cmd_get(self, key):
+        with self.lock:
+            item = self._alive(key)
+            return None if item is None else item[0]
+
+    def cmd_mget(self, *keys):
+        return [self.cmd_get(key) for key in keys]
+
+    def cmd_set(self, key, value, *options):
+        options = [option.upper() for option in options]
+        deadline = None
+        if b'PX' in options:
+            ttl = int(options[options.index(b'PX') + 1])
+            deadline = time.monotonic() + ttl / 1000
+        with self.lock:
+            if b'NX' in options and self._alive(key) is not None:
+                return None
+            self.data[key] = (value, deadline)
+        return True
+
+    def cmd_del(self, *keys):
+        with self.lock:
+            return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def cmd_exists(self, key):
+        with self.lock:
+            return int(self._alive(key) is not None)
+
+    def cmd_incrby(self, key, delta):
+        with self.lock:
+            item = self._alive(key)
+            value, deadline = item if item else (b'0', None)
+            value = int(value) + int(delta)
+            self.data[key] = (str(value).encode(), deadline)
+            return value
+
+    def cmd_pexpire(self, key, ttl):
+        with self.lock:
+            item = self._alive(key)
+            if item is None:
+                return 0
+            self.data[key] = (item[0], time.monotonic() + int(ttl) / 1000)
+            return 1
+
+    def cmd_persist(self, key):
+        with self.lock:
+            item = self._alive(key)
+            if item is None:
+                return 0
+            self.data[key] = (item[0], None)
+            return 1
+
+    def cmd_flushdb(self):
+        with self.lock:
+            self.data.clear()
+        return True
@@ -0,0 +1,148 @@
+import time
+
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core.cache.backends import RedisCache, TieredCache
+from core.tests.fake_redis import FakeRedisServer
+
+# Nothing listens on port 1.
+UNREACHABLE = 'redis://127.0.0.1:1/0'
+
+
+class RedisCacheTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = FakeRedisServer().start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.data.clear()
+        self.cache = RedisCache(self.server.url, {'TIMEOUT': 20})
+
+    def tearDown(self):
+        self.cache.pool.disconnect()
+
+    def test_set_get_delete(self):
+        """Значения сохраняются, читаются и удаляются."""
+        self.cache.set('post', {'text': 'Текст'})
+        self.assertEqual(self.cache.get('post'), {'text': 'Текст'})
+        self.cache.delete('post')
+        self.assertIsNone(self.cache.get('post'))
+        self.assertEqual(self.cache.get('post', 'default'), 'default')
+
+    def test_add_and_incr(self):
+        """add() не перезаписывает ключ, incr() увеличивает число."""
+        self.assertTrue(self.cache.add('version', 1))
+        self.assertFalse(self.cache.add('version', 5))
+        self.assertEqual(self.cache.incr('version'), 2)
+        self.assertEqual(self.cache.get('version'), 2)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_many(self):
+        """get_many() и set_many() работают за один запрос."""
+        self.cache.set_many({'a': 1, 'b': [2]})
+        self.assertEqual(self.cache.get_many(['a', 'b', 'c']),
+                         {'a': 1, 'b': [2]})
+
+    def test_timeout(self):
+        """Ключ истекает по таймауту."""
+        self.cache.set('short', 'value', timeout=0.05)
+        self.assertTrue(self.cache.has_key('short'))
+        time.sleep(0.1)
+        self.assertFalse(self.cache.has_key('short'))
+
+    def test_connections_are_pooled(self):
+        """Соединение переиспользуется между запросами."""
+        connections = self.server.connections
+        for i in range(20):
+            self.cache.set(f'key_{i}', i)
+            self.cache.get(f'key_{i}')
+        self.assertEqual(self.server.connections, connections + 1)
+
+
+class UnreachableRedisTests(TestCase):
+    """Недоступный сервер кэша не роняет сайт."""
+
+    def setUp(self):
+        self.cache = RedisCache(UNREACHABLE, {'TIMEOUT': 20})
+
+    def test_commands_degrade_to_misses(self):
+        """Чтение промахивается, запись ничего не делает."""
+        with self.assertLogs('core.cache.backends', 'WARNING'):
+            self.cache.set('post', 'Текст')
+            self.assertIsNone(self.cache.get('post'))
+            self.assertEqual(self.cache.get('post', 'default'), 'default')
+            self.assertFalse(self.cache.add('post', 'Текст'))
+            self.assertEqual(self.cache.get_many(['post']), {})
+            self.assertFalse(self.cache.has_key('post'))
+            with self.assertRaises(ValueError):
+                self.cache.incr('version')
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'core.cache.backends.TieredCache',
+        'LOCATION': UNREACHABLE,
+    }})
+    def test_pages_work_without_cache(self):
+        """Страницы открываются и без кэша."""
+        with self.assertLogs('core.cache.backends', 'WARNING'):
+            response = Client().get(reverse('post:index'))
+        self.assertEqual(response.status_code, 200)
+
+
+class TieredCacheTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = FakeRedisServer().start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        super().tearDownClass()
+
+    def make_cache(self, local_timeout=60):
+        return TieredCache(self.server.url, {
+            'TIMEOUT': 20,
+            'OPTIONS': {'LOCAL_TIMEOUT': local_timeout,
+                        'LOCAL_MAX_ENTRIES': 2},
+        })
+
+    def setUp(self):
+        self.server.data.clear()
+
+    def test_workers_share_values(self):
+        """Значение одного процесса видно другому."""
+        worker_1, worker_2 = self.make_cache(), self.make_cache()
+        worker_1.set('page', 'html')
+        self.assertEqual(worker_2.get('page'), 'html')
+
+    def test_local_tier_serves_hot_keys(self):
+        """Локальный уровень отвечает без обращения к серверу."""
+        cache = self.make_cache()
+        cache.set('page', 'html')
+        self.server.data.clear()
+        self.assertEqual(cache.get('page'), 'html')
+
+    def test_local_copies_expire(self):
+        """Локальная копия живёт не дольше LOCAL_TIMEOUT."""
+        worker_1 = self.make_cache(local_timeout=0.05)
+        worker_2 = self.make_cache()
+        worker_1.set('version', 1)
+        worker_2.incr('version')
+        time.sleep(0.1)
+        self.assertEqual(worker_1.get('version'), 2)
+
+    def test_local_tier_is_bounded(self):
+        """Локальный уровень вытесняет самые старые ключи."""
+        cache = self.make_cache()
+        cache.set_many({'a': 1, 'b': 2, 'c': 3})
+        self.assertEqual(len(cache.local.entries), 2)
+        self.assertEqual(cache.get_many(['a', 'b', 'c']),
+                         {'a': 1, 'b': 2, 'c': 3})
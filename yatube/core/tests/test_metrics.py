@@ -0,0 +1,78 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+from posts.models import Post
+
+User = get_user_model()
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        metrics.registry.clear()
+
+    def histogram(self, name, view):
+        return metrics.registry.histograms[name, view]
+
+    def test_request_is_recorded_per_view(self):
+        """Время, запросы к БД и шаблоны записываются по имени view."""
+        response = self.client.get(reverse('post:index'))
+        self.assertEqual(response.status_code, 200)
+        for name in metrics.HISTOGRAMS:
+            with self.subTest(name=name):
+                self.assertEqual(
+                    sum(self.histogram(name, 'post:index').counts), 1)
+        self.assertGreater(
+            self.histogram('db_queries', 'post:index').sum, 0)
+        self.assertGreater(
+            self.histogram('template_seconds', 'post:index').sum, 0)
+        self.client.get('/missing/')
+        self.assertIn(('request_seconds', 'unresolved'),
+                      metrics.registry.histograms)
+
+    def test_cache_hits_and_misses(self):
+        """Обращения к кэшу считаются попаданиями и промахами."""
+        url = reverse('post:post_detail', args=[self.post.pk])
+        self.client.get(url)
+        self.client.get(url)
+        counters = metrics.registry.counters
+        self.assertGreater(counters['cache_misses', 'post:post_detail'], 0)
+        self.assertGreater(counters['cache_hits', 'post:post_detail'], 0)
+        self.assertIsNone(cache.get('missing'))
+        self.assertEqual(cache.get('missing', 'default'), 'default')
+
+    def test_endpoint_exports_prometheus_text(self):
+        """Метрики отдаются в текстовом формате Prometheus."""
+        self.client.get(reverse('post:index'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '# TYPE yatube_request_seconds '
+                                      'histogram')
+        self.assertContains(
+            response, 'yatube_db_queries_count{view="post:index"} 1')
+        self.assertContains(
+            response,
+            'yatube_request_seconds_bucket{view="post:index",le="+Inf"} 1')
+
+    def test_endpoint_is_private(self):
+        """Чужим адресам метрики не показываются."""
+        response = self.client.get(reverse('metrics'),
+                                   REMOTE_ADDR='203.0.113.5')
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(METRICS_SLOW_REQUEST_MS=0)
+    def test_slow_request_is_logged_with_sql(self):
+        """Медленный запрос попадает в журнал вместе с его SQL."""
+        with self.assertLogs('core.metrics.slow', 'WARNING') as logs:
+            self.client.get(reverse('post:index'))
+        self.assertIn('post:index', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
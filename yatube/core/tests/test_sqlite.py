@@ -0,0 +1,39 @@
+import os
+import sqlite3
+import tempfile
+
+from django.db import connection
+from django.test import SimpleTestCase
+from django.test.utils import override_settings
+
+from core.sqlite import apply_pragmas
+
+PRAGMAS = {'journal_mode': 'WAL', 'synchronous': 'NORMAL',
+           'busy_timeout': 1234}
+
+
+class SQLitePragmasTests(SimpleTestCase):
+    databases = {'default'}
+
+    def test_apply_pragmas(self):
+        """Файл базы переводится в режим WAL."""
+        with tempfile.TemporaryDirectory() as directory:
+            db = sqlite3.connect(os.path.join(directory, 'test.sqlite3'))
+            apply_pragmas(db.cursor(), PRAGMAS)
+            self.assertEqual(
+                db.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+            self.assertEqual(db.execute('PRAGMA synchronous').fetchone()[0], 1)
+            db.close()
+
+    @override_settings(SQLITE_PRAGMAS=PRAGMAS)
+    def test_new_connections_are_tuned(self):
+        """Каждое новое соединение Django получает настройки PRAGMA."""
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite only')
+        new = connection.copy()
+        try:
+            with new.cursor() as cursor:
+                cursor.execute('PRAGMA busy_timeout')
+                self.assertEqual(cursor.fetchone()[0], 1234)
+        finally:
+            new.close()
@@ -1,7 +1,11 @@
 from http import HTTPStatus
 
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
 
+from . import metrics
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path},
@@ -15,3 +19,11 @@ def csrf_failure(request, reason=''):
 def internal_server_error(request):
     return render(request, 'core/500.html.html',
                   status=HTTPStatus.INTERNAL_SERVER_ERROR.value)
+
+
+def metrics_view(request):
+    """Histograms of this worker process for the Prometheus scraper."""
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        raise Http404
+    return HttpResponse(metrics.registry.export(),
+                        content_type='text/plain; version=0.0.4')
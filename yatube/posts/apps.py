@@ -3,3 +3,12 @@ from django.apps import AppConfig
 
 class PostsConfig(AppConfig):
     name = 'posts'
+
+    def ready(self):
+        from django.conf import settings
+        from PIL import Image
+
+        from . import signals  # noqa: F401
+
+        # Pillow refuses to open decompression bombs in workers as well.
+        Image.MAX_IMAGE_PIXELS = settings.POST_IMAGE_MAX_PIXELS
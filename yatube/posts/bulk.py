@@ -0,0 +1,73 @@
+"""Batch writes of posts and comments.
+
+bulk_create() and bulk_update() send no model signals, so whatever the
+signals keep in sync is done here, once per batch: the counters, the
+timelines, the search index, the comment threads and the content version.
+"""
+from django.db import transaction
+
+from . import conditional, counters, search, threads, timeline
+from .cache import bump_content_version
+from .models import Comment, Post
+
+BATCH_SIZE = 500
+
+
+def _insert(model, objs):
+    """bulk_create() that also sets the primary keys on SQLite."""
+    model.objects.bulk_create(objs, batch_size=BATCH_SIZE)
+    if not objs or objs[-1].pk is not None:
+        return
+    # SQLite cannot return the ids of a bulk insert. It hands out
+    # consecutive AUTOINCREMENT rowids and the caller's transaction holds
+    # the write lock, so the batch got the last ids of the table.
+    ids = model.objects.order_by('-pk').values_list(
+        'pk', flat=True)[:len(objs)]
+    for obj, pk in zip(objs, reversed(list(ids))):
+        obj.pk = pk
+
+
+def create_posts(posts):
+    with transaction.atomic():
+        _insert(Post, posts)
+        counters.posts_added(posts)
+        timeline.fan_out_many(posts)
+        search.backend().index_many(posts)
+    bump_content_version()
+    conditional.touch({scope for post in posts
+                       for scope in conditional.post_scopes(post)})
+    return posts
+
+
+def update_posts(posts, fields):
+    """Saves the given fields of posts loaded from the database."""
+    scopes = {scope for post in posts for scope in conditional.post_scopes(
+        post, getattr(post, '_loaded_group_id', None))}
+    with transaction.atomic():
+        Post.objects.bulk_update(posts, fields, batch_size=BATCH_SIZE)
+        for post in posts:
+            # Only moves the group counters of posts that changed group.
+            counters.post_saved(post, created=False)
+        search.backend().index_many(posts)
+    bump_content_version()
+    conditional.touch(scopes)
+    return posts
+
+
+def create_comments(comments):
+    with transaction.atomic():
+        _insert(Comment, comments)
+        threads.save_paths(comments)
+        counters.comments_added(comments)
+        search.backend().index_many(comments)
+    conditional.touch({f'post:{comment.post_id}' for comment in comments})
+    return comments
+
+
+def update_comments(comments):
+    with transaction.atomic():
+        Comment.objects.bulk_update(comments, ['text'],
+                                    batch_size=BATCH_SIZE)
+        search.backend().index_many(comments)
+    conditional.touch({f'post:{comment.post_id}' for comment in comments})
+    return comments
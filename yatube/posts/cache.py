@@ -0,0 +1,54 @@
+"""Versioned keys for the cached listing fragments.
+
+The content version is part of every fragment key and is bumped whenever a
+post or a group changes, so fragments can live for minutes without showing
+stale posts: a bump simply makes all previous keys unreachable.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import conditional
+
+VERSION_KEY = 'posts:content-version'
+
+
+def _fresh_version():
+    # Starts from the clock, so a version lost by cache eviction is never
+    # handed out again.
+    return int(time.time() * 1000)
+
+
+def content_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        fresh = _fresh_version()
+        cache.add(VERSION_KEY, fresh, None)
+        version = cache.get(VERSION_KEY, fresh)
+    return version
+
+
+def bump_content_version():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, _fresh_version(), None)
+
+
+def page_cache_context(request):
+    """Context for {% cache page_cache_timeout ... page_cache_key %}."""
+    cursor = '|'.join(request.GET.get(param, '')
+                      for param in ('page', 'after', 'before'))
+    key = f'{content_version()}:{cursor}'
+    if request.user.is_authenticated:
+        # The follow buttons make the fragments of a visitor their own.
+        scope = conditional.follows_scope(request.user.pk)
+        key += f':{request.user.pk}:{conditional.changed_at([scope])}'
+    # A page read from a lagging replica is not stored under the version.
+    timeout = (0 if getattr(request, 'read_from_replica', False)
+               else settings.PAGE_CACHE_TIMEOUT)
+    return {
+        'page_cache_key': key,
+        'page_cache_timeout': timeout,
+    }
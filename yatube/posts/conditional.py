@@ -0,0 +1,153 @@
+"""Conditional GET for the post pages.
+
+Every page is validated by the newest pub_date among its posts and by the
+time its scope last changed: 'posts' for the index, 'group:<id>',
+'author:<id>' and 'post:<id>', plus 'follows:<id>' of a logged in visitor
+for the follow buttons, and by their CSRF cookie for the forms. The
+change times live in the cache and are touched by the signals and the
+batch writes, so an unchanged page answers 304 Not Modified after one
+indexed query, before any template is rendered.
+Touching a scope also purges its pages from the edge caches.
+"""
+import hashlib
+import time
+from functools import wraps
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef, Subquery
+from django.views.decorators.http import condition
+
+from core import edge
+
+from .models import Follow, Group, Post, User
+
+KEY = 'posts:changed:{}'
+
+
+def post_scopes(post, group_id=None):
+    """Scopes whose pages show the post; group_id is a previous group."""
+    scopes = ['posts', f'post:{post.pk}', f'author:{post.author_id}']
+    scopes += [f'group:{pk}' for pk in {post.group_id, group_id} if pk]
+    return scopes
+
+
+def follows_scope(user_id):
+    return f'follows:{user_id}'
+
+
+def touch(scopes):
+    """Records that the pages of the scopes changed just now."""
+    now = time.time()
+    cache.set_many({KEY.format(scope): now for scope in scopes}, None)
+    edge.purge(scopes)
+
+
+def changed_at(scopes):
+    """Latest change time of the scopes.
+
+    A scope the cache has lost counts as changed now, so a page is never
+    validated against a change time that was evicted.
+    """
+    keys = [KEY.format(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    now = time.time()
+    for key in set(keys) - set(found):
+        cache.add(key, now, None)
+        # Stays now while the cache cannot be reached.
+        found[key] = cache.get(key, now)
+    return max(found.values())
+
+
+def validators(request, scopes, latest, *extra):
+    """ETag and Last-Modified of a page of the scopes."""
+    # Shared copies of the page are tagged, and purged, by scope.
+    request.surrogate_keys = scopes
+    if request.user.is_authenticated:
+        scopes = [*scopes, follows_scope(request.user.pk)]
+    changed = datetime.fromtimestamp(changed_at(scopes), timezone.utc)
+    last_modified = max(changed, latest) if latest else changed
+    # The header shows who is logged in, so pages differ per user.
+    parts = [request.get_full_path(), request.user.pk, changed.timestamp(),
+             latest, *extra]
+    if request.user.is_authenticated:
+        # Their forms carry the CSRF token, which a new login rotates.
+        parts.append(request.META.get('CSRF_COOKIE'))
+    digest = hashlib.md5('|'.join(map(str, parts)).encode()).hexdigest()
+    return digest, last_modified
+
+
+def latest_post(posts):
+    return Subquery(posts.order_by('-pub_date').values('pub_date')[:1])
+
+
+def index(request):
+    latest = Post.objects.order_by('-pub_date').values_list(
+        'pub_date', flat=True).first()
+    return validators(request, ['posts'], latest)
+
+
+def group_posts(request, slug):
+    group = Group.objects.filter(slug=slug).annotate(latest=latest_post(
+        Post.objects.filter(group=OuterRef('pk')))).values_list(
+        'pk', 'latest').first()
+    if group is None:
+        return None
+    return validators(request, [f'group:{group[0]}'], group[1])
+
+
+def profile(request, username):
+    authors = User.objects.filter(username=username).annotate(
+        latest=latest_post(Post.objects.filter(author=OuterRef('pk'))))
+    fields = ['pk', 'latest']
+    if request.user.is_authenticated:
+        authors = authors.annotate(followed=Exists(Follow.objects.filter(
+            user=request.user, author=OuterRef('pk'))))
+        fields.append('followed')
+    author = authors.values(*fields).first()
+    if author is None:
+        return None
+    return validators(request, [f'author:{author["pk"]}'], author['latest'],
+                      author.get('followed'))
+
+
+def post_detail(request, post_id):
+    post = Post.objects.filter(pk=post_id).values_list(
+        'author_id', 'pub_date').first()
+    if post is None:
+        return None
+    # The page also shows how many posts the author has.
+    return validators(request, [f'post:{post_id}', f'author:{post[0]}'],
+                      post[1])
+
+
+def conditional(page_validators):
+    """View decorator answering 304 when the page has not changed."""
+    def computed(request, *args, **kwargs):
+        # condition() asks for the ETag and Last-Modified separately.
+        if not hasattr(request, 'page_validators'):
+            request.page_validators = (
+                page_validators(request, *args, **kwargs) or (None, None))
+        return request.page_validators
+
+    def etag(request, *args, **kwargs):
+        return computed(request, *args, **kwargs)[0]
+
+    def last_modified(request, *args, **kwargs):
+        return computed(request, *args, **kwargs)[1]
+
+    def decorator(view):
+        conditional_view = condition(
+            etag_func=etag, last_modified_func=last_modified)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if getattr(request, 'read_from_replica', False):
+                # The validators come from the primary, the body from a
+                # replica that may not have the change yet.
+                del response['ETag']
+                del response['Last-Modified']
+            return response
+        return wrapper
+    return decorator
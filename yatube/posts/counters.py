@@ -0,0 +1,139 @@
+"""Denormalized counters of posts, comments and follows.
+
+The counters are moved by single UPDATE ... SET n = n + 1 statements from
+the model signals, so pages read them instead of running COUNT(*). With
+model saves, follows.follow() and the batches of posts.bulk run in a
+transaction, so the change and the counter commit together; rebuild() and
+the recount_counters command repair anything that drifted anyway.
+"""
+from collections import Counter
+
+from django.db import router
+from django.db.models import Count, F
+
+from .models import Follow, Group, Post, User, UserStats
+
+
+def _move(queryset, field, delta):
+    return queryset.update(**{field: F(field) + delta})
+
+
+def _move_user(user_id, field, delta):
+    if not _move(UserStats.objects.filter(user_id=user_id), field, delta):
+        if User.objects.filter(pk=user_id).exists():
+            # Rows missing for users created before the counters existed
+            # are built from scratch, which already includes the change.
+            _recount_users(User.objects.filter(pk=user_id))
+
+
+def _move_group(group_id, delta):
+    if group_id is not None:
+        _move(Group.objects.filter(pk=group_id), 'posts_count', delta)
+
+
+def stats_for(user):
+    """Returns the counters of a user, creating them on first access."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        _recount_users(User.objects.filter(pk=user.pk))
+        # Read the row back where it was written, not from a replica.
+        return UserStats.objects.using(
+            router.db_for_write(UserStats)).get(user=user)
+
+
+def post_saved(post, created):
+    if created:
+        _move_user(post.author_id, 'posts_count', 1)
+        _move_group(post.group_id, 1)
+    else:
+        old_group_id = getattr(post, '_loaded_group_id', post.group_id)
+        if old_group_id != post.group_id:
+            _move_group(old_group_id, -1)
+            _move_group(post.group_id, 1)
+    post._loaded_group_id = post.group_id
+
+
+def post_deleted(post):
+    _move_user(post.author_id, 'posts_count', -1)
+    _move_group(post.group_id, -1)
+
+
+def comment_changed(comment, delta):
+    _move(Post.objects.filter(pk=comment.post_id), 'comments_count', delta)
+
+
+def posts_added(posts):
+    """Counts a batch of new posts with one UPDATE per author and group."""
+    for author_id, count in Counter(post.author_id for post in posts).items():
+        _move_user(author_id, 'posts_count', count)
+    for group_id, count in Counter(post.group_id for post in posts).items():
+        _move_group(group_id, count)
+
+
+def comments_added(comments):
+    """Counts a batch of new comments with one UPDATE per post."""
+    counts = Counter(comment.post_id for comment in comments)
+    for post_id, count in counts.items():
+        _move(Post.objects.filter(pk=post_id), 'comments_count', count)
+
+
+def follow_changed(follow, delta):
+    _move_user(follow.author_id, 'followers_count', delta)
+    _move_user(follow.user_id, 'following_count', delta)
+
+
+def _counts(queryset, field):
+    return dict(
+        queryset.order_by().values_list(field).annotate(n=Count('pk')))
+
+
+def _recount_users(users, fix=True):
+    posts = _counts(Post.objects.filter(author__in=users), 'author_id')
+    followers = _counts(Follow.objects.filter(author__in=users), 'author_id')
+    following = _counts(Follow.objects.filter(user__in=users), 'user_id')
+    user_ids = list(users.values_list('pk', flat=True))
+    stored = UserStats.objects.in_bulk(user_ids)
+    drift = []
+    for user_id in user_ids:
+        actual = {
+            'posts_count': posts.get(user_id, 0),
+            'followers_count': followers.get(user_id, 0),
+            'following_count': following.get(user_id, 0),
+        }
+        stats = stored.get(user_id)
+        changed = [
+            ('user', user_id, field, getattr(stats, field, None), value)
+            for field, value in actual.items()
+            if stats is None or getattr(stats, field) != value
+        ]
+        if changed and fix:
+            UserStats.objects.update_or_create(user_id=user_id,
+                                               defaults=actual)
+        drift.extend(changed)
+    return drift
+
+
+def _recount(queryset, field, relation, kind, fix):
+    drift = []
+    rows = list(queryset.order_by().annotate(
+        actual=Count(relation)).values_list('pk', field, 'actual'))
+    for pk, stored, actual in rows:
+        if stored != actual:
+            drift.append((kind, pk, field, stored, actual))
+            if fix:
+                queryset.filter(pk=pk).update(**{field: actual})
+    return drift
+
+
+def rebuild(fix=True):
+    """Recounts every counter and returns the list of mismatches found.
+
+    Each mismatch is a tuple (kind, pk, field, stored, actual).
+    """
+    return (
+        _recount(Group.objects.all(), 'posts_count', 'posts', 'group', fix)
+        + _recount(Post.objects.all(), 'comments_count', 'comments',
+                   'post', fix)
+        + _recount_users(User.objects.all(), fix)
+    )
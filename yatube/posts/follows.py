@@ -0,0 +1,88 @@
+"""Following authors: the state shown by the buttons and the changes.
+
+The state is kept on the request. Listing views register their page with
+add_page() without evaluating it, and the first button that asks about
+an author resolves every author of the registered pages with one IN
+query, so a page costs one query whatever the number of its authors,
+and none at all when it comes from the fragment cache.
+
+follow() and unfollow() change a subscription with a single statement
+that cannot fail on a concurrent duplicate, and send the model signals
+only when a row was actually inserted or deleted.
+"""
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_save
+
+from .models import Follow
+
+
+class FollowState:
+    def __init__(self, user):
+        self.user = user
+        self.known = {}
+        self.pages = []
+
+    def add_page(self, posts):
+        """Posts whose authors are resolved with the next lookup."""
+        self.pages.append(posts)
+
+    def follows(self, author_id):
+        if author_id not in self.known:
+            author_ids = {author_id}
+            for page in self.pages:
+                author_ids.update(post.author_id for post in page)
+            self.pages = []
+            self.load(author_ids)
+        return self.known[author_id]
+
+    def load(self, author_ids):
+        missing = set(author_ids) - self.known.keys()
+        found = set()
+        if missing and self.user.is_authenticated:
+            found = set(Follow.objects.filter(
+                user=self.user, author_id__in=missing,
+            ).values_list('author_id', flat=True))
+        for author_id in missing:
+            self.known[author_id] = author_id in found
+
+
+def for_request(request):
+    state = getattr(request, '_follow_state', None)
+    if state is None:
+        state = request._follow_state = FollowState(request.user)
+    return state
+
+
+def follow(user, author):
+    """Subscribes the user to the author; False if already subscribed."""
+    if user.pk == author.pk:
+        return False
+    ops = connection.ops
+    table = ops.quote_name(Follow._meta.db_table)
+    # The counters and the timeline commit together with the row.
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'{ops.insert_statement(ignore_conflicts=True)} {table} '
+            f'(user_id, author_id) VALUES (%s, %s) '
+            f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}',
+            [user.pk, author.pk])
+        if cursor.rowcount != 1:
+            return False
+        instance = Follow(pk=cursor.lastrowid, user=user, author=author)
+        post_save.send(Follow, instance=instance, created=True,
+                       update_fields=None, raw=False, using=connection.alias)
+    return True
+
+
+def unfollow(user, author):
+    """Unsubscribes the user from the author; False if not subscribed."""
+    table = connection.ops.quote_name(Follow._meta.db_table)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {table} WHERE user_id = %s AND author_id = %s',
+            [user.pk, author.pk])
+        if cursor.rowcount != 1:
+            return False
+        instance = Follow(user=user, author=author)
+        post_delete.send(Follow, instance=instance, using=connection.alias)
+    return True
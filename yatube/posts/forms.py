@@ -1,15 +1,52 @@
 from django import forms
+from django.conf import settings
+from django.template.defaultfilters import filesizeformat
 
 from .models import Comment, Post
 
+# The largest value an SQLite INTEGER column holds.
+MAX_ID = 2 ** 63 - 1
+
 
 class PostForm(forms.ModelForm):
     class Meta:
         model = Post
         fields = ('text', 'group', 'image')
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        upload = self.files.get('image')
+        # Upload handlers stop storing a file past the limit, so an oversized
+        # one is taken away before Pillow gets to see a truncated image.
+        self.oversized = (upload is not None
+                          and upload.size > settings.POST_IMAGE_MAX_BYTES)
+        if self.oversized:
+            self.files = self.files.copy()
+            del self.files['image']
+
+    def clean_image(self):
+        if self.oversized:
+            raise forms.ValidationError(
+                'Файл больше %s.'
+                % filesizeformat(settings.POST_IMAGE_MAX_BYTES))
+        image = self.cleaned_data['image']
+        # Set by ImageField from the header only, the pixels are not decoded.
+        header = getattr(image, 'image', None)
+        if header is not None:
+            width, height = header.size
+            if width * height > settings.POST_IMAGE_MAX_PIXELS:
+                raise forms.ValidationError(
+                    'Картинка больше %d мегапикселей.'
+                    % (settings.POST_IMAGE_MAX_PIXELS // 1000000))
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
         model = Comment
         fields = ('text',)
+
+
+class ReplyForm(forms.Form):
+    """The comment answered, from the hidden field of the comment form."""
+    parent = forms.IntegerField(required=False, min_value=1, max_value=MAX_ID)
@@ -0,0 +1,167 @@
+"""Comment ingestion with batched writes.
+
+The ingest view queues comments in memory and answers 202 at once. A
+thread of each worker process writes the queue every
+COMMENT_INGEST_INTERVAL seconds, or as soon as COMMENT_INGEST_BATCH
+comments are waiting, as one transaction through posts.bulk. That way a
+burst of comments takes the SQLite write lock a few times instead of once
+for every comment. Comments are identified by their ingest_id until they
+are written. Whatever is still queued when the process exits is written
+by an atexit hook.
+
+A batch that fails is tried once more and then comment by comment, so one
+bad comment does not hold up the rest. Comments that still fail go back to
+the queue and are dropped, with an error in the log, after
+COMMENT_INGEST_ATTEMPTS tries.
+
+The queue lives in the memory of the worker process that took the
+comment, so only that process knows a comment is pending. Behind several
+workers the status URL of a comment that is not written yet may answer
+404 from the others.
+"""
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+from . import bulk
+from .models import Comment, Post
+
+logger = logging.getLogger(__name__)
+
+
+class CommentQueue:
+    def __init__(self):
+        self.pending = []
+        # ingest_ids of the batch being written, until it is committed.
+        self.in_flight = set()
+        self.lock = threading.Lock()
+        # Held while writing, so the atexit flush waits for the thread.
+        self.writing = threading.Lock()
+        self.wake = threading.Event()
+        self.thread = None
+
+    def put(self, comment):
+        with self.lock:
+            self.pending.append(comment)
+            if self.thread is None:
+                self.start()
+            full = len(self.pending) >= settings.COMMENT_INGEST_BATCH
+        if full:
+            self.wake.set()
+
+    def is_pending(self, ingest_id):
+        with self.lock:
+            return ingest_id in self.in_flight or any(
+                comment.ingest_id == ingest_id for comment in self.pending)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True,
+                                       name='comment-ingest')
+        self.thread.start()
+
+    def run(self):
+        while True:
+            self.wake.wait(settings.COMMENT_INGEST_INTERVAL)
+            self.wake.clear()
+            try:
+                failed = self.flush()
+            except Exception:
+                logger.exception('Writing queued comments failed')
+                failed = True
+            if failed:
+                # Gives a busy or broken database time before the retry.
+                time.sleep(settings.COMMENT_INGEST_RETRY_DELAY)
+
+    def flush(self):
+        """Writes everything queued so far.
+
+        Returns the number of comments that could not be written.
+        """
+        with self.writing:
+            with self.lock:
+                batch, self.pending = self.pending, []
+                self.in_flight = {comment.ingest_id for comment in batch}
+            failed = batch
+            try:
+                failed = write_batch(batch)
+            finally:
+                with self.lock:
+                    self.pending[:0] = retry(failed)
+                    self.in_flight = set()
+            return len(failed)
+
+
+def write_batch(comments):
+    """Writes comments, returning those that could not be written."""
+    if not comments:
+        return []
+    # Once more in case the first failure was passing, like a lock.
+    for _ in range(2):
+        try:
+            write(comments)
+            return []
+        except Exception:
+            logger.warning('Writing %d queued comments failed',
+                           len(comments), exc_info=True)
+    failed = []
+    for comment in comments:
+        try:
+            write([comment])
+        except Exception:
+            logger.warning('Writing queued comment %s failed',
+                           comment.ingest_id, exc_info=True)
+            failed.append(comment)
+    return failed
+
+
+def retry(comments):
+    """The failed comments that get another try."""
+    again = []
+    for comment in comments:
+        comment.ingest_attempts = getattr(comment, 'ingest_attempts', 0) + 1
+        if comment.ingest_attempts < settings.COMMENT_INGEST_ATTEMPTS:
+            again.append(comment)
+        else:
+            logger.error('Dropped comment %s after %d failed attempts',
+                         comment.ingest_id, comment.ingest_attempts)
+    return again
+
+
+def write(comments):
+    """Inserts a batch, dropping comments whose post or parent is gone."""
+    post_ids = set(Post.objects.filter(
+        pk__in={comment.post_id for comment in comments}
+    ).values_list('pk', flat=True))
+    parents = dict(Comment.objects.filter(
+        pk__in={comment.parent_id for comment in comments}
+    ).values_list('pk', 'post_id'))
+    valid = []
+    for comment in comments:
+        # Set by an insert that was rolled back.
+        comment.pk = None
+        if comment.post_id not in post_ids:
+            logger.warning('Dropped comment %s to missing post %s',
+                           comment.ingest_id, comment.post_id)
+            continue
+        if parents.get(comment.parent_id) != comment.post_id:
+            comment.parent_id = None
+        valid.append(comment)
+    if valid:
+        bulk.create_comments(valid)
+
+
+_queue = CommentQueue()
+
+
+def queue():
+    return _queue
+
+
+@atexit.register
+def flush_on_exit():
+    # Every round writes a comment or uses up one of its attempts.
+    while _queue.flush():
+        pass
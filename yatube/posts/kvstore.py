@@ -0,0 +1,53 @@
+"""sorl-thumbnail key-value store that looks many thumbnails up at once."""
+from sorl.thumbnail.conf import settings
+from sorl.thumbnail.images import deserialize_image_file
+from sorl.thumbnail.kvstores import cached_db_kvstore
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+EMPTY_VALUE = cached_db_kvstore.EMPTY_VALUE
+
+
+class KVStore(cached_db_kvstore.KVStore):
+    """Caches misses for THUMBNAIL_MISS_TIMEOUT only.
+
+    sorl caches a miss as long as a thumbnail, so a worker that looked a
+    thumbnail up before the pool made it would keep showing the original
+    image for THUMBNAIL_CACHE_TIMEOUT.
+    """
+
+    def _get_raw(self, key):
+        value = self.cache.get(key)
+        if value is None:
+            try:
+                value = KVStoreModel.objects.get(key=key).value
+                self.cache.set(key, value, settings.THUMBNAIL_CACHE_TIMEOUT)
+            except KVStoreModel.DoesNotExist:
+                value = EMPTY_VALUE
+                self.cache.set(key, value, settings.THUMBNAIL_MISS_TIMEOUT)
+        return None if value == EMPTY_VALUE else value
+
+    def get_many(self, image_files):
+        """Maps the key of every image file to the stored one or None.
+
+        Costs one cache round trip and, for keys the cache does not know,
+        one database query; misses are cached briefly like in get().
+        """
+        keys = {add_prefix(image_file.key): image_file.key
+                for image_file in image_files}
+        values = self.cache.get_many(list(keys))
+        missing = [key for key in keys if key not in values]
+        if missing:
+            stored = dict(KVStoreModel.objects.filter(key__in=missing)
+                          .values_list('key', 'value'))
+            fetched = {key: stored.get(key, EMPTY_VALUE) for key in missing}
+            self.cache.set_many(stored, settings.THUMBNAIL_CACHE_TIMEOUT)
+            self.cache.set_many({key: EMPTY_VALUE for key in missing
+                                 if key not in stored},
+                                settings.THUMBNAIL_MISS_TIMEOUT)
+            values.update(fetched)
+        return {
+            keys[key]: (None if value == EMPTY_VALUE or not value
+                        else deserialize_image_file(value))
+            for key, value in values.items()
+        }
@@ -0,0 +1,49 @@
+"""Helpers shared by the benchmark management commands."""
+import time
+from contextlib import contextmanager
+
+from django.db import transaction
+
+from posts.models import Post, User
+
+
+@contextmanager
+def rollback():
+    """Runs the block in a transaction that is always rolled back.
+
+    Benchmarks seed their data inside it, so the database is left untouched.
+    """
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def seed_users(count, prefix='bench_user'):
+    User.objects.bulk_create(
+        User(username=f'{prefix}_{number}') for number in range(count))
+    return list(User.objects.filter(username__startswith=f'{prefix}_'))
+
+
+def seed_posts(count, authors=None, groups=(None,), batch_size=5000):
+    """Bulk inserts ``count`` posts spread over the authors and groups."""
+    if authors is None:
+        authors = seed_users(1, prefix='bench_author')
+    for start in range(0, count, batch_size):
+        Post.objects.bulk_create(
+            Post(text=f'Benchmark post {number}',
+                 author=authors[number % len(authors)],
+                 group=groups[number % len(groups)])
+            for number in range(start, min(start + batch_size, count))
+        )
+    return authors
+
+
+def timeit(func, repeat=5):
+    """Returns the best wall time of ``func`` in milliseconds."""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from posts.management.bench import rollback, seed_users
+from posts.models import Group, Post
+
+
+class Command(BaseCommand):
+    help = ('Compares creating posts one by one with the bulk write '
+            'endpoint. Seeded data is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=5000)
+        parser.add_argument('--batch', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count, batch = options['items'], options['batch']
+        with rollback():
+            author, = seed_users(1, prefix='bench_author')
+            Group.objects.create(title='Bench', slug='bench-bulk',
+                                 description='')
+            items = [{'text': f'Imported post {number}',
+                      'group': 'bench-bulk'} for number in range(count)]
+            client = APIClient()
+            client.force_authenticate(author)
+
+            def one_by_one():
+                group = Group.objects.get(slug='bench-bulk')
+                for item in items:
+                    Post.objects.create(author=author, text=item['text'],
+                                        group=group)
+
+            # The debug toolbar would record and format every statement.
+            @override_settings(DEBUG=False)
+            def bulk():
+                for start in range(0, count, batch):
+                    client.post(reverse('api:bulk_posts'),
+                                items[start:start + batch], format='json')
+
+            for name, func in (('one by one', one_by_one), ('bulk', bulk)):
+                started = time.perf_counter()
+                func()
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f'{name:<11} {count / elapsed:10.0f} '
+                                  f'items/s')
@@ -0,0 +1,70 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from posts import ingest
+from posts.models import Post, User
+
+
+class Command(BaseCommand):
+    help = ('Load test of comment writes: concurrent clients post to '
+            'add_comment and to the batching ingest endpoint. The bench '
+            'user and post are deleted afterwards.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=5)
+
+    def handle(self, *args, **options):
+        user = User.objects.create_user(username='bench_ingest')
+        post = Post.objects.create(author=user, text='Benchmark post')
+        try:
+            # The debug toolbar would record and format every statement.
+            with override_settings(DEBUG=False):
+                for name, url in (
+                        ('add_comment', reverse('post:add_comment',
+                                                args=[post.pk])),
+                        ('ingest', reverse('post:ingest_comment',
+                                           args=[post.pk]))):
+                    self.report(name, *self.run(user, post, url, options))
+        finally:
+            post.delete()
+            user.delete()
+
+    def run(self, user, post, url, options):
+        clients = []
+        for _ in range(options['clients']):
+            client = Client()
+            client.force_login(user)
+            clients.append(client)
+        before = post.comments.count()
+        stop = threading.Event()
+        failures = []
+
+        def send(client):
+            while not stop.is_set():
+                try:
+                    client.post(url, {'text': 'Benchmark comment'})
+                except Exception as error:
+                    failures.append(error)
+
+        workers = [threading.Thread(target=send, args=[client])
+                   for client in clients]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        time.sleep(options['seconds'])
+        stop.set()
+        for worker in workers:
+            worker.join()
+        # Accepted comments count once they are written.
+        ingest.queue().flush()
+        elapsed = time.perf_counter() - started
+        return post.comments.count() - before, len(failures), elapsed
+
+    def report(self, name, written, failures, elapsed):
+        self.stdout.write(f'{name:<12} {written / elapsed:8.0f} comments/s '
+                          f'written, {failures} failed requests')
@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from posts.management.bench import rollback, seed_posts, timeit
+
+METRICS = 'core.metrics.MetricsMiddleware'
+
+
+class Command(BaseCommand):
+    help = ('Measures the overhead of the metrics middleware on the index '
+            'and a post page. Seeded data is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=7)
+
+    def handle(self, *args, **options):
+        requests, repeat = options['requests'], options['repeat']
+        with_metrics = list(settings.MIDDLEWARE)
+        if METRICS not in with_metrics:
+            with_metrics.insert(0, METRICS)
+        without_metrics = [name for name in with_metrics if name != METRICS]
+        with rollback():
+            authors = seed_posts(options['posts'])
+            post = authors[0].posts.latest('pk')
+            client = Client()
+            for url in (reverse('post:index'),
+                        reverse('post:post_detail', args=[post.pk])):
+
+                def run():
+                    for _ in range(requests):
+                        client.get(url)
+
+                times = {}
+                # Interleaved, so drifting load affects both alike.
+                for _ in range(repeat):
+                    for name, middleware in (('off', without_metrics),
+                                             ('on', with_metrics)):
+                        with override_settings(DEBUG=False,
+                                               MIDDLEWARE=middleware):
+                            best = timeit(run, 1) / requests
+                        times[name] = min(times.get(name, best), best)
+                overhead = (times['on'] / times['off'] - 1) * 100
+                self.stdout.write(
+                    f'{url:<20} off {times["off"]:7.2f} ms  '
+                    f'on {times["on"]:7.2f} ms  overhead {overhead:+5.1f}%')
@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+
+from posts.management.bench import rollback, seed_posts, timeit
+from posts.models import Post
+from posts.paginators import CursorPaginator, encode_cursor
+
+
+class Command(BaseCommand):
+    help = ('Compares offset and cursor pagination on the first and '
+            'a deep page. Seeded data is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        per_page = settings.NUM_POSTS_ON_PAGE
+        deep_page = options['page']
+        repeat = options['repeat']
+        with rollback():
+            seed_posts(deep_page * per_page)
+            posts = Post.objects.all()
+            # The last post of the previous page is where a client holding
+            # a cursor token would continue from.
+            anchor = posts.order_by('-pub_date', '-id')[
+                (deep_page - 1) * per_page - 1]
+            token = encode_cursor(anchor)
+
+            def offset(number):
+                return lambda: list(
+                    Paginator(posts, per_page).get_page(number))
+
+            def cursor(after):
+                return lambda: list(
+                    CursorPaginator(posts, per_page).get_page(after=after))
+
+            rows = (
+                ('offset', 1, offset(1)),
+                ('offset', deep_page, offset(deep_page)),
+                ('cursor', 1, cursor(None)),
+                ('cursor', deep_page, cursor(token)),
+            )
+            for mode, number, func in rows:
+                self.stdout.write(
+                    f'{mode:<8} page {number:>7}: '
+                    f'{timeit(func, repeat):8.2f} ms')
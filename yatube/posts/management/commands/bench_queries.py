@@ -0,0 +1,85 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from posts import timeline
+from posts.management.bench import rollback, seed_posts, seed_users, timeit
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+
+INDEXES = (
+    'post_author_pub_date_idx',
+    'post_group_pub_date_idx',
+    'comment_post_pub_date_idx',
+)
+
+
+class Command(BaseCommand):
+    help = ('Seeds a large dataset and prints EXPLAIN QUERY PLAN and timings '
+            'of the listing queries without and with the composite indexes. '
+            'Seeded data is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=200000)
+        parser.add_argument('--comments', type=int, default=50000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('EXPLAIN QUERY PLAN is SQLite specific.')
+        self.repeat = options['repeat']
+        with rollback():
+            queries = self.seed(options['posts'], options['comments'])
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT name, sql FROM sqlite_master WHERE name IN '
+                    f'({", ".join("%s" for _ in INDEXES)})', INDEXES)
+                definitions = cursor.fetchall()
+                for name, _ in definitions:
+                    cursor.execute(f'DROP INDEX "{name}"')
+                self.stdout.write(self.style.MIGRATE_HEADING(
+                    'Without composite indexes'))
+                self.report(queries)
+                for _, sql in definitions:
+                    cursor.execute(sql)
+                cursor.execute('ANALYZE')
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                'With composite indexes'))
+            self.report(queries)
+
+    def seed(self, posts_count, comments_count):
+        per_page = settings.NUM_POSTS_ON_PAGE
+        authors = seed_users(50)
+        Group.objects.bulk_create(
+            Group(title=f'Bench group {number}', slug=f'bench-{number}',
+                  description='') for number in range(20))
+        groups = list(Group.objects.filter(slug__startswith='bench-'))
+        seed_posts(posts_count, authors=authors, groups=groups)
+        reader = authors[0]
+        Follow.objects.bulk_create(
+            Follow(user=reader, author=author) for author in authors[1:11])
+        for author in authors[1:11]:
+            timeline.backfill(reader.pk, author.pk)
+        post = Post.objects.order_by('-pub_date').first()
+        Comment.objects.bulk_create(
+            Comment(post=post, author=reader, text=f'Comment {number}')
+            for number in range(comments_count))
+        return {
+            'index': Post.objects.for_listing()[:per_page],
+            'group_posts': groups[0].posts.for_listing()[:per_page],
+            'profile': authors[1].posts.for_listing()[:per_page],
+            'post_detail': post.comments.all()[:per_page],
+            'follow_index': timeline.feed(reader).for_listing()[:per_page],
+            'timeline_entries': TimelineEntry.objects.filter(
+                user=reader)[:per_page],
+        }
+
+    def report(self, queries):
+        for view, queryset in queries.items():
+            sql, params = queryset.query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                plan = [row[-1] for row in cursor.fetchall()]
+            elapsed = timeit(lambda: list(queryset.all()), self.repeat)
+            self.stdout.write(f'{view:<17} {elapsed:8.2f} ms')
+            for step in plan:
+                self.stdout.write(f'    {step}')
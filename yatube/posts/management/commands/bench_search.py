@@ -0,0 +1,55 @@
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from posts.management.bench import rollback, seed_users, timeit
+from posts.models import Post
+from posts.search import ScanBackend, SQLiteFTSBackend
+
+
+class Command(BaseCommand):
+    help = ('Compares the FTS5 index with a LIKE scan on common, rare and '
+            'two word queries. Seeded data is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000000)
+        parser.add_argument('--words', type=int, default=20000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('The FTS5 index is SQLite specific.')
+        # A Zipf-like vocabulary: word 0 is in most posts, the last ones
+        # in a handful. No word is a substring of another, so both
+        # backends find the same posts.
+        vocabulary = [f'w{number}x' for number in range(options['words'])]
+        weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+        queries = {
+            'common': vocabulary[0],
+            'rare': vocabulary[-1],
+            'two words': f'{vocabulary[1]} {vocabulary[50]}',
+        }
+        with rollback():
+            self.seed(options['posts'], vocabulary, weights)
+            backends = {'fts5': SQLiteFTSBackend(), 'scan': ScanBackend()}
+            for label, query in queries.items():
+                for name, backend in backends.items():
+                    results = backend.search(query)
+                    elapsed = timeit(lambda: (results.backend.count(
+                        results.terms), list(results[:10])),
+                        options['repeat'])
+                    self.stdout.write(
+                        f'{label:<10} {name:<5} {elapsed:10.2f} ms '
+                        f'({results.count()} hits)')
+
+    def seed(self, count, vocabulary, weights, batch_size=5000):
+        rng = random.Random(0)
+        author, = seed_users(1, prefix='bench_author')
+        for start in range(0, count, batch_size):
+            Post.objects.bulk_create(
+                Post(text=' '.join(rng.choices(vocabulary, weights, k=30)),
+                     author=author)
+                for _ in range(start, min(start + batch_size, count)))
+        # bulk_create() sends no signals, so the index is filled at once.
+        SQLiteFTSBackend().rebuild()
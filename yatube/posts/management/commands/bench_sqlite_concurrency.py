@@ -0,0 +1,141 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.sqlite import apply_pragmas
+from posts.models import Comment, Post
+
+# The pre-tuning behaviour: rollback journal, fsync on every commit and
+# Python's default five second lock wait.
+DEFAULT_PRAGMAS = {'journal_mode': 'DELETE', 'synchronous': 'FULL'}
+
+
+class Command(BaseCommand):
+    help = ('Reads the index page while other threads insert comments into '
+            'a scratch SQLite file, once with the default journal mode and '
+            'once with settings.SQLITE_PRAGMAS.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=5)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('This benchmark compares SQLite journal '
+                               'modes.')
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT sql FROM sqlite_master WHERE tbl_name IN (%s, %s) '
+                'AND sql IS NOT NULL ORDER BY type DESC',
+                [Post._meta.db_table, Comment._meta.db_table])
+            self.schema = [row[0] for row in cursor.fetchall()]
+        self.options = options
+        for title, pragmas in (('Default journal', DEFAULT_PRAGMAS),
+                               ('Tuned', settings.SQLITE_PRAGMAS)):
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'bench.sqlite3')
+                self.seed(path, pragmas)
+                self.report(title, self.run(path, pragmas))
+
+    def connect(self, path, pragmas):
+        db = sqlite3.connect(path, isolation_level=None,
+                             check_same_thread=False)
+        apply_pragmas(db.cursor(), pragmas)
+        return db
+
+    def seed(self, path, pragmas):
+        db = self.connect(path, pragmas)
+        for sql in self.schema:
+            db.execute(sql)
+        db.execute('BEGIN')
+        db.executemany(
+            f'INSERT INTO {Post._meta.db_table} '
+            '(text, pub_date, author_id, group_id, image, comments_count) '
+            "VALUES (?, datetime('now', ?), 1, NULL, '', 0)",
+            ((f'Benchmark post {number}', f'-{number} seconds')
+             for number in range(self.options['posts'])))
+        db.execute('COMMIT')
+        db.close()
+
+    def read(self, db):
+        db.execute(f'SELECT * FROM {Post._meta.db_table} '
+                   'ORDER BY pub_date DESC, id DESC LIMIT ?',
+                   [settings.NUM_POSTS_ON_PAGE]).fetchall()
+
+    def write(self, db):
+        db.execute(f'INSERT INTO {Comment._meta.db_table} '
+                   '(post_id, author_id, text, pub_date, path, depth) '
+                   "VALUES (1, 1, 'Comment', datetime('now'), '', 0)")
+
+    def worker(self, path, pragmas, operation, timings, errors, stop):
+        """Repeats ``operation`` until ``stop`` is set.
+
+        Appends the latency of every successful call in milliseconds, or
+        None for a call that failed with "database is locked". Any other
+        failure goes to ``errors``, so a broken statement shows up in the
+        report instead of silently stopping the thread.
+        """
+        db = self.connect(path, pragmas)
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                operation(db)
+            except sqlite3.OperationalError as error:
+                if 'locked' in str(error):
+                    timings.append(None)
+                else:
+                    errors.append(repr(error))
+                continue
+            except Exception as error:
+                errors.append(repr(error))
+                continue
+            timings.append((time.perf_counter() - started) * 1000)
+        db.close()
+
+    def run(self, path, pragmas):
+        stop = threading.Event()
+        reads, writes, errors = [], [], []
+        threads = [
+            threading.Thread(target=self.worker,
+                             args=(path, pragmas, self.read, reads, errors,
+                                   stop))
+            for _ in range(self.options['readers'])
+        ] + [
+            threading.Thread(target=self.worker,
+                             args=(path, pragmas, self.write, writes, errors,
+                                   stop))
+            for _ in range(self.options['writers'])
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(self.options['seconds'])
+        stop.set()
+        for thread in threads:
+            thread.join()
+        return reads, writes, errors
+
+    def report(self, title, result):
+        seconds = self.options['seconds']
+        *timed, errors = result
+        reads, writes = (
+            sorted(timing for timing in timings if timing is not None)
+            for timings in timed)
+        locked = sum(timing is None for timings in timed
+                     for timing in timings)
+        p95 = reads[int(len(reads) * 0.95)] if reads else 0
+        self.stdout.write(self.style.MIGRATE_HEADING(title))
+        self.stdout.write(
+            f'    reads/s {len(reads) / seconds:10.1f}   p95 {p95:7.2f} ms\n'
+            f'    writes/s {len(writes) / seconds:9.1f}   '
+            f'locked errors {locked}')
+        for message, count in Counter(errors).most_common():
+            self.stdout.write(self.style.ERROR(f'    {count} x {message}'))
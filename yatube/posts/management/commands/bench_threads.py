@@ -0,0 +1,71 @@
+import random
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+
+from posts import threads
+from posts.management.bench import rollback, seed_posts, timeit
+from posts.models import Comment
+
+
+class Command(BaseCommand):
+    help = ('Reads a thread of --size comments as one range query and '
+            'node by node, once as a single chain of replies and once as '
+            'a random tree. Seeded data is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        size, repeat = options['size'], options['repeat']
+        with rollback():
+            author = seed_posts(2)[0]
+            posts = list(author.posts.all())
+            shapes = (
+                ('chain', lambda number: number - 1),
+                ('random tree', lambda number: random.randrange(number)),
+            )
+            for post, (shape, pick_parent) in zip(posts, shapes):
+                root = self.seed_thread(post, author, size, pick_parent)
+                depth = threads.subtree(root).aggregate(
+                    Max('depth'))['depth__max']
+                self.stdout.write(
+                    f'{shape}: {size} comments, depth {depth} '
+                    f'(capped at {settings.COMMENT_MAX_DEPTH})')
+                rows = (
+                    ('range query', lambda: list(threads.subtree(root))),
+                    ('node by node', lambda: self.walk(root)),
+                    ('first replies', lambda: threads.attach_replies(
+                        [root], settings.COMMENT_THREAD_REPLIES)),
+                )
+                for name, func in rows:
+                    self.stdout.write(
+                        f'  {name:<14} {timeit(func, repeat):9.2f} ms')
+
+    @staticmethod
+    def seed_thread(post, author, size, pick_parent):
+        """Bulk inserts a thread, choosing the parent of every reply."""
+        start = (Comment.objects.aggregate(Max('pk'))['pk__max'] or 0) + 1
+        comments = [Comment(pk=start + number, post=post, author=author,
+                            text=f'Benchmark comment {number}')
+                    for number in range(size)]
+        parents = {}
+        for number, comment in enumerate(comments):
+            if number:
+                comment.parent_id = comments[pick_parent(number)].pk
+            threads.place([comment], parents)
+            parents[comment.pk] = (comment.path, comment.depth)
+        Comment.objects.bulk_create(comments, batch_size=threads.BATCH_SIZE)
+        return comments[0]
+
+    @staticmethod
+    def walk(root):
+        """What the tree costs without paths: a query per comment."""
+        found, pending = [], [root.pk]
+        while pending:
+            children = list(Comment.objects.filter(parent_id=pending.pop()))
+            found += children
+            pending += [child.pk for child in children]
+        return found
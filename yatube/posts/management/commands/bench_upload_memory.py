@@ -0,0 +1,87 @@
+import threading
+import tracemalloc
+from io import BytesIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.test.utils import override_settings
+from PIL import Image
+
+from posts.forms import PostForm
+
+MB = 1024 * 1024
+
+# Uploads kept in memory whole, which is what the limits replace.
+BUFFERED = {
+    'FILE_UPLOAD_HANDLERS': [
+        'django.core.files.uploadhandler.MemoryFileUploadHandler'],
+    'FILE_UPLOAD_MAX_MEMORY_SIZE': 1024 * MB,
+}
+
+
+class Command(BaseCommand):
+    help = ('Parses and validates large image uploads in parallel threads '
+            'and prints the peak memory allocated by Python while doing '
+            'so, with uploads buffered in memory and with the streaming '
+            'handlers.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=50,
+                            help='Approximate image size in megabytes.')
+        parser.add_argument('--parallel', type=int, default=4)
+
+    def handle(self, *args, **options):
+        body = self.build_body(options['size'])
+        self.stdout.write(f'{options["parallel"]} parallel uploads of '
+                          f'{len(body) / MB:.1f} MB')
+        scenarios = (
+            ('Buffered in memory', {
+                **BUFFERED, 'POST_IMAGE_MAX_BYTES': 1024 * MB}),
+            ('Streaming, within the limit', {
+                'POST_IMAGE_MAX_BYTES': 1024 * MB}),
+            ('Streaming, over the limit', {}),
+        )
+        for title, overrides in scenarios:
+            with override_settings(**overrides):
+                peak, results = self.run(body, options['parallel'])
+            self.stdout.write(self.style.MIGRATE_HEADING(title))
+            self.stdout.write(f'    peak {peak / MB:8.1f} MB   '
+                              f'valid {results.count(True)}/{len(results)}')
+
+    def build_body(self, size):
+        # Uncompressed BMP, so the file is as large as the pixel data.
+        side = int((size * MB / 3) ** 0.5)
+        buffer = BytesIO()
+        Image.linear_gradient('L').resize((side, side)).convert('RGB').save(
+            buffer, 'BMP')
+        image = SimpleUploadedFile('large.bmp', buffer.getvalue(),
+                                   content_type='image/bmp')
+        return encode_multipart(BOUNDARY, {'text': 'Пост', 'image': image})
+
+    def run(self, body, parallel):
+        factory = RequestFactory()
+        # Request bodies are allocated before tracing starts, only the
+        # parsing and validation is measured.
+        requests = [factory.generic('POST', '/create/', body,
+                                    content_type=MULTIPART_CONTENT)
+                    for _ in range(parallel)]
+        results = []
+
+        def upload(request):
+            form = PostForm(request.POST, files=request.FILES)
+            results.append(form.is_valid())
+            for upload in request.FILES.values():
+                upload.close()
+
+        threads = [threading.Thread(target=upload, args=[request])
+                   for request in requests]
+        tracemalloc.start()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak, results
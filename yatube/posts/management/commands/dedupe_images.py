@@ -0,0 +1,55 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from posts.cache import bump_content_version
+from posts.models import ImageBlob, Post, image_storage
+from posts.storage import content_digest
+
+
+class Command(BaseCommand):
+    help = ('Records post images in the deduplicating storage, pointing '
+            'posts with identical images at a single file and deleting the '
+            'other copies.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only report the duplicates that would be merged.')
+
+    def handle(self, *args, **options):
+        references = dict(
+            Post.objects.exclude(image='').order_by().values_list('image')
+            .annotate(posts=Count('id')))
+        by_digest = defaultdict(list)
+        for name in sorted(references):
+            if not image_storage.exists(name):
+                continue
+            with image_storage.open(name) as content:
+                by_digest[content_digest(content)].append(name)
+        duplicates, freed = 0, 0
+        for digest, names in by_digest.items():
+            keep, copies = names[0], names[1:]
+            for name in copies:
+                freed += image_storage.size(name)
+                self.stdout.write(f'{name} -> {keep}')
+            duplicates += len(copies)
+            if options['dry_run']:
+                continue
+            with transaction.atomic():
+                Post.objects.filter(image__in=copies).update(image=keep)
+                ImageBlob.objects.filter(name__in=copies).delete()
+                ImageBlob.objects.update_or_create(digest=digest, defaults={
+                    'name': keep,
+                    'refs': sum(references[name] for name in names),
+                })
+            for name in copies:
+                # Untracked now, so this removes the file itself.
+                image_storage.delete(name)
+        if duplicates and not options['dry_run']:
+            bump_content_version()
+        action = 'found' if options['dry_run'] else 'merged'
+        self.stdout.write(self.style.SUCCESS(
+            f'{duplicates} duplicate files {action}, {freed} bytes.'))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Recounts denormalized post, comment and follow counters.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only report drifted counters and exit with an error.')
+
+    def handle(self, *args, **options):
+        check = options['check']
+        with transaction.atomic():
+            drift = counters.rebuild(fix=not check)
+        for kind, pk, field, stored, actual in drift:
+            self.stdout.write(
+                f'{kind} {pk}: {field} stored={stored} actual={actual}')
+        if check and drift:
+            raise CommandError(f'{len(drift)} counters have drifted.')
+        action = 'found' if check else 'fixed'
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(drift)} drifted counters {action}.'))
@@ -0,0 +1,76 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Exists, OuterRef
+
+from posts import thumbnails, variants
+from posts.models import Post, PostImageVariant
+
+logger = logging.getLogger(__name__)
+
+
+def _build_variants(post_id, name):
+    try:
+        variants.build(post_id, name)
+    except Exception:
+        logger.exception('Image variants failed for %s', name)
+
+
+def _run(job):
+    try:
+        job()
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = ('Loads the thumbnails of all post images into the thumbnail '
+            'cache. Images without one get the whole upload job: the '
+            'downscaling, the thumbnail and the srcset variants; the others '
+            'get the variants when they have none.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch', type=int, default=500)
+        parser.add_argument('--workers', type=int,
+                            default=settings.THUMBNAIL_WORKERS)
+
+    def handle(self, *args, **options):
+        posts = (Post.objects.exclude(image='').order_by('pk')
+                 .only('image').annotate(has_variants=Exists(
+                     PostImageVariant.objects.filter(post=OuterRef('pk')))))
+        cached, missing, bare = 0, [], []
+        last_pk = 0
+        while True:
+            # Each batch is one lookup, which also fills the cache.
+            batch = list(posts.filter(pk__gt=last_pk)[:options['batch']]
+                         .with_thumbnails())
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            for post in batch:
+                job = (post.pk, post.image.name)
+                if post.prefetched_thumbnail is None:
+                    # Also the uploads whose job the full pool dropped.
+                    missing.append(job)
+                else:
+                    cached += 1
+                    # Animated images never get variants and are tried
+                    # again.
+                    if not post.has_variants:
+                        bare.append(job)
+        jobs = [partial(thumbnails.process, *job)
+                for job in missing]
+        jobs += [partial(_build_variants, *job) for job in bare]
+        if options['workers'] > 1:
+            with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+                list(pool.map(_run, jobs))
+        else:
+            for job in jobs:
+                job()
+        self.stdout.write(self.style.SUCCESS(
+            f'{cached} thumbnails cached, {len(missing)} generated, '
+            f'{len(bare)} more got variants.'))
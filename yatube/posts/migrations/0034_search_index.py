@@ -0,0 +1,30 @@
+from django.db import migrations
+
+
+def create_index(apps, schema_editor):
+    # The FTS5 index is SQLite specific, other databases use a scan.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE posts_search USING fts5("
+        "text, tokenize = 'unicode61 remove_diacritics 2')")
+    schema_editor.execute(
+        'INSERT INTO posts_search (rowid, text) '
+        'SELECT id * 2, text FROM posts_post '
+        'UNION ALL SELECT id * 2 + 1, text FROM posts_comment')
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS posts_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0033_image_blobs'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 2.2.16 on 2026-10-18 21:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def root_paths(apps, schema_editor):
+    # Every existing comment starts a thread of its own: its path is its
+    # id as a seven-digit base36 segment, the format of posts.threads.
+    Comment = apps.get_model('posts', 'Comment')
+    digits = '0123456789abcdefghijklmnopqrstuvwxyz'
+    comments = list(Comment.objects.only('pk'))
+    for comment in comments:
+        pk, path = comment.pk, ''
+        while pk:
+            pk, digit = divmod(pk, 36)
+            path = digits[digit] + path
+        comment.path = path.rjust(7, '0')
+    Comment.objects.bulk_update(comments, ['path'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0034_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Глубина'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='replies', to='posts.Comment', verbose_name='Ответ на комментарий'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(default='', editable=False, max_length=255, verbose_name='Путь в ветке'),
+        ),
+        migrations.RunPython(root_paths, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'path'], name='comment_post_path_idx'),
+        ),
+    ]
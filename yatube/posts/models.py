@@ -1,8 +1,26 @@
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models.query import ModelIterable
 
 from core.core.models import CreatedModel
 
+from .storage import DeduplicatingStorage
+
+
+class AtomicSaveMixin:
+    """Saves the row in one transaction with the post_save receivers.
+
+    They move the counters, timelines and threads, which then commit or
+    roll back together with the row. Deletions already run the post_delete
+    receivers inside the transaction of the delete.
+    """
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(
+            type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+
 
 class Group(models.Model):
     """Description of the Group model."""
@@ -10,6 +28,8 @@ class Group(models.Model):
     slug = models.SlugField(max_length=200, unique=True, verbose_name="URL",
                             null=True, blank=True)
     description = models.TextField()
+    posts_count = models.PositiveIntegerField('Количество постов',
+                                              default=0, editable=False)
 
     class Meta:
         """Performs sorting."""
@@ -23,8 +43,72 @@ class Group(models.Model):
 User = get_user_model()
 """Accessing the User model."""
 
+image_storage = DeduplicatingStorage()
+
+
+class ImageBlob(models.Model):
+    """Stored image file shared by every post with the same content."""
+    digest = models.CharField('SHA-256', max_length=64, unique=True)
+    name = models.CharField('Файл', max_length=255, unique=True)
+    refs = models.PositiveIntegerField('Количество ссылок', default=1)
+
+    class Meta:
+        verbose_name = 'Файл картинки'
+        verbose_name_plural = 'Файлы картинок'
+
+    def __str__(self):
+        return self.name
+
+
+class PostQuerySet(models.QuerySet):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._prefetch_thumbnails = False
+
+    def _clone(self):
+        clone = super()._clone()
+        clone._prefetch_thumbnails = self._prefetch_thumbnails
+        return clone
+
+    def _fetch_all(self):
+        fetched = self._result_cache is None
+        super()._fetch_all()
+        if (fetched and self._prefetch_thumbnails
+                and self._iterable_class is ModelIterable):
+            # Imported here, the thumbnails module needs the models.
+            from .thumbnails import prefetch
+            prefetch(self._result_cache)
 
-class Post(CreatedModel):
+    def with_thumbnails(self):
+        """Looks the thumbnails of the fetched posts up in one batch."""
+        clone = self._chain()
+        clone._prefetch_thumbnails = True
+        return clone
+
+    def for_listing(self):
+        """Loads posts together with everything the listing templates use.
+
+        Authors and groups come in the same query, and only the columns
+        rendered by posts/includes/post_list.html are selected. Image
+        variants for srcset take one more query for the whole page, and so
+        do their thumbnails when the cache does not have them yet.
+        """
+        return self.select_related('author', 'group').only(
+            'text', 'pub_date', 'image', 'author', 'group',
+            'author__username', 'author__first_name', 'author__last_name',
+            'group__slug',
+        ).prefetch_related('image_variants').with_thumbnails()
+
+
+class CommentQuerySet(models.QuerySet):
+    def for_listing(self):
+        """Loads comments with the username of their authors in one query."""
+        return self.select_related('author').only(
+            'text', 'pub_date', 'post', 'parent', 'path', 'depth', 'author',
+            'author__username')
+
+
+class Post(AtomicSaveMixin, CreatedModel):
     """Description of the Post model."""
     text = models.TextField('Текст поста', help_text='Напишите текст поста')
     author = models.ForeignKey(
@@ -38,38 +122,100 @@ class Post(CreatedModel):
                               verbose_name='Группа поста')
     image = models.ImageField(
         'Картинка',
-        upload_to='posts/',
+        upload_to='posts/', storage=image_storage,
         blank=True, help_text='Выберите изображение для поста',
     )
 
+    comments_count = models.PositiveIntegerField('Количество комментариев',
+                                                 default=0, editable=False)
+
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         """Performs sorting."""
         ordering = ['-pub_date']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'],
+                         name='post_pub_date_id_idx'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='post_group_pub_date_idx'),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered to move the group counter when the post is edited.
+        instance._loaded_group_id = instance.__dict__.get('group_id')
+        # And to release the previous file when the image is replaced.
+        instance._loaded_image = instance.__dict__.get('image')
+        return instance
+
+
+class PostImageVariant(models.Model):
+    """Resized and re-encoded copy of a post image used in srcset."""
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name='image_variants')
+    format = models.CharField('Формат', max_length=10)
+    width = models.PositiveSmallIntegerField('Ширина')
+    file = models.FileField('Файл', upload_to='posts/variants/')
+
+    class Meta:
+        ordering = ['format', 'width']
+        verbose_name = 'Вариант картинки'
+        verbose_name_plural = 'Варианты картинок'
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'format', 'width'],
+                                    name='unique_post_image_variant')
+        ]
+
+    def __str__(self):
+        return f'{self.post_id} {self.format} {self.width}w'
+
 
-class Comment(CreatedModel):
+class Comment(AtomicSaveMixin, CreatedModel):
     post = models.ForeignKey(Post, on_delete=models.CASCADE,
                              related_name='comments')
     author = models.ForeignKey(User, on_delete=models.CASCADE,
                                related_name='comments')
     text = models.TextField('Текст', help_text='Текст нового комментария')
+    parent = models.ForeignKey('self', on_delete=models.CASCADE,
+                               related_name='replies', blank=True, null=True,
+                               verbose_name='Ответ на комментарий')
+    # Set by posts.threads once the comment has an id.
+    path = models.CharField('Путь в ветке', max_length=255, default='',
+                            editable=False)
+    depth = models.PositiveSmallIntegerField('Глубина', default=0,
+                                             editable=False)
+    # Given by posts.ingest to the comments it queues.
+    ingest_id = models.UUIDField(blank=True, null=True, unique=True,
+                                 editable=False)
+
+    objects = CommentQuerySet.as_manager()
 
     class Meta:
         """Performs sorting."""
         ordering = ['-pub_date']
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(fields=['post', '-pub_date', '-id'],
+                         name='comment_post_pub_date_idx'),
+            models.Index(fields=['post', 'path'],
+                         name='comment_post_path_idx'),
+        ]
 
     def __str__(self):
         return self.text
 
 
-class Follow(models.Model):
+class Follow(AtomicSaveMixin, models.Model):
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -89,3 +235,54 @@ class Follow(models.Model):
             models.UniqueConstraint(fields=['user', 'author'],
                                     name='unique_follow')
         ]
+
+
+class TimelineEntry(models.Model):
+    """Post delivered to a follower's feed when it is published."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+    pub_date = models.DateTimeField('Дата публикации поста')
+
+    class Meta:
+        """Performs sorting."""
+        ordering = ['-pub_date']
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='unique_timeline_entry')
+        ]
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-post'],
+                         name='timeline_user_pub_date_idx'),
+        ]
+
+
+class UserStats(models.Model):
+    """Counters of a user maintained on every write."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    posts_count = models.PositiveIntegerField('Количество постов', default=0)
+    followers_count = models.PositiveIntegerField('Количество подписчиков',
+                                                  default=0)
+    following_count = models.PositiveIntegerField('Количество подписок',
+                                                  default=0)
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+    def __str__(self):
+        return str(self.user_id)
@@ -0,0 +1,112 @@
+import base64
+import binascii
+
+from django.core.paginator import Page
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidCursor(Exception):
+    """The cursor token could not be decoded."""
+
+
+def encode_cursor(obj):
+    """Packs the (pub_date, id) position of an object into a URL-safe token."""
+    raw = f'{obj.pub_date.isoformat()}|{obj.pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Unpacks a token produced by encode_cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        pub_date, pk = raw.decode().split('|')
+        pub_date, pk = parse_datetime(pub_date), int(pk)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise InvalidCursor(token)
+    if pub_date is None:
+        raise InvalidCursor(token)
+    return pub_date, pk
+
+
+class CursorPage(Page):
+    """Page of a keyset paginator.
+
+    Has no number and no total count, only tokens of the neighbour pages.
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, next_cursor, previous_cursor):
+        super().__init__(object_list, None, paginator)
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<Cursor page>'
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class CursorPaginator:
+    """Keyset paginator over (pub_date, id).
+
+    Every page is a single indexed range query, so the cost does not grow
+    with the depth of the page and no COUNT(*) is needed.
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, per_page):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+
+    def get_page(self, after=None, before=None):
+        """Returns a page, falling back to the first one on a bad token."""
+        try:
+            if before:
+                return self._page_before(decode_cursor(before))
+            if after:
+                return self._page_after(decode_cursor(after))
+        except InvalidCursor:
+            pass
+        return self._page_after(None)
+
+    def _page_after(self, position):
+        queryset = self.object_list.order_by('-pub_date', '-id')
+        if position is not None:
+            pub_date, pk = position
+            queryset = queryset.filter(
+                Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk),
+                pub_date__lte=pub_date,
+            )
+        items = list(queryset[:self.per_page + 1])
+        has_more = len(items) > self.per_page
+        items = items[:self.per_page]
+        return CursorPage(
+            items, self,
+            next_cursor=encode_cursor(items[-1]) if has_more else None,
+            previous_cursor=(
+                encode_cursor(items[0])
+                if position is not None and items else None
+            ),
+        )
+
+    def _page_before(self, position):
+        pub_date, pk = position
+        queryset = self.object_list.order_by('pub_date', 'id').filter(
+            Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, pk__gt=pk),
+            pub_date__gte=pub_date,
+        )
+        items = list(queryset[:self.per_page + 1])
+        has_more = len(items) > self.per_page
+        items = items[:self.per_page][::-1]
+        if not items:
+            return self._page_after(None)
+        return CursorPage(
+            items, self,
+            next_cursor=encode_cursor(items[-1]),
+            previous_cursor=encode_cursor(items[0]) if has_more else None,
+        )
@@ -0,0 +1,220 @@
+"""Full-text search over posts and comments.
+
+SQLiteFTSBackend keeps an FTS5 index with BM25 ranking and highlighted
+snippets. Other databases use ScanBackend, a LIKE scan ordered by date,
+until they get an index of their own in SEARCH_BACKENDS. The index is kept
+in sync by the model signals; rebuild() fills it from scratch.
+"""
+import re
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import connection
+from django.utils.functional import cached_property
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+from django.utils.safestring import mark_safe
+
+from .models import Comment, Post
+
+TABLE = 'posts_search'
+# Posts and comments share the index: a post has rowid 2 * id and a
+# comment 2 * id + 1.
+POST, COMMENT = 0, 1
+# Control characters cannot come from the text, so they mark the matches
+# until the snippet is escaped.
+MARK_START, MARK_END = '\x02', '\x03'
+WORD = re.compile(r'\w+')
+
+
+@dataclass
+class Hit:
+    kind: str
+    obj: object
+    snippet: str
+
+    @property
+    def post(self):
+        return self.obj if self.kind == 'post' else self.obj.post
+
+
+def terms(query):
+    return WORD.findall(query.lower())[:10]
+
+
+def highlight(snippet):
+    """Escapes a snippet and turns the match markers into <mark> tags."""
+    return mark_safe(escape(snippet).replace(MARK_START, '<mark>')
+                     .replace(MARK_END, '</mark>'))
+
+
+class Results:
+    """Lazy ranked results that Paginator can slice and count."""
+
+    def __init__(self, backend, query):
+        self.backend = backend
+        self.terms = terms(query)
+
+    def count(self):
+        if not self.terms:
+            return 0
+        return self._count
+
+    @cached_property
+    def _count(self):
+        return self.backend.count(self.terms)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        if not self.terms:
+            return []
+        start = index.start or 0
+        return self.backend.hits(self.terms, start, index.stop - start)
+
+
+class SearchBackend:
+    def search(self, query):
+        return Results(self, query)
+
+    def count(self, terms):
+        raise NotImplementedError
+
+    def hits(self, terms, offset, limit):
+        raise NotImplementedError
+
+    def index(self, obj):
+        pass
+
+    def index_many(self, objs):
+        for obj in objs:
+            self.index(obj)
+
+    def remove(self, obj):
+        pass
+
+    def rebuild(self):
+        pass
+
+    @staticmethod
+    def resolve(keys):
+        """Loads (kind, pk, snippet) keys as hits, keeping their order."""
+        post_ids = [pk for kind, pk, _ in keys if kind == POST]
+        comment_ids = [pk for kind, pk, _ in keys if kind == COMMENT]
+        objects = {
+            POST: Post.objects.for_listing().in_bulk(post_ids),
+            COMMENT: Comment.objects.select_related(
+                'author', 'post').in_bulk(comment_ids),
+        }
+        return [Hit('post' if kind == POST else 'comment',
+                    objects[kind][pk], highlight(snippet))
+                for kind, pk, snippet in keys if pk in objects[kind]]
+
+
+class SQLiteFTSBackend(SearchBackend):
+    @staticmethod
+    def match(terms):
+        # Every term is quoted, so nothing the user types is FTS5 syntax.
+        # The last one also matches as a prefix, for search-as-you-type.
+        quoted = [f'"{term}"' for term in terms]
+        quoted[-1] += '*'
+        return ' '.join(quoted)
+
+    def count(self, terms):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM {TABLE} '
+                           f'WHERE {TABLE} MATCH %s', [self.match(terms)])
+            return cursor.fetchone()[0]
+
+    def hits(self, terms, offset, limit):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid, snippet({TABLE}, 0, %s, %s, %s, 16) '
+                f'FROM {TABLE} WHERE {TABLE} MATCH %s '
+                f'ORDER BY bm25({TABLE}) LIMIT %s OFFSET %s',
+                [MARK_START, MARK_END, '…', self.match(terms),
+                 limit, offset])
+            rows = cursor.fetchall()
+        return self.resolve([(rowid % 2, rowid // 2, snippet)
+                             for rowid, snippet in rows])
+
+    @staticmethod
+    def rowid(obj):
+        return obj.pk * 2 + (COMMENT if isinstance(obj, Comment) else POST)
+
+    def index(self, obj):
+        rowid = self.rowid(obj)
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [rowid])
+            cursor.execute(f'INSERT INTO {TABLE} (rowid, text) '
+                           'VALUES (%s, %s)', [rowid, obj.text])
+
+    def index_many(self, objs, batch_size=400):
+        objs = list(objs)
+        with connection.cursor() as cursor:
+            for start in range(0, len(objs), batch_size):
+                batch = objs[start:start + batch_size]
+                rowids = [self.rowid(obj) for obj in batch]
+                cursor.execute(
+                    f'DELETE FROM {TABLE} WHERE rowid IN '
+                    f'({", ".join(["%s"] * len(batch))})', rowids)
+                cursor.execute(
+                    f'INSERT INTO {TABLE} (rowid, text) VALUES '
+                    + ', '.join(['(%s, %s)'] * len(batch)),
+                    [value for rowid, obj in zip(rowids, batch)
+                     for value in (rowid, obj.text)])
+
+    def remove(self, obj):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s',
+                           [self.rowid(obj)])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {TABLE}')
+            cursor.execute(
+                f'INSERT INTO {TABLE} (rowid, text) '
+                f'SELECT id * 2, text FROM {Post._meta.db_table} '
+                f'UNION ALL '
+                f'SELECT id * 2 + 1, text FROM {Comment._meta.db_table}')
+            cursor.execute(f"INSERT INTO {TABLE} ({TABLE}) "
+                           "VALUES ('optimize')")
+
+
+class ScanBackend(SearchBackend):
+    """Unindexed fallback: every term must occur, newest first."""
+
+    @staticmethod
+    def querysets(terms):
+        posts, comments = Post.objects.all(), Comment.objects.all()
+        for term in terms:
+            posts = posts.filter(text__icontains=term)
+            comments = comments.filter(text__icontains=term)
+        return posts, comments
+
+    def count(self, terms):
+        posts, comments = self.querysets(terms)
+        return posts.count() + comments.count()
+
+    def hits(self, terms, offset, limit):
+        posts, comments = self.querysets(terms)
+        newest = sorted(
+            [(pub_date, POST, pk, text) for pk, pub_date, text in
+             posts.values_list('pk', 'pub_date', 'text')[:offset + limit]]
+            + [(pub_date, COMMENT, pk, text) for pk, pub_date, text in
+               comments.values_list('pk', 'pub_date', 'text')
+               [:offset + limit]],
+            reverse=True)[offset:offset + limit]
+        pattern = re.compile('|'.join(map(re.escape, terms)), re.IGNORECASE)
+        return self.resolve([
+            (kind, pk, pattern.sub(
+                lambda match: MARK_START + match[0] + MARK_END, text[:300]))
+            for _, kind, pk, text in newest])
+
+
+def backend():
+    return import_string(settings.SEARCH_BACKENDS.get(
+        connection.vendor, 'posts.search.ScanBackend'))()
@@ -0,0 +1,134 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import conditional, counters, search, threads, timeline
+from .cache import bump_content_version
+from .models import (Comment, Follow, Group, Post, PostImageVariant, User,
+                     UserStats)
+
+
+@receiver(post_save, sender=User)
+def create_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_pages(sender, **kwargs):
+    bump_content_version()
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def touch_post_pages(sender, instance, **kwargs):
+    # Runs before deliver_post, which forgets the previous group.
+    conditional.touch(conditional.post_scopes(
+        instance, getattr(instance, '_loaded_group_id', None)))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def touch_group_pages(sender, instance, **kwargs):
+    conditional.touch([f'group:{instance.pk}'])
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def touch_comment_pages(sender, instance, **kwargs):
+    conditional.touch([f'post:{instance.post_id}'])
+
+
+@receiver(post_save, sender=Post)
+def deliver_post(sender, instance, created, **kwargs):
+    """Puts a new post into the followers' timelines."""
+    counters.post_saved(instance, created)
+    if created:
+        timeline.fan_out(instance)
+
+
+@receiver(post_delete, sender=Post)
+def forget_post(sender, instance, **kwargs):
+    counters.post_deleted(instance)
+
+
+@receiver(post_save, sender=Post)
+def drop_replaced_variants(sender, instance, created, **kwargs):
+    # Runs before release_replaced_image, which forgets the previous image.
+    previous = getattr(instance, '_loaded_image', None)
+    if not created and previous and previous != instance.image.name:
+        PostImageVariant.objects.filter(post=instance).delete()
+
+
+@receiver(pre_save, sender=Post)
+def note_uploaded_image(sender, instance, **kwargs):
+    # An upload of content already stored keeps the name but takes a
+    # reference of its own, so the previous one has to be released too.
+    instance._image_uploaded = (bool(instance.image)
+                                and not instance.image._committed)
+
+
+@receiver(post_save, sender=Post)
+def release_replaced_image(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_loaded_image', None)
+    replaced = (previous != instance.image.name
+                or getattr(instance, '_image_uploaded', False))
+    if not created and previous and replaced:
+        instance.image.storage.release(previous)
+    instance._loaded_image = instance.image.name
+
+
+@receiver(post_delete, sender=Post)
+def release_image(sender, instance, **kwargs):
+    if instance.image:
+        instance.image.storage.release(instance.image.name)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Comment)
+def index_text(sender, instance, **kwargs):
+    search.backend().index(instance)
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Comment)
+def unindex_text(sender, instance, **kwargs):
+    search.backend().remove(instance)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, **kwargs):
+    if created:
+        counters.comment_changed(instance, 1)
+
+
+@receiver(post_save, sender=Comment)
+def place_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        threads.save_paths([instance])
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    counters.comment_changed(instance, -1)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def touch_follow_buttons(sender, instance, **kwargs):
+    conditional.touch([conditional.follows_scope(instance.user_id)])
+
+
+@receiver(post_save, sender=Follow)
+def fill_timeline(sender, instance, created, **kwargs):
+    if created:
+        counters.follow_changed(instance, 1)
+        timeline.follow(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def clear_timeline(sender, instance, **kwargs):
+    counters.follow_changed(instance, -1)
+    timeline.unfollow(instance.user_id, instance.author_id)
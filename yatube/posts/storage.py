@@ -0,0 +1,75 @@
+"""Deduplicating storage for post images.
+
+Every stored file is recorded in ImageBlob by the SHA-256 of its content.
+Saving content that is already stored returns the existing name and bumps
+its reference count instead of writing another copy, so re-uploads also
+share their sorl thumbnails. A file is removed only when its last reference
+is released.
+"""
+import hashlib
+
+from django.apps import apps
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+
+
+def content_digest(content):
+    """SHA-256 of a file, taken from the upload handler when it has one."""
+    digest = getattr(content, 'sha256', None)
+    if digest:
+        return digest
+    sha256 = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks():
+        sha256.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return sha256.hexdigest()
+
+
+class DeduplicatingStorage(FileSystemStorage):
+    @property
+    def blobs(self):
+        return apps.get_model('posts', 'ImageBlob').objects
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        digest = content_digest(content)
+        with transaction.atomic():
+            blob = self.blobs.select_for_update().filter(
+                digest=digest).first()
+            if blob is not None and self.exists(blob.name):
+                self.blobs.filter(pk=blob.pk).update(refs=F('refs') + 1)
+                return blob.name
+            name = super().save(name, content, max_length)
+            self.blobs.update_or_create(
+                digest=digest, defaults={'name': name, 'refs': 1})
+        return name
+
+    def release(self, name):
+        """Drops one reference to ``name``, deleting the last one's file.
+
+        Files not stored through this class are left alone.
+        """
+        with transaction.atomic():
+            blob = self.blobs.select_for_update().filter(name=name).first()
+            if blob is None:
+                return
+            if blob.refs > 1:
+                self.blobs.filter(pk=blob.pk).update(refs=F('refs') - 1)
+                return
+            blob.delete()
+            transaction.on_commit(lambda: super(
+                DeduplicatingStorage, self).delete(name))
+
+    def delete(self, name):
+        if self.blobs.filter(name=name).exists():
+            self.release(name)
+        else:
+            super().delete(name)
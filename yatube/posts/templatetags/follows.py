@@ -0,0 +1,11 @@
+from django import template
+
+from posts import follows as follow_state
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def follows(context, author):
+    """Подписан ли посетитель на автора; страница проверяется разом."""
+    return follow_state.for_request(context['request']).follows(author.pk)
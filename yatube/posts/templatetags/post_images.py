@@ -0,0 +1,39 @@
+from django import template
+from django.conf import settings
+
+from posts import thumbnails
+from posts.variants import FORMATS
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_image_url(image):
+    """Адрес миниатюры, а пока её нет — адрес исходной картинки."""
+    if not image:
+        return ''
+    thumbnail = thumbnails.cached(image)
+    return thumbnail.url if thumbnail else image.url
+
+
+@register.inclusion_tag('posts/includes/post_picture.html')
+def post_picture(post):
+    """Картинка поста с srcset по всем готовым вариантам."""
+    srcsets = {}
+    for variant in post.image_variants.all():
+        srcsets.setdefault(variant.format, []).append(
+            f'{variant.file.url} {variant.width}w')
+    fallback = srcsets.pop('jpeg', [])
+    sources = [{'type': FORMATS[name][1], 'srcset': ', '.join(srcsets[name])}
+               for name in FORMATS if name in srcsets]
+    if hasattr(post, 'prefetched_thumbnail'):
+        thumbnail = post.prefetched_thumbnail
+        src = thumbnail.url if thumbnail else post.image.url
+    else:
+        src = post_image_url(post.image)
+    return {
+        'src': src,
+        'srcset': ', '.join(fallback),
+        'sources': sources,
+        'sizes': settings.POST_IMAGE_SIZES,
+    }
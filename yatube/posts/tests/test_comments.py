@@ -0,0 +1,115 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+@override_settings(NUM_COMMENTS_ON_PAGE=5)
+class CommentPagesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+        authors = [User.objects.create_user(username=f'commenter_{i}')
+                   for i in range(12)]
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=author, text=f'Комментарий {i}')
+            for i, author in enumerate(authors))
+        cls.newest_first = list(
+            cls.post.comments.order_by('-pub_date', '-id').values_list(
+                'text', flat=True))
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def texts(self, page):
+        return [comment.text for comment in page]
+
+    def test_post_page_shows_first_comments(self):
+        """На странице поста только первые комментарии, новые сверху."""
+        response = self.client.get(
+            reverse('post:post_detail', args=[self.post.pk]))
+        comments = response.context['comments']
+        self.assertEqual(self.texts(comments), self.newest_first[:5])
+        self.assertContains(
+            response, reverse('post:post_comments', args=[self.post.pk]))
+
+    def test_comments_render_once(self):
+        """Каждый комментарий и форма выводятся на странице один раз."""
+        response = self.client.get(
+            reverse('post:post_detail', args=[self.post.pk]))
+        content = response.content.decode()
+        for text in self.newest_first[:5]:
+            with self.subTest(text=text):
+                self.assertEqual(content.count(f'<p>{text}</p>'), 1)
+        self.assertEqual(content.count('</form>'),
+                         content.count('<form'))
+        self.assertEqual(content.count('type="submit"'), 1)
+
+    def test_fragment_continues_after_cursor(self):
+        """Фрагмент отдаёт следующие комментарии до последнего."""
+        url = reverse('post:post_comments', args=[self.post.pk])
+        seen, after = [], ''
+        for _ in range(3):
+            response = self.client.get(url, {'after': after})
+            self.assertTemplateUsed(response, 'posts/includes/comments.html')
+            self.assertTemplateNotUsed(response, 'base.html')
+            comments = response.context['comments']
+            seen += self.texts(comments)
+            after = comments.next_cursor
+        self.assertIsNone(after)
+        self.assertEqual(seen, self.newest_first)
+
+    def test_query_count_does_not_grow_with_comments(self):
+        """Авторы комментариев загружаются тем же запросом."""
+        url = reverse('post:post_comments', args=[self.post.pk])
+        counts = []
+        for per_page in (2, 10):
+            with override_settings(NUM_COMMENTS_ON_PAGE=per_page):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+            self.assertEqual(len(response.context['comments']), per_page)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_bad_cursor_and_missing_post(self):
+        """Испорченный курсор ведёт на начало, чужой пост отдаёт 404."""
+        response = self.client.get(
+            reverse('post:post_comments', args=[self.post.pk]),
+            {'after': '!!!'})
+        self.assertEqual(self.texts(response.context['comments']),
+                         self.newest_first[:5])
+        response = self.client.get(reverse('post:post_comments', args=[0]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_bad_reply_is_ignored(self):
+        """Неверный номер ответа в ?reply= не ломает страницу."""
+        url = reverse('post:post_detail', args=[self.post.pk])
+        for reply in ('²', '-1', '9' * 30, 'abc'):
+            with self.subTest(reply=reply):
+                response = self.client.get(url, {'reply': reply})
+                self.assertEqual(response.status_code, 200)
+                self.assertIsNone(response.context['reply_to'])
+        comment = self.post.comments.first()
+        response = self.client.get(url, {'reply': comment.pk})
+        self.assertEqual(response.context['reply_to'], comment.pk)
+
+    def test_guest_gets_no_comments(self):
+        """Гостю комментарии не показываются и не загружаются."""
+        guest = Client()
+        response = guest.get(reverse('post:post_detail', args=[self.post.pk]))
+        self.assertIsNone(response.context['comments'])
+        self.assertNotContains(response, self.newest_first[0])
+        url = reverse('post:post_comments', args=[self.post.pk])
+        response = guest.get(url)
+        self.assertRedirects(
+            response, f'{reverse("users:login")}?next={url}')
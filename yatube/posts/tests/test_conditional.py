@@ -0,0 +1,121 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        cls.other_group = Group.objects.create(
+            title='Другая группа', slug='other', description='Описание')
+        cls.post = Post.objects.create(author=cls.author, group=cls.group,
+                                       text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def revalidate(self, url):
+        """Запрашивает страницу повторно с её ETag."""
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return lambda: self.client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag']).status_code
+
+    def test_unchanged_page_is_not_rendered(self):
+        """Неизменённая страница отдаётся кодом 304 за один запрос к БД."""
+        url = reverse('post:index')
+        response = self.client.get(url)
+        self.assertTrue(response.has_header('Last-Modified'))
+        # Only the ETag query.
+        with self.assertNumQueries(1):
+            cached = self.client.get(url,
+                                     HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.content, b'')
+        cached = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(cached.status_code, 304)
+
+    def test_new_post_changes_its_listings_only(self):
+        """Новый пост меняет только страницы, на которых он виден."""
+        index = self.revalidate(reverse('post:index'))
+        group = self.revalidate(
+            reverse('post:group_list', args=[self.group.slug]))
+        other_group = self.revalidate(
+            reverse('post:group_list', args=[self.other_group.slug]))
+        Post.objects.create(author=self.reader, group=self.other_group,
+                            text='Новый пост')
+        self.assertEqual(index(), 200)
+        self.assertEqual(group(), 304)
+        self.assertEqual(other_group(), 200)
+
+    def test_edit_changes_post_and_listings(self):
+        """Правка поста меняет его страницу и ленты."""
+        detail = self.revalidate(
+            reverse('post:post_detail', args=[self.post.id]))
+        profile = self.revalidate(
+            reverse('post:profile', args=[self.author.username]))
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Исправленный пост'
+        post.group = self.other_group
+        post.save()
+        self.assertEqual(detail(), 200)
+        self.assertEqual(profile(), 200)
+
+    def test_comment_changes_post_page_only(self):
+        """Комментарий меняет страницу поста, но не ленту."""
+        detail = self.revalidate(
+            reverse('post:post_detail', args=[self.post.id]))
+        index = self.revalidate(reverse('post:index'))
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text='Комментарий')
+        self.assertEqual(detail(), 200)
+        self.assertEqual(index(), 304)
+
+    def test_pages_differ_per_user(self):
+        """ETag учитывает пользователя и подписку на автора."""
+        url = reverse('post:profile', args=[self.author.username])
+        anonymous = self.revalidate(url)
+        self.client.force_login(self.reader)
+        self.assertEqual(anonymous(), 200)
+        profile = self.revalidate(url)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(profile(), 200)
+
+    def test_new_csrf_token_changes_pages(self):
+        """Новый CSRF-токен после входа меняет страницы с формами."""
+        self.client.force_login(self.reader)
+        url = reverse('post:post_detail', args=[self.post.id])
+        # The first page sets the token cookie.
+        self.client.get(url)
+        detail = self.revalidate(url)
+        self.assertEqual(detail(), 304)
+        # What login() does to the token.
+        self.client.cookies[settings.CSRF_COOKIE_NAME] = 'a' * 64
+        self.assertEqual(detail(), 200)
+
+    def test_lost_change_times_invalidate(self):
+        """Потеря кэша не оставляет устаревших страниц."""
+        index = self.revalidate(reverse('post:index'))
+        cache.clear()
+        self.assertEqual(index(), 200)
+
+    def test_missing_pages(self):
+        """Несуществующие страницы по-прежнему отдают 404."""
+        for url in (reverse('post:group_list', args=['missing']),
+                    reverse('post:profile', args=['missing']),
+                    reverse('post:post_detail', args=[0])):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
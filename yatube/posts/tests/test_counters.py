@@ -0,0 +1,108 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, UserStats
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='username')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.group_2 = Group.objects.create(
+            title='Тестовая группа_2',
+            slug='test_slug_2',
+            description='Тестовое описание_2',
+        )
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_failed_save_leaves_counters(self):
+        """Пост и счётчики откатываются вместе при сбое после записи."""
+        with mock.patch('posts.timeline.fan_out', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                Post.objects.create(author=self.user, group=self.group,
+                                    text='Текст')
+        self.group.refresh_from_db()
+        self.assertFalse(Post.objects.exists())
+        self.assertEqual(self.stats(self.user).posts_count, 0)
+        self.assertEqual(self.group.posts_count, 0)
+
+    def test_post_counters(self):
+        """Счётчики постов автора и группы следуют за постами."""
+        post = Post.objects.create(author=self.user, group=self.group,
+                                   text='Текст')
+        self.group.refresh_from_db()
+        self.assertEqual(self.stats(self.user).posts_count, 1)
+        self.assertEqual(self.group.posts_count, 1)
+        post = Post.objects.get(pk=post.pk)
+        post.group = self.group_2
+        post.save()
+        self.group.refresh_from_db()
+        self.group_2.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.group_2.posts_count, 1)
+        post.delete()
+        self.group_2.refresh_from_db()
+        self.assertEqual(self.stats(self.user).posts_count, 0)
+        self.assertEqual(self.group_2.posts_count, 0)
+
+    def test_comment_and_follow_counters(self):
+        """Счётчики комментариев и подписок следуют за записями."""
+        post = Post.objects.create(author=self.user, text='Текст')
+        comment = Comment.objects.create(post=post, author=self.reader,
+                                         text='Комментарий')
+        follow = Follow.objects.create(user=self.reader, author=self.user)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(self.stats(self.user).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        comment.delete()
+        follow.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        self.assertEqual(self.stats(self.user).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    def test_recount_detects_and_fixes_drift(self):
+        """Команда recount_counters находит и исправляет расхождения."""
+        Post.objects.create(author=self.user, group=self.group, text='Текст')
+        Group.objects.filter(pk=self.group.pk).update(posts_count=7)
+        UserStats.objects.filter(user=self.reader).delete()
+        with self.assertRaises(CommandError):
+            call_command('recount_counters', '--check', stdout=StringIO())
+        call_command('recount_counters', stdout=StringIO())
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertTrue(UserStats.objects.filter(user=self.reader).exists())
+        call_command('recount_counters', '--check', stdout=StringIO())
+
+    def test_pages_read_counters(self):
+        """Профиль и страница поста берут число постов из счётчика."""
+        post = Post.objects.create(author=self.user, text='Текст')
+        UserStats.objects.filter(user=self.user).update(posts_count=42)
+        with CaptureQueriesContext(connection) as queries:
+            response = Client().get(
+                reverse('post:post_detail', kwargs={'post_id': post.pk}))
+        self.assertEqual(response.context['num'], 42)
+        self.assertFalse([query['sql'] for query in queries
+                          if 'COUNT(' in query['sql']])
+        response = Client().get(
+            reverse('post:profile', kwargs={'username': self.user.username}))
+        self.assertEqual(response.context['num_post'], 42)
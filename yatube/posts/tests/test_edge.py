@@ -0,0 +1,110 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import edge
+from core.tests.fake_edge import FakeEdge
+from posts.models import Group, Post
+
+User = get_user_model()
+
+inline_executor = mock.Mock(submit=lambda func, *args: func(*args))
+
+
+class EdgeHeadersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        cls.post = Post.objects.create(author=cls.user, group=cls.group,
+                                       text='Пост')
+
+    def test_anonymous_listings_are_public(self):
+        """Ленты для анонимов кэшируются на краю без cookies."""
+        for url, key in ((reverse('post:index'), 'posts'),
+                         (reverse('post:group_list', args=['group']),
+                          f'group:{self.group.pk}')):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                control = response['Cache-Control']
+                self.assertIn('public', control)
+                self.assertIn('s-maxage=60', control)
+                self.assertIn('stale-while-revalidate=300', control)
+                self.assertIn('Cookie', response['Vary'])
+                self.assertEqual(response['Surrogate-Key'], key)
+                self.assertFalse(response.cookies)
+
+    def test_private_pages_are_not_shared(self):
+        """Страницы пользователя и прочие страницы не кэшируются на краю."""
+        response = self.client.get(
+            reverse('post:post_detail', args=[self.post.pk]))
+        self.assertFalse(response.has_header('Surrogate-Key'))
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('post:index'))
+        self.assertNotIn('public', response.get('Cache-Control', ''))
+
+    def test_failed_purge_is_logged(self):
+        """Недоступный адрес очистки не роняет запрос."""
+        with self.assertLogs('core.edge', 'WARNING'):
+            edge.send(['http://127.0.0.1:9/'], 'posts')
+
+
+@mock.patch('core.edge.executor', lambda: inline_executor)
+@mock.patch('core.edge.transaction.on_commit', lambda func: func())
+class EdgeProxyTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.edge = FakeEdge().start()
+        cls.user = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.edge.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.edge.entries.clear()
+        self.edge.now = 0
+        settings = override_settings(EDGE_PURGE_URLS=[self.edge.url])
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_edge_serves_repeated_views(self):
+        """Повторные анонимные просмотры не доходят до Django."""
+        url = reverse('post:index')
+        self.assertEqual(self.edge.get(url)[1], 'MISS')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.edge.get(url)[1], 'HIT')
+        self.assertEqual(self.edge.get(url, 'sessionid=abc')[1], 'MISS')
+
+    def test_content_change_purges_pages(self):
+        """Новый пост удаляет с края ленты, в которых он появится."""
+        index, group = reverse('post:index'), reverse(
+            'post:group_list', args=['group'])
+        self.edge.get(index)
+        self.edge.get(group)
+        Post.objects.create(author=self.user, text='Новый пост')
+        self.assertTrue(any('posts' in keys for keys in self.edge.purged))
+        response, status = self.edge.get(index)
+        self.assertEqual(status, 'MISS')
+        self.assertContains(response, 'Новый пост')
+        self.assertEqual(self.edge.get(group)[1], 'HIT')
+
+    def test_stale_while_revalidate(self):
+        """Устаревшая копия отдаётся, пока край обновляет страницу."""
+        url = reverse('post:index')
+        self.edge.get(url)
+        self.edge.advance(61)
+        self.assertEqual(self.edge.get(url)[1], 'STALE')
+        self.assertEqual(self.edge.get(url)[1], 'HIT')
+        self.edge.advance(61 + 300)
+        self.assertEqual(self.edge.get(url)[1], 'MISS')
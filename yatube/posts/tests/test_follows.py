@@ -0,0 +1,122 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+
+from posts import follows
+from posts.models import Follow, Post
+
+User = get_user_model()
+
+
+class FollowStateTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = [User.objects.create_user(username=f'author_{i}')
+                       for i in range(3)]
+        cls.posts = [Post.objects.create(author=author, text='Пост')
+                     for author in cls.authors]
+        Follow.objects.create(user=cls.reader, author=cls.authors[0])
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def state(self, user):
+        request = RequestFactory().get('/')
+        request.user = user
+        return follows.for_request(request)
+
+    def test_page_is_resolved_with_one_query(self):
+        """Подписки на всех авторов страницы проверяются одним запросом."""
+        state = self.state(self.reader)
+        state.add_page(self.posts)
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                [state.follows(author.pk) for author in self.authors],
+                [True, False, False])
+        with self.assertNumQueries(0):
+            self.assertFalse(self.state(AnonymousUser()).follows(
+                self.authors[0].pk))
+
+    def test_index_shows_follow_buttons(self):
+        """На главной у чужих постов есть кнопки подписки."""
+        response = self.client.get(reverse('post:index'))
+        self.assertContains(response, reverse(
+            'post:profile_unfollow', args=[self.authors[0].username]))
+        for author in self.authors[1:]:
+            self.assertContains(response, reverse(
+                'post:profile_follow', args=[author.username]))
+        response = Client().get(reverse('post:index'))
+        self.assertNotContains(response, 'Подписаться')
+
+    def test_follow_changes_cached_page(self):
+        """Подписка обновляет кэшированную и проверяемую по ETag главную."""
+        url = reverse('post:index')
+        etag = self.client.get(url)['ETag']
+        Follow.objects.create(user=self.reader, author=self.authors[1])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, reverse(
+            'post:profile_unfollow', args=[self.authors[1].username]))
+
+
+class FollowWriteTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def stats(self):
+        self.author.stats.refresh_from_db()
+        return self.author.stats.followers_count
+
+    def test_follow_is_idempotent(self):
+        """Повторная подписка — один запрос без IntegrityError."""
+        self.assertTrue(follows.follow(self.reader, self.author))
+        # The statement, in the savepoint the test transaction makes of
+        # the atomic block.
+        with self.assertNumQueries(3):
+            self.assertFalse(follows.follow(self.reader, self.author))
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(self.stats(), 1)
+        self.assertFalse(follows.follow(self.reader, self.reader))
+
+    def test_unfollow_is_idempotent(self):
+        """Повторная отписка — один запрос и ничего не меняет."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertTrue(follows.unfollow(self.reader, self.author))
+        # The statement, in the savepoint the test transaction makes of
+        # the atomic block.
+        with self.assertNumQueries(3):
+            self.assertFalse(follows.unfollow(self.reader, self.author))
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(self.stats(), 0)
+
+    def test_json_endpoints(self):
+        """JSON-вариант подписки отвечает состоянием без редиректа."""
+        follow = reverse('post:profile_follow_json', args=['author'])
+        unfollow = reverse('post:profile_unfollow_json', args=['author'])
+        self.assertEqual(self.client.get(follow).status_code, 405)
+        for url, following, changed in ((follow, True, True),
+                                        (follow, True, False),
+                                        (unfollow, False, True),
+                                        (unfollow, False, False)):
+            with self.subTest(url=url, changed=changed):
+                response = self.client.post(url)
+                self.assertEqual(response.json(), {
+                    'author': 'author', 'following': following,
+                    'changed': changed})
+        response = self.client.post(
+            reverse('post:profile_follow_json', args=['missing']))
+        self.assertEqual(response.status_code, 404)
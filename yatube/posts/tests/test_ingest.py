@@ -0,0 +1,145 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import ingest
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+@mock.patch('posts.ingest.CommentQueue.start', lambda self: None)
+class CommentIngestTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+        cls.other_post = Post.objects.create(author=cls.user, text='Другой')
+
+    def setUp(self):
+        ingest.queue().pending.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def send(self, post_id, text='Комментарий', **data):
+        return self.client.post(
+            reverse('post:ingest_comment', args=[post_id]),
+            {'text': text, **data})
+
+    def test_comment_is_accepted_then_written(self):
+        """Комментарий принимается кодом 202 и записывается пачкой."""
+        response = self.send(self.post.pk)
+        self.assertEqual(response.status_code, 202)
+        status_url = response['Location']
+        self.assertEqual(response.json()['status'], status_url)
+        self.assertFalse(Comment.objects.exists())
+        self.assertEqual(self.client.get(status_url).json()['status'],
+                         'pending')
+        ingest.queue().flush()
+        comment = Comment.objects.get()
+        self.assertEqual((comment.author, comment.post, comment.text),
+                         (self.user, self.post, 'Комментарий'))
+        self.assertEqual(str(comment.ingest_id), response.json()['id'])
+        written = self.client.get(status_url).json()
+        self.assertEqual(written['comment'], comment.pk)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+    def test_batch_costs_the_same_for_any_size(self):
+        """Запись пачки не зависит от числа комментариев в ней."""
+        counts = []
+        for size in (2, 20):
+            for number in range(size):
+                self.send(self.post.pk, f'Комментарий {number}')
+            with CaptureQueriesContext(connection) as queries:
+                ingest.queue().flush()
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(Comment.objects.count(), 22)
+
+    def test_invalid_comments(self):
+        """Пустой текст и несуществующий пост отклоняются сразу, пост
+        и ответ проверяются ещё раз при записи.
+        """
+        response = self.send(self.post.pk, '')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('text', response.json()['errors'])
+        self.assertEqual(self.send(0).status_code, 404)
+        self.assertFalse(ingest.queue().pending)
+        foreign = Comment.objects.create(post=self.other_post,
+                                         author=self.user, text='Чужой')
+        deleted = Post.objects.create(author=self.user, text='Удалённый')
+        self.send(deleted.pk)
+        deleted.delete()
+        self.send(self.post.pk, 'Ответ', parent=foreign.pk)
+        with self.assertLogs('posts.ingest', 'WARNING'):
+            ingest.queue().flush()
+        reply = Comment.objects.get(text='Ответ')
+        self.assertIsNone(reply.parent_id)
+        self.assertEqual(Comment.objects.count(), 2)
+
+    def test_out_of_range_ids(self):
+        """Слишком большие номера отклоняются сразу, а не при записи."""
+        response = self.send(self.post.pk, parent='9' * 30)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('parent', response.json()['errors'])
+        response = self.client.post(
+            f'/posts/{"9" * 30}/comments/ingest/', {'text': 'Комментарий'})
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(ingest.queue().pending)
+
+    def test_failed_batch_stays_queued(self):
+        """Неудачная запись оставляет пачку в очереди до следующей."""
+        self.send(self.post.pk)
+        with mock.patch('posts.ingest.write', side_effect=OverflowError):
+            with self.assertLogs('posts.ingest', 'WARNING'):
+                self.assertEqual(ingest.queue().flush(), 1)
+        self.assertEqual(len(ingest.queue().pending), 1)
+        ingest.flush_on_exit()
+        self.assertTrue(Comment.objects.exists())
+
+    def test_bad_comment_does_not_hold_up_batch(self):
+        """Сбойный комментарий не мешает записи остальных и со временем
+        отбрасывается.
+        """
+        self.send(self.post.pk, 'Первый')
+        self.send(self.post.pk, 'Второй')
+        ingest.queue().pending[0].text = None
+        with self.assertLogs('posts.ingest', 'WARNING'):
+            self.assertEqual(ingest.queue().flush(), 1)
+        self.assertEqual(Comment.objects.get().text, 'Второй')
+        self.assertEqual(len(ingest.queue().pending), 1)
+        with self.assertLogs('posts.ingest', 'ERROR') as logs:
+            ingest.flush_on_exit()
+        self.assertIn('Dropped comment', logs.output[-1])
+        self.assertFalse(ingest.queue().pending)
+        self.assertEqual(Comment.objects.count(), 1)
+
+    def test_comment_is_pending_while_written(self):
+        """Пока пачка записывается, комментарий остаётся в ожидании."""
+        response = self.send(self.post.pk)
+        status_url = response['Location']
+        statuses = []
+        write = ingest.write
+
+        def watch(comments):
+            statuses.append(self.client.get(status_url).status_code)
+            write(comments)
+
+        with mock.patch('posts.ingest.write', watch):
+            ingest.queue().flush()
+        self.assertEqual(statuses, [202])
+        self.assertEqual(self.client.get(status_url).status_code, 200)
+
+    def test_anonymous_cannot_send(self):
+        """Аноним не может отправлять комментарии."""
+        response = Client().post(
+            reverse('post:ingest_comment', args=[self.post.pk]),
+            {'text': 'Комментарий'})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(ingest.queue().pending)
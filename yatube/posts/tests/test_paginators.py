@@ -0,0 +1,68 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Post
+from posts.paginators import CursorPaginator, decode_cursor, encode_cursor
+
+User = get_user_model()
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='username')
+        Post.objects.bulk_create(
+            Post(text=f'Текст поста {i}', author=cls.user) for i in range(25)
+        )
+        cls.ordered = list(Post.objects.order_by('-pub_date', '-id'))
+
+    def test_cursor_round_trip(self):
+        """Токен курсора восстанавливает позицию поста."""
+        post = self.ordered[0]
+        self.assertEqual(decode_cursor(encode_cursor(post)),
+                         (post.pub_date, post.pk))
+
+    def test_pages_cover_all_posts(self):
+        """Переход по ?after= обходит все посты без повторов."""
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        page = paginator.get_page()
+        self.assertFalse(page.has_previous())
+        seen = list(page)
+        while page.has_next():
+            page = paginator.get_page(after=page.next_cursor)
+            seen.extend(page)
+        self.assertEqual(seen, self.ordered)
+        self.assertEqual(len(page), 5)
+
+    def test_before_returns_previous_page(self):
+        """?before= возвращает предыдущую страницу."""
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        second = paginator.get_page(
+            after=paginator.get_page().next_cursor)
+        first = paginator.get_page(before=second.previous_cursor)
+        self.assertEqual(list(first), self.ordered[:10])
+        self.assertFalse(first.has_previous())
+        self.assertTrue(first.has_next())
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        """Испорченный токен открывает первую страницу."""
+        page = CursorPaginator(Post.objects.all(), 10).get_page(
+            after='not-a-cursor')
+        self.assertEqual(list(page), self.ordered[:10])
+
+    @override_settings(CURSOR_PAGINATION=True)
+    def test_index_in_cursor_mode_skips_count(self):
+        """В режиме курсора главная страница не выполняет COUNT(*)."""
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = Client().get(reverse('post:index'))
+        self.assertEqual(list(response.context['page_obj']),
+                         self.ordered[:10])
+        self.assertContains(response, '?after=')
+        self.assertFalse(
+            any('COUNT(' in query['sql'] for query in queries))
@@ -0,0 +1,62 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class ListingQueryBudgetTests(TestCase):
+    """Количество запросов страницы не зависит от числа постов на ней."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        authors = [User.objects.create_user(username=f'author_{i}',
+                                            first_name='Имя',
+                                            last_name=f'Фамилия {i}')
+                   for i in range(20)]
+        for author in authors:
+            Follow.objects.create(user=cls.user, author=author)
+            Post.objects.create(author=author, group=cls.group,
+                                text=f'Пост {author.username}')
+        cls.author = authors[0]
+        for i in range(19):
+            Post.objects.create(author=cls.author, text=f'Ещё пост {i}')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def count_queries(self, url, per_page):
+        cache.clear()
+        with override_settings(NUM_POSTS_ON_PAGE=per_page):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+        self.assertEqual(len(response.context['page_obj']), per_page)
+        return len(queries)
+
+    def test_listing_query_budget(self):
+        # One of the queries prefetches the image variants of the page, one
+        # computes the ETag of the pages that support conditional GET and
+        # one finds the followed authors for the follow buttons.
+        budgets = {
+            reverse('post:index'): 7,
+            reverse('post:group_list', kwargs={'slug': self.group.slug}): 8,
+            reverse('post:profile',
+                    kwargs={'username': self.author.username}): 8,
+            reverse('post:follow_index'): 7,
+        }
+        for url, budget in budgets.items():
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url, 2), budget)
+                self.assertEqual(self.count_queries(url, 20), budget)
@@ -0,0 +1,104 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Group, Post
+
+User = get_user_model()
+
+REPLICA = 'replica'
+
+
+class ReplicaRoutingTests(TestCase):
+    """Ленты читаются с реплики, кроме как сразу после записи."""
+    databases = {'default', REPLICA}
+
+    @classmethod
+    def setUpClass(cls):
+        # The test primary lives in memory, the replica in a second SQLite
+        # file that never receives the primary's writes, so every page
+        # shows which of the two it was read from.
+        cls.directory = tempfile.mkdtemp()
+        connections.databases[REPLICA] = {
+            **connections.databases['default'],
+            'NAME': f'{cls.directory}/replica.sqlite3',
+        }
+        call_command('migrate', database=REPLICA, verbosity=0)
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='primary_author')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        Post.objects.create(author=cls.author, group=cls.group,
+                            text='Пост на основной базе')
+        replica_author = User(id=cls.author.id + 1000,
+                              username='replica_author')
+        User.objects.using(REPLICA).bulk_create([replica_author])
+        Group.objects.using(REPLICA).bulk_create([
+            Group(id=cls.group.id, title='Группа', slug='group',
+                  description='Описание')])
+        Post.objects.using(REPLICA).bulk_create([
+            Post(author=replica_author, group_id=cls.group.id,
+                 text='Пост на реплике')])
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].close()
+        del connections.databases[REPLICA]
+        delattr(connections._connections, REPLICA)
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def listed_texts(self, url):
+        response = self.client.get(url)
+        return [post.text for post in response.context['page_obj']]
+
+    def test_listings_read_from_replica(self):
+        """Главная и страница группы читаются с реплики."""
+        for url in (reverse('post:index'),
+                    reverse('post:group_list', args=['group'])):
+            with self.subTest(url=url):
+                self.assertEqual(self.listed_texts(url), ['Пост на реплике'])
+
+    def test_reads_stick_to_primary_after_write(self):
+        """После записи клиент читает с основной базы."""
+        response = self.client.post(reverse('post:post_create'),
+                                    {'text': 'Новый пост'})
+        self.assertIn(settings.REPLICA_STICKY_COOKIE, response.cookies)
+        self.assertEqual(self.listed_texts(reverse('post:index')),
+                         ['Новый пост', 'Пост на основной базе'])
+
+    def test_detail_reads_from_primary(self):
+        """Страница поста не читается с реплики."""
+        post = Post.objects.get(text='Пост на основной базе')
+        response = self.client.get(
+            reverse('post:post_detail', args=[post.id]))
+        self.assertEqual(response.context['post'], post)
+
+    def test_replica_pages_are_not_cached(self):
+        """Страница с реплики не кэшируется и не получает валидаторов."""
+        url = reverse('post:index')
+        response = self.client.get(url)
+        self.assertFalse(response.has_header('ETag'))
+        self.assertFalse(response.has_header('Last-Modified'))
+        with override_settings(REPLICA_DATABASE='missing'):
+            response = self.client.get(url)
+        self.assertTrue(response.has_header('ETag'))
+        self.assertContains(response, 'Пост на основной базе')
+
+    @override_settings(REPLICA_DATABASE='missing')
+    def test_without_replica_reads_from_primary(self):
+        """Без настроенной реплики всё читается с основной базы."""
+        self.assertEqual(self.listed_texts(reverse('post:index')),
+                         ['Пост на основной базе'])
@@ -0,0 +1,108 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts import search
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+class SearchBackendTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    def search(self, query):
+        return list(search.backend().search(query)[:10])
+
+    def test_results_are_ranked(self):
+        """Запись, где слово встречается чаще, выше в выдаче."""
+        once = Post.objects.create(
+            author=self.author, text='Котики и длинный текст про собак')
+        twice = Post.objects.create(author=self.author, text='Котики котики')
+        self.assertEqual([hit.obj for hit in self.search('котики')],
+                         [twice, once])
+
+    def test_snippet_is_highlighted_and_escaped(self):
+        """Совпадения выделяются, а разметка из текста экранируется."""
+        Post.objects.create(author=self.author, text='<b>Кот</b> на крыше')
+        hit, = self.search('крыше')
+        self.assertIn('<mark>крыше</mark>', hit.snippet)
+        self.assertIn('&lt;b&gt;', hit.snippet)
+
+    def test_last_term_matches_prefix(self):
+        """Последнее слово запроса ищется по префиксу."""
+        post = Post.objects.create(author=self.author, text='Программирование')
+        self.assertEqual([hit.obj for hit in self.search('програм')], [post])
+
+    def test_query_syntax_is_not_interpreted(self):
+        """Операторы FTS5 в запросе не вызывают ошибку."""
+        Post.objects.create(author=self.author, text='Кот')
+        self.assertEqual(self.search('"кот" OR NEAR( *'), [])
+        self.assertEqual(self.search(''), [])
+
+    def test_index_follows_posts_and_comments(self):
+        """Индекс обновляется при изменении и удалении записей."""
+        post = Post.objects.create(author=self.author, text='Старый текст')
+        comment = Comment.objects.create(
+            post=post, author=self.author, text='Комментарий про кота')
+        hit, = self.search('кота')
+        self.assertEqual((hit.kind, hit.obj, hit.post),
+                         ('comment', comment, post))
+        post = Post.objects.get(pk=post.pk)
+        post.text = 'Новый текст'
+        post.save()
+        self.assertEqual(self.search('старый'), [])
+        self.assertEqual(len(self.search('новый')), 1)
+        post.delete()
+        self.assertEqual(self.search('текст'), [])
+        self.assertEqual(self.search('кота'), [])
+
+    @override_settings(SEARCH_BACKENDS={})
+    def test_scan_backend(self):
+        """Без индекса поиск идёт перебором, новые записи первыми."""
+        # LIKE in SQLite folds the case of ASCII letters only.
+        old = Post.objects.create(author=self.author, text='кот и пёс')
+        new = Post.objects.create(author=self.author, text='пёс и кот')
+        self.assertIsInstance(search.backend(), search.ScanBackend)
+        self.assertEqual([hit.obj for hit in self.search('кот пёс')],
+                         [new, old])
+        self.assertEqual(search.backend().search('кот').count(), 2)
+
+
+class SearchViewTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        Post.objects.bulk_create(
+            Post(author=cls.author, text=f'Котики номер {number}')
+            for number in range(13))
+        search.backend().rebuild()
+
+    def test_search_page(self):
+        """Страница поиска выводит результаты и сохраняет запрос."""
+        response = self.client.get(reverse('post:search'),
+                                   {'q': 'котики', 'page': 2})
+        self.assertEqual(response.context['query'], 'котики')
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.paginator.count, 13)
+        self.assertEqual(len(page_obj), 3)
+        self.assertContains(response, '?q=%D0%BA%D0%BE%D1%82%D0%B8%D0%BA'
+                                      '%D0%B8&amp;page=1')
+        self.assertContains(response, '<mark>Котики</mark>')
+
+    def test_search_json(self):
+        """JSON-версия поиска отдаёт страницу результатов."""
+        response = self.client.get(reverse('post:search_json'),
+                                   {'q': 'номер 12'})
+        data = response.json()
+        self.assertEqual((data['count'], data['num_pages']), (1, 1))
+        result, = data['results']
+        self.assertEqual(result['type'], 'post')
+        self.assertEqual(result['author'], 'author')
+        self.assertEqual(result['url'], reverse(
+            'post:post_detail', args=[result['post_id']]))
+        self.assertIn('<mark>12</mark>', result['snippet'])
@@ -0,0 +1,129 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import ImageBlob, Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+OTHER_GIF = SMALL_GIF.replace(b'\xFF\xFF\xFF', b'\x00\xFF\x00', 1)
+
+
+def uploaded(content=SMALL_GIF, name='small.gif'):
+    return SimpleUploadedFile(name=name, content=content,
+                              content_type='image/gif')
+
+
+@mock.patch('posts.storage.transaction.on_commit', lambda func: func())
+class DeduplicatingStorageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp(dir=TEMP_MEDIA_ROOT)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        # Keeps the thumbnail pool from writing variants next to the files.
+        executor = mock.patch('posts.thumbnails.executor')
+        executor.start()
+        self.addCleanup(executor.stop)
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def create_post(self, image):
+        self.client.post(reverse('post:post_create'),
+                         {'text': 'Пост', 'image': image})
+        return Post.objects.latest('id')
+
+    def path(self, name):
+        return os.path.join(self.media_root, name)
+
+    def test_identical_uploads_share_one_file(self):
+        """Одинаковые загрузки хранятся одним файлом."""
+        first = self.create_post(uploaded())
+        second = self.create_post(uploaded(name='copy.gif'))
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(len(os.listdir(self.path('posts'))), 1)
+        blob = ImageBlob.objects.get(name=first.image.name)
+        self.assertEqual(blob.refs, 2)
+        self.assertEqual(blob.digest, hashlib.sha256(SMALL_GIF).hexdigest())
+
+    def test_file_is_deleted_with_last_reference(self):
+        """Файл удаляется только вместе с последней ссылкой на него."""
+        first = self.create_post(uploaded())
+        second = self.create_post(uploaded())
+        name = first.image.name
+        first.delete()
+        self.assertTrue(os.path.exists(self.path(name)))
+        second.delete()
+        self.assertFalse(os.path.exists(self.path(name)))
+        self.assertFalse(ImageBlob.objects.exists())
+
+    def test_replaced_image_is_released(self):
+        """Заменённая картинка освобождается."""
+        post = self.create_post(uploaded())
+        name = post.image.name
+        self.client.post(reverse('post:update_post', args=[post.id]),
+                         {'text': 'Пост', 'image': uploaded(OTHER_GIF)})
+        post.refresh_from_db()
+        self.assertNotEqual(post.image.name, name)
+        self.assertFalse(os.path.exists(self.path(name)))
+
+    def test_same_image_uploaded_again_is_released(self):
+        """Повторная загрузка той же картинки не оставляет лишних ссылок."""
+        post = self.create_post(uploaded())
+        name = post.image.name
+        self.client.post(reverse('post:update_post', args=[post.id]),
+                         {'text': 'Пост', 'image': uploaded()})
+        post.refresh_from_db()
+        self.assertEqual(post.image.name, name)
+        self.assertEqual(ImageBlob.objects.get(name=name).refs, 1)
+        post.delete()
+        self.assertFalse(ImageBlob.objects.exists())
+        self.assertFalse(os.path.exists(self.path(name)))
+
+    def test_dedupe_existing_images(self):
+        """Команда объединяет копии, загруженные до дедупликации."""
+        storage = Post._meta.get_field('image').storage
+        names = [
+            super(type(storage), storage).save('posts/old.gif',
+                                               ContentFile(SMALL_GIF))
+            for _ in range(3)
+        ]
+        for name in names:
+            Post.objects.create(author=self.user, text='Пост', image=name)
+        call_command('dedupe_images', stdout=StringIO())
+        self.assertEqual(
+            set(Post.objects.values_list('image', flat=True)), {names[0]})
+        self.assertEqual(ImageBlob.objects.get(name=names[0]).refs, 3)
+        for name in names[1:]:
+            self.assertFalse(os.path.exists(self.path(name)))
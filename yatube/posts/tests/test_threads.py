@@ -0,0 +1,125 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import bulk, threads
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+class ThreadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+        cls.other_post = Post.objects.create(author=cls.user, text='Другой')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def reply(self, parent=None, text='Ответ'):
+        return Comment.objects.create(post=self.post, author=self.user,
+                                      parent=parent, text=text)
+
+    def test_reply_extends_parent_path(self):
+        """Путь ответа продолжает путь комментария, на который он дан."""
+        root = self.reply(text='Корень')
+        self.client.post(reverse('post:add_comment', args=[self.post.pk]),
+                         {'text': 'Ответ', 'parent': root.pk})
+        reply = Comment.objects.get(text='Ответ')
+        self.assertEqual(reply.parent, root)
+        self.assertEqual(reply.depth, 1)
+        self.assertEqual(reply.path,
+                         threads.segment(root.pk) + threads.segment(reply.pk))
+
+    def test_parent_from_other_post_is_ignored(self):
+        """Ответ на комментарий к другому посту начинает новую ветку."""
+        foreign = Comment.objects.create(post=self.other_post,
+                                         author=self.user, text='Чужой')
+        self.client.post(reverse('post:add_comment', args=[self.post.pk]),
+                         {'text': 'Ответ', 'parent': foreign.pk})
+        comment = self.post.comments.get()
+        self.assertIsNone(comment.parent_id)
+        self.assertEqual(comment.depth, 0)
+
+    def test_out_of_range_parent_is_ignored(self):
+        """Слишком большой номер ответа не ломает отправку комментария."""
+        self.client.post(reverse('post:add_comment', args=[self.post.pk]),
+                         {'text': 'Ответ', 'parent': '9' * 30})
+        self.assertIsNone(self.post.comments.get().parent_id)
+
+    @override_settings(COMMENT_MAX_DEPTH=2)
+    def test_depth_is_capped(self):
+        """Ответы глубже предела становятся соседями комментария."""
+        parent = None
+        chain = []
+        for _ in range(4):
+            parent = self.reply(parent)
+            chain.append(Comment.objects.get(pk=parent.pk))
+        self.assertEqual([comment.depth for comment in chain], [0, 1, 2, 2])
+        self.assertEqual(chain[3].parent_id, chain[1].pk)
+
+    def test_subtree_is_one_range_query(self):
+        """Ветка целиком читается одним запросом в порядке дерева."""
+        root = self.reply(text='1')
+        first = self.reply(root, '1.1')
+        self.reply(first, '1.1.1')
+        self.reply(root, '1.2')
+        self.reply(text='2')
+        with self.assertNumQueries(1):
+            texts = [comment.text for comment in threads.subtree(root)]
+        self.assertEqual(texts, ['1', '1.1', '1.1.1', '1.2'])
+
+    @override_settings(COMMENT_THREAD_REPLIES=2, NUM_COMMENTS_ON_PAGE=2)
+    def test_page_shows_threads_with_first_replies(self):
+        """Страница показывает ветки с первыми ответами и ссылкой на
+        остальные.
+        """
+        old = self.reply(text='Старая ветка')
+        self.reply(old, 'Ответ в старой ветке')
+        root = self.reply(text='Новая ветка')
+        for number in range(5):
+            self.reply(root, f'Ответ {number}')
+        url = reverse('post:post_detail', args=[self.post.pk])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        comments = response.context['comments']
+        self.assertEqual([comment.text for comment in comments],
+                         ['Новая ветка', 'Старая ветка'])
+        self.assertEqual(
+            [reply.text for reply in comments[0].thread_replies],
+            ['Ответ 0', 'Ответ 1'])
+        self.assertEqual([reply.text for reply in comments[1].thread_replies],
+                         ['Ответ в старой ветке'])
+        self.assertIsNone(comments[1].more_replies)
+        self.reply(old, 'Ещё ответ')
+        cache.clear()
+        with CaptureQueriesContext(connection) as more_queries:
+            self.client.get(url)
+        self.assertEqual(len(queries), len(more_queries))
+        response = self.client.get(
+            reverse('post:post_comments', args=[self.post.pk]),
+            {'replies': comments[0].more_replies})
+        self.assertEqual([reply.text for reply in response.context['replies']],
+                         ['Ответ 2', 'Ответ 3'])
+        self.assertTemplateUsed(response, 'posts/includes/replies.html')
+
+    def test_bulk_replies_get_paths(self):
+        """Пакетная запись раскладывает ответы по веткам."""
+        root = self.reply(text='Корень')
+        replies = bulk.create_comments([
+            Comment(post=self.post, author=self.user, parent=root,
+                    text=f'Ответ {number}')
+            for number in range(3)])
+        for reply in Comment.objects.filter(pk__in=[r.pk for r in replies]):
+            with self.subTest(reply=reply.text):
+                self.assertEqual(reply.depth, 1)
+                self.assertTrue(reply.path.startswith(root.path))
+        self.assertEqual(threads.subtree(root).count(), 4)
@@ -0,0 +1,287 @@
+import shutil
+import tempfile
+from concurrent import futures
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from posts import thumbnails, variants
+from posts.models import Post, PostImageVariant
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def uploaded_gif(name='small.gif'):
+    return SimpleUploadedFile(name=name, content=SMALL_GIF,
+                              content_type='image/gif')
+
+
+def uploaded_jpeg(name='photo.jpg', size=(1000, 400), color='teal'):
+    buffer = BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'JPEG')
+    return SimpleUploadedFile(name=name, content=buffer.getvalue(),
+                              content_type='image/jpeg')
+
+
+def uploaded_animation(name='anim.gif'):
+    buffer = BytesIO()
+    frames = [Image.new('RGB', (400, 200), color)
+              for color in ('red', 'blue')]
+    frames[0].save(buffer, 'GIF', save_all=True, append_images=frames[1:])
+    return SimpleUploadedFile(name=name, content=buffer.getvalue(),
+                              content_type='image/gif')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def tearDown(self):
+        # Pool jobs must not outlive the temporary media root.
+        thumbnails.drain()
+
+    def test_original_image_until_thumbnail_is_ready(self):
+        """Пока миниатюры нет, страница показывает исходную картинку."""
+        post = Post.objects.create(author=self.user, text='Пост',
+                                   image=uploaded_gif())
+        url = reverse('post:post_detail', args=[post.id])
+        self.assertIsNone(thumbnails.cached(post.image))
+        self.assertContains(self.client.get(url), post.image.url)
+
+        thumbnails.generate(post.image.name)
+        thumbnail = thumbnails.cached(post.image)
+        self.assertIsNotNone(thumbnail)
+        self.assertTrue(thumbnail.exists())
+        response = self.client.get(url)
+        self.assertContains(response, thumbnail.url)
+        self.assertNotContains(response, post.image.url)
+
+    @override_settings(THUMBNAIL_MISS_TIMEOUT=0)
+    def test_missing_thumbnail_is_not_remembered(self):
+        """Отсутствие миниатюры не запоминается надолго: её мог создать
+        другой процесс.
+        """
+        post = Post.objects.create(author=self.user, text='Пост',
+                                   image=uploaded_gif())
+        thumbnails.generate(post.image.name)
+        rows = list(KVStoreModel.objects.all())
+        # As if the thumbnail were not generated yet.
+        KVStoreModel.objects.all().delete()
+        cache.clear()
+        self.assertIsNone(thumbnails.cached(post.image))
+        thumbnails.prefetch([post])
+        self.assertIsNone(post.prefetched_thumbnail)
+        # Another worker generates it.
+        KVStoreModel.objects.bulk_create(rows)
+        self.assertIsNotNone(thumbnails.cached(post.image))
+        thumbnails.prefetch([post])
+        self.assertIsNotNone(post.prefetched_thumbnail)
+
+    @mock.patch('posts.thumbnails.transaction.on_commit',
+                lambda func: func())
+    @mock.patch('posts.thumbnails.executor')
+    def test_create_and_edit_schedule_generation(self, executor):
+        """Создание и смена картинки ставят миниатюру в очередь."""
+        self.client.post(reverse('post:post_create'),
+                         {'text': 'Пост', 'image': uploaded_gif()})
+        post = Post.objects.get()
+        executor().submit.assert_called_once_with(
+            thumbnails.generate_in_worker, post.id, post.image.name)
+
+        executor.reset_mock()
+        self.client.post(reverse('post:update_post', args=[post.id]),
+                         {'text': 'Новый текст'})
+        executor().submit.assert_not_called()
+
+        self.client.post(reverse('post:update_post', args=[post.id]),
+                         {'text': 'Новый текст',
+                          'image': uploaded_gif('other.gif')})
+        post.refresh_from_db()
+        executor().submit.assert_called_once_with(
+            thumbnails.generate_in_worker, post.id, post.image.name)
+
+    @override_settings(THUMBNAIL_BACKLOG=1)
+    @mock.patch('posts.thumbnails.executor')
+    def test_backlog_is_bounded(self, executor):
+        """Сверх предела очереди задачи сразу отбрасываются."""
+        jobs = [futures.Future(), futures.Future()]
+        executor().submit.side_effect = jobs
+        thumbnails._submit(1, 'posts/first.gif')
+        with self.assertLogs('posts.thumbnails', 'WARNING'):
+            thumbnails._submit(2, 'posts/second.gif')
+        self.assertEqual(executor().submit.call_count, 1)
+        jobs[0].set_result(None)
+        thumbnails._submit(3, 'posts/third.gif')
+        self.assertEqual(executor().submit.call_count, 2)
+        jobs[1].set_result(None)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT,
+                   POST_IMAGE_WIDTHS=(320, 640, 960, 1920),
+                   POST_IMAGE_FORMATS=('webp', 'jpeg'))
+class ImageVariantTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_build_variants(self):
+        """Варианты создаются для каждой ширины не больше исходной."""
+        post = Post.objects.create(author=self.user, text='Пост',
+                                   image=uploaded_jpeg())
+        built = variants.build(post.id, post.image.name)
+        self.assertEqual(
+            sorted((variant.format, variant.width) for variant in built),
+            sorted((format_name, width)
+                   for format_name in variants.supported_formats()
+                   for width in (320, 640, 960)))
+        variant = PostImageVariant.objects.get(post=post, format='jpeg',
+                                               width=320)
+        with Image.open(variant.file) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (320, 113))
+
+    def test_identical_images_share_files(self):
+        """Одинаковые картинки получают одни и те же файлы вариантов."""
+        posts = [Post.objects.create(author=self.user, text='Пост',
+                                     image=uploaded_jpeg())
+                 for _ in range(2)]
+        names = [sorted(variant.file.name for variant in
+                        variants.build(post.id, post.image.name))
+                 for post in posts]
+        self.assertEqual(names[0], names[1])
+
+    def test_animated_images_keep_the_original(self):
+        """Анимированные картинки остаются без вариантов."""
+        post = Post.objects.create(author=self.user, text='Пост',
+                                   image=uploaded_animation())
+        self.assertEqual(variants.build(post.id, post.image.name), [])
+
+    def test_replaced_image_drops_variants(self):
+        """Смена картинки сразу убирает варианты прежней, в том числе
+        при замене на анимацию.
+        """
+        post = Post.objects.create(author=self.user, text='Пост',
+                                   image=uploaded_jpeg())
+        variants.build(post.id, post.image.name)
+        post = Post.objects.get(pk=post.pk)
+        post.image = uploaded_jpeg('other.jpg', color='red')
+        post.save()
+        self.assertFalse(post.image_variants.exists())
+        variants.build(post.id, post.image.name)
+        animation = Post.objects.create(author=self.user, text='Анимация',
+                                        image=uploaded_animation()).image
+        Post.objects.filter(pk=post.pk).update(image=animation.name)
+        self.assertEqual(variants.build(post.id, animation.name), [])
+        self.assertFalse(post.image_variants.exists())
+
+    def test_cleared_image_drops_variants(self):
+        """Удаление картинки из поста убирает её варианты."""
+        post = Post.objects.create(author=self.user, text='Пост',
+                                   image=uploaded_jpeg())
+        variants.build(post.id, post.image.name)
+        self.client.force_login(self.user)
+        self.client.post(reverse('post:update_post', args=[post.id]),
+                         {'text': 'Пост', 'image-clear': 'on'})
+        post.refresh_from_db()
+        self.assertFalse(post.image)
+        self.assertFalse(post.image_variants.exists())
+
+    def test_listing_renders_srcset(self):
+        """Лента выводит srcset по всем вариантам."""
+        post = Post.objects.create(author=self.user, text='Пост',
+                                   image=uploaded_jpeg())
+        built = variants.build(post.id, post.image.name)
+        response = self.client.get(reverse('post:index'))
+        for format_name in variants.supported_formats():
+            srcset = ', '.join(f'{variant.file.url} {variant.width}w'
+                               for variant in built
+                               if variant.format == format_name)
+            with self.subTest(format=format_name):
+                self.assertContains(response, f'srcset="{srcset}"')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailPrefetchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.posts = [
+            Post.objects.create(author=cls.user, text=f'Пост {color}',
+                                image=uploaded_jpeg(color=color))
+            for color in ('red', 'green', 'blue')
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_listing_looks_thumbnails_up_at_once(self):
+        """Миниатюры всей страницы ищутся одним запросом."""
+        for post in self.posts[:2]:
+            thumbnails.generate(post.image.name)
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('post:index'))
+        lookups = [query for query in queries.captured_queries
+                   if 'thumbnail_kvstore' in query['sql']]
+        self.assertEqual(len(lookups), 1)
+        for post in self.posts[:2]:
+            self.assertContains(response, thumbnails.cached(post.image).url)
+        self.assertContains(response, self.posts[2].image.url)
+
+    @override_settings(POST_IMAGE_WIDTHS=(320,), POST_IMAGE_FORMATS=('jpeg',),
+                       POST_IMAGE_MAX_SIDE=800)
+    def test_warm_thumbnails(self):
+        """Команда доделывает отброшенную обработку картинок."""
+        for post in self.posts[:2]:
+            thumbnails.generate(post.image.name)
+        variants.build(self.posts[0].id, self.posts[0].image.name)
+        out = StringIO()
+        call_command('warm_thumbnails', workers=1, stdout=out)
+        self.assertIn('2 thumbnails cached, 1 generated, 1 more got '
+                      'variants.', out.getvalue())
+        for post in self.posts:
+            post.refresh_from_db()
+            self.assertIsNotNone(thumbnails.cached(post.image))
+            self.assertTrue(post.image_variants.exists())
+        # The image without a thumbnail went through the whole job.
+        self.assertEqual(self.posts[2].image.width, 800)
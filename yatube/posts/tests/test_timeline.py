@@ -0,0 +1,73 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from posts import timeline
+from posts.models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+
+    def test_new_post_is_delivered_to_followers(self):
+        """Новый пост попадает в ленту подписчика."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        Post.objects.create(author=self.other, text='Чужой пост')
+        self.assertEqual(list(timeline.feed(self.reader)), [post])
+
+    def test_follow_backfills_existing_posts(self):
+        """Подписка добавляет в ленту уже опубликованные посты."""
+        posts = [Post.objects.create(author=self.author, text=str(i))
+                 for i in range(3)]
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(list(timeline.feed(self.reader)), posts[::-1])
+
+    def test_unfollow_clears_timeline(self):
+        """Отписка убирает посты автора из ленты."""
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.create(author=self.author, text='Пост')
+        follow.delete()
+        self.assertFalse(TimelineEntry.objects.filter(user=self.reader))
+        self.assertEqual(list(timeline.feed(self.reader)), [])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_popular_author_is_merged_on_read(self):
+        """Посты популярного автора не копируются, а подмешиваются."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.other, author=self.author)
+        post = Post.objects.create(author=self.author, text='Пост')
+        self.assertFalse(TimelineEntry.objects.filter(post=post))
+        self.assertEqual(list(timeline.feed(self.reader)), [post])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_author_back_under_limit_is_delivered(self):
+        """Когда автор перестаёт быть популярным, его посты одним запросом
+        попадают в ленты оставшихся подписчиков.
+        """
+        Follow.objects.create(user=self.reader, author=self.author)
+        follow = Follow.objects.create(user=self.other, author=self.author)
+        posts = [Post.objects.create(author=self.author, text=str(i))
+                 for i in range(3)]
+        self.assertFalse(TimelineEntry.objects.exists())
+        with self.assertNumQueries(1):
+            timeline.backfill_followers(self.author.pk)
+        timeline.backfill_followers(self.author.pk)
+        follow.delete()
+        self.assertEqual(TimelineEntry.objects.count(), 3)
+        self.assertEqual(list(timeline.feed(self.reader)), posts[::-1])
+
+    def test_feed_queries_do_not_depend_on_follow_count(self):
+        """Чтение ленты не зависит от количества подписок."""
+        for i in range(5):
+            author = User.objects.create_user(username=f'author_{i}')
+            Follow.objects.create(user=self.reader, author=author)
+            Post.objects.create(author=author, text=str(i))
+        with self.assertNumQueries(2):
+            self.assertEqual(len(list(timeline.feed(self.reader)[:10])), 5)
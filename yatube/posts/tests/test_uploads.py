@@ -0,0 +1,88 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts import thumbnails
+from posts.models import ImageBlob, Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def uploaded_jpeg(size=(1000, 400), name='photo.jpg'):
+    buffer = BytesIO()
+    Image.effect_noise(size, 64).convert('RGB').save(buffer, 'JPEG')
+    return SimpleUploadedFile(name=name, content=buffer.getvalue(),
+                              content_type='image/jpeg')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageUploadLimitsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def create_post(self, image):
+        return self.client.post(reverse('post:post_create'),
+                                {'text': 'Пост', 'image': image})
+
+    @override_settings(POST_IMAGE_MAX_BYTES=1024)
+    def test_oversized_upload_is_rejected(self):
+        """Слишком большой файл отклоняется с понятной ошибкой."""
+        response = self.create_post(uploaded_jpeg())
+        self.assertFormError(response, 'form', 'image',
+                             'Файл больше 1,0\xa0КБ.')
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=1000 * 1000)
+    def test_too_many_pixels_are_rejected(self):
+        """Картинка с лишними пикселями отклоняется по заголовку."""
+        response = self.create_post(uploaded_jpeg(size=(2000, 600)))
+        self.assertFormError(response, 'form', 'image',
+                             'Картинка больше 1 мегапикселей.')
+        self.assertFalse(Post.objects.exists())
+
+    def test_image_within_limits_is_accepted(self):
+        """Картинка в пределах ограничений сохраняется."""
+        self.create_post(uploaded_jpeg())
+        self.assertTrue(Post.objects.exclude(image='').exists())
+
+    @override_settings(POST_IMAGE_MAX_SIDE=500)
+    def test_worker_downscales_large_images(self):
+        """Воркер уменьшает картинку с большей стороной больше предела."""
+        post = Post.objects.create(author=self.user, text='Пост',
+                                   image=uploaded_jpeg())
+        original = post.image.name
+        name = thumbnails.downscale(post.id, original)
+        post.refresh_from_db()
+        self.assertEqual(post.image.name, name)
+        self.assertNotEqual(name, original)
+        with Image.open(post.image) as image:
+            self.assertEqual(image.size, (500, 200))
+        self.assertFalse(ImageBlob.objects.filter(name=original).exists())
+
+    @override_settings(POST_IMAGE_MAX_SIDE=2000)
+    def test_worker_keeps_small_images(self):
+        """Картинка в пределах остаётся как есть."""
+        post = Post.objects.create(author=self.user, text='Пост',
+                                   image=uploaded_jpeg())
+        self.assertEqual(thumbnails.downscale(post.id, post.image.name),
+                         post.image.name)
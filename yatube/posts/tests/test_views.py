@@ -333,15 +333,22 @@ class PostPagesTests(TestCase):
                                       image=uploaded)
         response = self.client.get(reverse('post:index'))
         content_page = response.content
-        post_14.delete()
+        Post.objects.filter(pk=post_14.pk).update(text='Обновлённый текст')
         response_2 = self.client.get(reverse('post:index'))
         content_page_2 = response_2.content
-        self.assertEqual(len(content_page_2), len(content_page))
-        cache.clear()
+        self.assertEqual(content_page_2, content_page)
+        post_14.delete()
         response_3 = self.client.get(reverse('post:index'))
         content_page_3 = response_3.content
         self.assertNotEqual(len(content_page_3), len(content_page))
 
+    def test_cache_depends_on_page(self):
+        """Кеш главной страницы хранится отдельно для каждой страницы."""
+        cache.clear()
+        first = self.client.get(reverse('post:index')).content
+        second = self.client.get(reverse('post:index') + '?page=2').content
+        self.assertNotEqual(first, second)
+
     def test_img_on_different_pages(self):
         """Проверка, что изображение передается в контексте на
         главную страницу, профиль и на страницу группы.
@@ -0,0 +1,132 @@
+"""Reply trees of comments stored as materialized paths.
+
+A comment keeps the path from the root of its thread: the ids of its
+ancestors and its own, each as a fixed-width base36 segment. The string
+order of the paths is the order of the tree, parents before their replies
+and older siblings first, so a whole subtree is the range of paths that
+start with the path of its root and is read with one query over the
+(post, path) index, whatever its size and depth.
+
+A reply to a comment already COMMENT_MAX_DEPTH deep is attached next to
+it instead, to its parent, so the paths stay short however long a
+discussion goes on.
+"""
+from django.conf import settings
+
+from .models import Comment
+
+WIDTH = 7
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+# Sorts after every digit, so path + END bounds a subtree from above.
+END = '~'
+BATCH_SIZE = 500
+
+
+def segment(pk):
+    """Fixed-width base36 segment of a comment id."""
+    digits = ''
+    while pk:
+        pk, digit = divmod(pk, 36)
+        digits = DIGITS[digit] + digits
+    return digits.rjust(WIDTH, '0')
+
+
+def is_path(value):
+    return (bool(value) and len(value) % WIDTH == 0
+            and all(char in DIGITS for char in value))
+
+
+def place(comments, parents):
+    """Sets the path and depth of comments that already have ids.
+
+    parents maps the ids of the comments answered to their path and depth;
+    a parent that is not there makes the comment a root.
+    """
+    for comment in comments:
+        parent = parents.get(comment.parent_id)
+        if parent is None:
+            comment.parent_id, comment.path, comment.depth = None, '', -1
+        else:
+            comment.path, comment.depth = parent
+        if comment.depth >= settings.COMMENT_MAX_DEPTH:
+            # The parent's parent is the segment before the last one.
+            comment.path = comment.path[:-WIDTH]
+            comment.parent_id = int(comment.path[-WIDTH:], 36)
+            comment.depth -= 1
+        comment.path += segment(comment.pk)
+        comment.depth += 1
+
+
+def save_paths(comments):
+    """Places freshly inserted comments in their threads."""
+    parent_ids = {comment.parent_id for comment in comments
+                  if comment.parent_id is not None}
+    parents = {}
+    if parent_ids:
+        parents = {pk: (path, depth) for pk, path, depth in
+                   Comment.objects.filter(pk__in=parent_ids).values_list(
+                       'pk', 'path', 'depth')}
+    place(comments, parents)
+    Comment.objects.bulk_update(comments, ['parent', 'path', 'depth'],
+                                batch_size=BATCH_SIZE)
+
+
+def subtree(comment):
+    """The comment followed by all the replies to it, in tree order."""
+    return Comment.objects.filter(
+        post_id=comment.post_id, path__gte=comment.path,
+        path__lt=comment.path + END,
+    ).order_by('path')
+
+
+def replies_after(post_id, path, limit):
+    """Next replies of a thread after the reply with the path.
+
+    Returns them and the path to continue from, None after the last one.
+    """
+    replies = list(Comment.objects.filter(
+        post_id=post_id, path__gt=path, path__lt=path[:WIDTH] + END,
+    ).for_listing().order_by('path')[:limit + 1])
+    more = replies[limit - 1].path if len(replies) > limit else None
+    return replies[:limit], more
+
+
+def attach_replies(roots, limit):
+    """Gives each root its first replies in tree order.
+
+    The threads of a page sit next to each other in path order, so their
+    replies come from one range query. A window function keeps only the
+    first limit + 1 of every thread, which tells whether there are more.
+    Sets root.thread_replies and root.more_replies, the path of the reply
+    to continue after.
+    """
+    roots = list(roots)
+    for root in roots:
+        root.thread_replies, root.more_replies = [], None
+    if not roots or limit <= 0:
+        return roots
+    paths = sorted(root.path for root in roots)
+    table = Comment._meta.db_table
+    # The replies of every thread of the range, numbered per thread.
+    ranked = (
+        f'SELECT id FROM (SELECT id, ROW_NUMBER() OVER ('
+        f'PARTITION BY substr(path, 1, {WIDTH}) ORDER BY path) AS number '
+        f'FROM {table} '
+        f'WHERE post_id = %s AND path > %s AND path < %s AND depth > 0) '
+        f'WHERE number <= %s'
+    )
+    replies = Comment.objects.extra(
+        where=[f'{table}.id IN ({ranked})'],
+        params=[roots[0].post_id, paths[0], paths[-1] + END, limit + 1],
+    ).for_listing()
+    by_root = {root.path: root for root in roots}
+    for reply in replies.order_by('path'):
+        # Threads of other pages may fall between the roots of this one.
+        root = by_root.get(reply.path[:WIDTH])
+        if root is None:
+            continue
+        if len(root.thread_replies) < limit:
+            root.thread_replies.append(reply)
+        else:
+            root.more_replies = root.thread_replies[-1].path
+    return roots
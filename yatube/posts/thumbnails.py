@@ -0,0 +1,182 @@
+"""Thumbnails of post images generated off the request thread.
+
+Views schedule generation once the post is committed, a small thread pool
+downscales oversized originals and does the resizing along with the srcset
+variants, and templates use the ready thumbnail or fall back to the
+original image, so rendering a page never resizes anything.
+
+At most THUMBNAIL_BACKLOG jobs wait in the pool. Past that a new job is
+dropped at once, so uploads never wait for the pool, and the
+warm_thumbnails command later runs the whole job for every image that has
+no thumbnail.
+"""
+import logging
+import threading
+from concurrent import futures
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+from . import conditional, variants
+from .cache import bump_content_version
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+# Futures of the scheduled jobs, pruned as they finish.
+_backlog = set()
+_backlog_lock = threading.Lock()
+
+
+def executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = futures.ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails')
+        return _executor
+
+
+def _options(source):
+    """Options completed the way ThumbnailBackend.get_thumbnail does it."""
+    backend = default.backend
+    options = dict(settings.POST_THUMBNAIL_OPTIONS)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    return options
+
+
+def thumbnail_file(image):
+    """The thumbnail of ``image``, which may not be generated yet."""
+    source = ImageFile(image)
+    name = default.backend._get_thumbnail_filename(
+        source, settings.POST_THUMBNAIL_GEOMETRY, _options(source))
+    return ImageFile(name, default.storage)
+
+
+def cached(image):
+    """The thumbnail of ``image`` if it is already generated, else None."""
+    return default.kvstore.get(thumbnail_file(image))
+
+
+def prefetch(posts):
+    """Looks the thumbnails of all ``posts`` up in one batch.
+
+    Each post gets a ``prefetched_thumbnail`` attribute, None while its
+    thumbnail is not generated.
+    """
+    files = {post.pk: thumbnail_file(post.image)
+             for post in posts if post.image}
+    found = default.kvstore.get_many(files.values()) if files else {}
+    for post in posts:
+        image_file = files.get(post.pk)
+        post.prefetched_thumbnail = (
+            found.get(image_file.key) if image_file else None)
+
+
+def generate(name):
+    """Creates the thumbnail of the image stored under ``name``."""
+    try:
+        # Thumbnails are keyed by the source storage too, so the file is
+        # opened through the field's storage, as templates do.
+        source = ImageFile(name, Post._meta.get_field('image').storage)
+        get_thumbnail(source, settings.POST_THUMBNAIL_GEOMETRY,
+                      **settings.POST_THUMBNAIL_OPTIONS)
+    except Exception:
+        logger.exception('Thumbnail generation failed for %s', name)
+
+
+def downscale(post_id, name):
+    """Shrinks a stored image whose longer side exceeds POST_IMAGE_MAX_SIDE.
+
+    Returns the name the post image has afterwards.
+    """
+    storage = Post._meta.get_field('image').storage
+    limit = settings.POST_IMAGE_MAX_SIDE
+    with storage.open(name) as source, Image.open(source) as image:
+        if (max(image.size) <= limit
+                or getattr(image, 'is_animated', False)):
+            return name
+        image_format = image.format
+        # JPEGs are decoded right at a reduced scale, never at full size.
+        image.draft(None, (limit, limit))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((limit, limit), Image.LANCZOS)
+        buffer = BytesIO()
+        image.save(buffer, image_format, quality=90)
+    smaller = storage.save(name, ContentFile(buffer.getvalue()))
+    if Post.objects.filter(pk=post_id, image=name).update(image=smaller):
+        storage.release(name)
+        return smaller
+    # The image was replaced meanwhile, the downscaled copy is not needed.
+    storage.release(smaller)
+    return name
+
+
+def process(post_id, name):
+    """Downscales a new post image and makes its thumbnail and variants."""
+    try:
+        name = downscale(post_id, name)
+    except Exception:
+        logger.exception('Downscaling failed for %s', name)
+    generate(name)
+    try:
+        variants.build(post_id, name)
+    except Exception:
+        logger.exception('Image variants failed for %s', name)
+    # Cached listing fragments still point at the original image.
+    bump_content_version()
+    post = Post.objects.filter(pk=post_id).only('author', 'group').first()
+    if post is not None:
+        conditional.touch(conditional.post_scopes(post))
+
+
+def generate_in_worker(post_id, name):
+    try:
+        process(post_id, name)
+    finally:
+        # Pool threads outlive requests, so they close their own connection.
+        connection.close()
+
+
+def schedule(post):
+    """Generates the post thumbnail and variants in the pool after commit."""
+    if post.image:
+        post_id, name = post.pk, post.image.name
+        transaction.on_commit(lambda: _submit(post_id, name))
+
+
+def _submit(post_id, name):
+    with _backlog_lock:
+        _backlog.difference_update(
+            [future for future in _backlog if future.done()])
+        full = len(_backlog) >= settings.THUMBNAIL_BACKLOG
+        if not full:
+            _backlog.add(executor().submit(generate_in_worker, post_id, name))
+    if full:
+        logger.warning('Thumbnail backlog is full, %s is left to '
+                       'warm_thumbnails', name)
+
+
+def drain():
+    """Waits for every scheduled job, for tests to call in tearDown."""
+    with _backlog_lock:
+        pending = [future for future in _backlog if not future.done()]
+        _backlog.clear()
+    futures.wait(pending)
@@ -0,0 +1,122 @@
+"""Materialized follow feed (fan-out on write).
+
+Every new post is copied into the timelines of its author's followers, so
+reading the feed is a range scan over the reader's own entries. Authors
+with more than TIMELINE_FANOUT_LIMIT followers are not fanned out: their
+posts are merged into the feed at read time instead.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+
+from .models import Follow, Post, TimelineEntry, UserStats
+
+BATCH_SIZE = 500
+
+
+def _followers_count(author_id):
+    return UserStats.objects.filter(user_id=author_id).values_list(
+        'followers_count', flat=True).first() or 0
+
+
+def _is_celebrity(author_id):
+    return _followers_count(author_id) > settings.TIMELINE_FANOUT_LIMIT
+
+
+def _insert(entries):
+    TimelineEntry.objects.bulk_create(
+        entries, batch_size=BATCH_SIZE, ignore_conflicts=True)
+
+
+def fan_out(post):
+    """Delivers a new post to the timelines of the author's followers."""
+    fan_out_many([post])
+
+
+def fan_out_many(posts):
+    """Delivers a batch of new posts with one query for all the followers."""
+    author_ids = {post.author_id for post in posts}
+    celebrities = UserStats.objects.filter(
+        user_id__in=author_ids,
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+    ).values_list('user_id', flat=True)
+    followers = defaultdict(list)
+    follows = Follow.objects.filter(
+        author_id__in=author_ids - set(celebrities)
+    ).values_list('author_id', 'user_id')
+    for author_id, user_id in follows.iterator():
+        followers[author_id].append(user_id)
+    _insert(
+        TimelineEntry(user_id=user_id, post_id=post.pk,
+                      pub_date=post.pub_date)
+        for post in posts for user_id in followers[post.author_id]
+    )
+
+
+def backfill(user_id, author_id):
+    """Copies the author's existing posts into the user's timeline."""
+    posts = Post.objects.filter(
+        author_id=author_id).values_list('pk', 'pub_date')
+    _insert(
+        TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+        for pk, pub_date in posts.iterator()
+    )
+
+
+def backfill_followers(author_id):
+    """Copies the author's posts into the timelines of all the followers.
+
+    One INSERT ... SELECT joins the follows with the posts in the database,
+    however many followers there are.
+    """
+    ops = connection.ops
+    entries, follows, posts = (
+        ops.quote_name(model._meta.db_table)
+        for model in (TimelineEntry, Follow, Post))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'{ops.insert_statement(ignore_conflicts=True)} {entries} '
+            f'(user_id, post_id, pub_date) '
+            f'SELECT follow.user_id, post.id, post.pub_date '
+            f'FROM {follows} AS follow JOIN {posts} AS post '
+            f'ON post.author_id = follow.author_id '
+            f'WHERE follow.author_id = %s '
+            f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}',
+            [author_id])
+
+
+def follow(user_id, author_id):
+    """Fills the timeline after the user subscribed to the author."""
+    if not _is_celebrity(author_id):
+        backfill(user_id, author_id)
+
+
+def unfollow(user_id, author_id):
+    """Drops the author's posts from the timeline of a former follower."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id).delete()
+    if _followers_count(author_id) == settings.TIMELINE_FANOUT_LIMIT:
+        # The author has just stopped being merged on read, so the posts
+        # published meanwhile have to be delivered to everyone.
+        backfill_followers(author_id)
+
+
+def feed(user):
+    """Returns the posts of the authors the user follows."""
+    celebrities = list(
+        Follow.objects.filter(
+            user=user,
+            author__stats__followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+        ).values_list('author_id', flat=True)
+    )
+    if not celebrities:
+        # Ties on pub_date come out by post id: it is the last column of
+        # the (user, -pub_date, -post) index the scan follows.
+        return Post.objects.filter(timeline_entries__user=user).order_by(
+            '-timeline_entries__pub_date')
+    delivered = TimelineEntry.objects.filter(user=user).values('post_id')
+    return Post.objects.filter(
+        Q(pk__in=delivered) | Q(author_id__in=celebrities)
+    ).order_by('-pub_date', '-id')
@@ -0,0 +1,45 @@
+"""Upload handlers that hash files while the request body streams in.
+
+The digest is attached to the uploaded file as ``sha256``, so the
+deduplicating storage never has to read the file a second time. Past
+POST_IMAGE_MAX_BYTES the chunks are only counted: the file keeps its real
+size for the form to reject it, but neither memory nor disk grow further.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.files.uploadhandler import (MemoryFileUploadHandler,
+                                             TemporaryFileUploadHandler)
+
+
+class HashingMixin:
+    def new_file(self, *args, **kwargs):
+        self.sha256 = hashlib.sha256()
+        self.received = 0
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        # An inactive memory handler passes the data on untouched, the
+        # handler that takes the file over hashes it instead.
+        if not getattr(self, 'activated', True):
+            return raw_data
+        self.received += len(raw_data)
+        if self.received > settings.POST_IMAGE_MAX_BYTES:
+            return None
+        self.sha256.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        if file is not None:
+            file.sha256 = self.sha256.hexdigest()
+        return file
+
+
+class HashingMemoryFileUploadHandler(HashingMixin, MemoryFileUploadHandler):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(HashingMixin,
+                                        TemporaryFileUploadHandler):
+    pass
@@ -11,9 +11,21 @@ urlpatterns = [
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='update_post'),
     path('posts/<int:post_id>/comment', views.add_comment, name='add_comment'),
+    path('posts/<int:post_id>/comments/', views.post_comments,
+         name='post_comments'),
+    path('posts/<int:post_id>/comments/ingest/', views.ingest_comment,
+         name='ingest_comment'),
+    path('comments/ingested/<uuid:ingest_id>/', views.ingested_comment,
+         name='ingested_comment'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('search/', views.search, name='search'),
+    path('search/json/', views.search_json, name='search_json'),
     path('profile/<str:username>/follow/', views.profile_follow,
          name='profile_follow'),
     path('profile/<str:username>/unfollow/', views.profile_unfollow,
          name="profile_unfollow"),
+    path('profile/<str:username>/follow/json/', views.follow_json,
+         {'following': True}, name='profile_follow_json'),
+    path('profile/<str:username>/unfollow/json/', views.follow_json,
+         {'following': False}, name='profile_unfollow_json'),
 ]
@@ -0,0 +1,86 @@
+"""Responsive variants of post images.
+
+Every image is cropped to the thumbnail aspect ratio, resized to each of
+POST_IMAGE_WIDTHS and encoded in every POST_IMAGE_FORMATS format Pillow can
+write. Files are named after a hash of their bytes, so identical images
+share one file and a changed image never reuses a stale cached URL.
+"""
+import hashlib
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from .models import Post, PostImageVariant
+
+# Format name -> (Pillow encoder, MIME type), in order of preference.
+FORMATS = {
+    'avif': ('AVIF', 'image/avif'),
+    'webp': ('WEBP', 'image/webp'),
+    'jpeg': ('JPEG', 'image/jpeg'),
+}
+
+
+def supported_formats():
+    Image.init()
+    return [name for name in settings.POST_IMAGE_FORMATS
+            if FORMATS[name][0] in Image.SAVE]
+
+
+def widths_for(source_width):
+    """Configured widths not wider than the source, at least the smallest."""
+    widths = sorted(settings.POST_IMAGE_WIDTHS)
+    return [width for width in widths if width <= source_width] or widths[:1]
+
+
+def _aspect_ratio():
+    width, height = settings.POST_THUMBNAIL_GEOMETRY.split('x')
+    return int(height) / int(width)
+
+
+def _store(data, format_name):
+    storage = PostImageVariant._meta.get_field('file').storage
+    digest = hashlib.sha256(data).hexdigest()[:32]
+    name = f'posts/variants/{digest}.{format_name}'
+    if not storage.exists(name):
+        name = storage.save(name, ContentFile(data))
+    return name
+
+
+def _encode(image, format_name):
+    buffer = BytesIO()
+    image.save(buffer, FORMATS[format_name][0],
+               quality=settings.POST_IMAGE_QUALITY)
+    return buffer.getvalue()
+
+
+def build(post_id, name):
+    """Replaces the variants of a post with ones made from image ``name``.
+
+    Animated images get no variants and keep being served as they are, so
+    the variants of a previous image are only deleted for them.
+    """
+    storage = Post._meta.get_field('image').storage
+    ratio = _aspect_ratio()
+    variants = []
+    with storage.open(name) as source, Image.open(source) as image:
+        if not getattr(image, 'is_animated', False):
+            image = ImageOps.exif_transpose(image).convert('RGB')
+            for width in widths_for(image.width):
+                resized = ImageOps.fit(image, (width, round(width * ratio)),
+                                       Image.LANCZOS)
+                for format_name in supported_formats():
+                    variants.append(PostImageVariant(
+                        post_id=post_id, format=format_name, width=width,
+                        file=_store(_encode(resized, format_name),
+                                    format_name),
+                    ))
+    with transaction.atomic():
+        # The image may have been replaced while the variants were built.
+        if not Post.objects.filter(pk=post_id, image=name).exists():
+            return []
+        PostImageVariant.objects.filter(post_id=post_id).delete()
+        PostImageVariant.objects.bulk_create(variants)
+    return variants
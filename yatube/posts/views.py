@@ -1,74 +1,133 @@
+import uuid
+
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+from django.utils.http import urlencode
+from django.views.decorators.http import require_POST
+
+from core.routers import use_replica
 
-from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from . import (conditional, counters, follows, ingest, search as full_text,
+               threads, thumbnails, timeline)
+from .cache import page_cache_context
+from .forms import MAX_ID, CommentForm, PostForm, ReplyForm
+from .models import Comment, Group, Post, User
+from .paginators import CursorPaginator
 
 
 def paginator(posts, request):
-    paginator = Paginator(posts, settings.NUM_POSTS_ON_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    if settings.CURSOR_PAGINATION:
+        paginator = CursorPaginator(posts, settings.NUM_POSTS_ON_PAGE)
+        page_obj = paginator.get_page(after=request.GET.get('after'),
+                                      before=request.GET.get('before'))
+    else:
+        paginator = Paginator(posts, settings.NUM_POSTS_ON_PAGE)
+        page_number = request.GET.get('page')
+        page_obj = paginator.get_page(page_number)
+    # The follow buttons of the page look its authors up together.
+    follows.for_request(request).add_page(page_obj)
     return page_obj
 
 
+@conditional.conditional(conditional.index)
+@use_replica
 def index(request):
     """Function for handling a request to the main page."""
-    posts = Post.objects.all()
+    posts = Post.objects.for_listing()
     page_obj = paginator(posts, request)
     template = 'posts/index.html'
     сontext: dict = {
         'page_obj': page_obj,
+        **page_cache_context(request),
     }
     return render(request, template, сontext)
 
 
+@conditional.conditional(conditional.group_posts)
+@use_replica
 def group_posts(request, slug):
     """Function for processing a request to a group page."""
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    posts = group.posts.for_listing()
     page_obj = paginator(posts, request)
     context: dict = {
         'group': group,
         'page_obj': page_obj,
+        **page_cache_context(request),
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@conditional.conditional(conditional.profile)
+@use_replica
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
+    author = get_object_or_404(User.objects.select_related('stats'),
+                               username=username)
+    posts = author.posts.for_listing()
     page_obj = paginator(posts, request)
-    num_post = posts.count()
-    following = False
-    if request.user.is_authenticated and author.following.filter(
-            user=request.user):
-        following = True
+    num_post = counters.stats_for(author).posts_count
     context = {
         'author': author,
         'page_obj': page_obj,
         'num_post': num_post,
-        'following': following,
+        'following': follows.for_request(request).follows(author.pk),
+        **page_cache_context(request),
     }
     return render(request, 'posts/profile.html', context)
 
 
+@conditional.conditional(conditional.post_detail)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
-    num = post.author.posts.count()
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), id=post_id)
+    num = counters.stats_for(post.author).posts_count
     form = CommentForm()
-    comments = post.comments.filter(post_id=post_id)
+    # The comment answered by the form, ignored when it is not an id.
+    reply = ReplyForm({'parent': request.GET.get('reply')})
     context = {
         'post': post,
         'num': num,
         'form': form,
-        'comments': comments,
+        'reply_to': reply.cleaned_data['parent'] if reply.is_valid() else None,
+        # Comments are shown to logged in users only.
+        'comments': (comments_page(post_id, request)
+                     if request.user.is_authenticated else None),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def comments_page(post_id, request):
+    """Newest threads of a post, continued after the ?after= cursor."""
+    roots = Comment.objects.filter(post_id=post_id, depth=0).for_listing()
+    paginator = CursorPaginator(roots, settings.NUM_COMMENTS_ON_PAGE)
+    page = paginator.get_page(after=request.GET.get('after'))
+    threads.attach_replies(page, settings.COMMENT_THREAD_REPLIES)
+    return page
+
+
+@login_required
+@conditional.conditional(conditional.post_detail)
+def post_comments(request, post_id):
+    """Next threads, or ?replies= next replies of one, as a fragment."""
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    after = request.GET.get('replies', '')
+    if threads.is_path(after):
+        replies, more = threads.replies_after(
+            post_id, after, settings.NUM_COMMENTS_ON_PAGE)
+        context = {'post_id': post_id, 'replies': replies, 'more': more}
+        return render(request, 'posts/includes/replies.html', context)
+    context = {
+        'post_id': post_id,
+        'comments': comments_page(post_id, request),
+    }
+    return render(request, 'posts/includes/comments.html', context)
+
+
 @login_required
 def post_create(request):
     if request.method == "POST":
@@ -78,6 +137,7 @@ def post_create(request):
             post = form.save(commit=False)
             post.author = request.user
             post.save()
+            thumbnails.schedule(post)
             return redirect('post:profile', username=request.user.username)
     else:
         form = PostForm()
@@ -94,6 +154,8 @@ def post_edit(request, post_id):
         return redirect('post:post_detail', post_id=post.id)
     if form.is_valid():
         post.save()
+        if 'image' in form.changed_data:
+            thumbnails.schedule(post)
         return redirect('post:post_detail', post_id=post.id)
     return render(request,
                   'posts/create_post.html', {'form': form, 'is_edit': True})
@@ -107,13 +169,70 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
+        reply = ReplyForm(request.POST)
+        if reply.is_valid() and reply.cleaned_data['parent']:
+            # Only comments of the same post can be answered.
+            comment.parent = post.comments.filter(
+                pk=reply.cleaned_data['parent']).first()
         comment.save()
     return redirect('post:post_detail', post_id=post_id)
 
 
+@require_POST
+@login_required
+def ingest_comment(request, post_id):
+    """Queues a comment for the next batch write and answers 202."""
+    # The write checks the post again, in case it is deleted meanwhile.
+    if post_id > MAX_ID or not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    form = CommentForm(request.POST)
+    reply = ReplyForm(request.POST)
+    if not (form.is_valid() and reply.is_valid()):
+        return JsonResponse({'errors': {**form.errors, **reply.errors}},
+                            status=400,
+                            json_dumps_params={'ensure_ascii': False})
+    comment = form.save(commit=False)
+    comment.author = request.user
+    comment.post_id = post_id
+    comment.ingest_id = uuid.uuid4()
+    comment.parent_id = reply.cleaned_data['parent']
+    ingest.queue().put(comment)
+    status_url = reverse('post:ingested_comment', args=[comment.ingest_id])
+    response = JsonResponse({'id': str(comment.ingest_id),
+                             'status': status_url}, status=202)
+    response['Location'] = status_url
+    return response
+
+
+def ingested_comment(request, ingest_id):
+    """Where a queued comment is, once written.
+
+    Only the worker process that queued the comment knows it is pending,
+    the others answer 404 until it is written.
+    """
+    # Asked first: a comment leaves the queue only once it is committed.
+    pending = ingest.queue().is_pending(ingest_id)
+    comment = Comment.objects.filter(ingest_id=ingest_id).values_list(
+        'pk', 'post_id').first()
+    if comment is None:
+        if not pending:
+            raise Http404
+        return JsonResponse({'id': str(ingest_id), 'status': 'pending'},
+                            status=202)
+    pk, post_id = comment
+    return JsonResponse({
+        'id': str(ingest_id),
+        'status': 'written',
+        'comment': pk,
+        'url': reverse('post:post_detail', args=[post_id])
+        + f'#comment-{pk}',
+    })
+
+
 @login_required
+@use_replica
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user).all()
+    posts = timeline.feed(request.user).for_listing()
     page_obj = paginator(posts, request)
     context = {'page_obj': page_obj}
     return render(request, 'posts/follow.html', context)
@@ -121,18 +240,66 @@ def follow_index(request):
 
 @login_required
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
-    if not Follow.objects.filter(user=request.user, author=author).exists():
-        if author != request.user:
-            Follow.objects.create(user=request.user, author=author)
-            return redirect('post:follow_index')
+    author = get_object_or_404(User.objects.only('pk'), username=username)
+    if follows.follow(request.user, author):
+        return redirect('post:follow_index')
     return redirect('post:profile', username=username)
 
 
 @login_required
 def profile_unfollow(request, username):
-    author = get_object_or_404(User, username=username)
-    if Follow.objects.filter(user=request.user, author=author).exists():
-        Follow.objects.filter(user=request.user, author=author).delete()
+    author = get_object_or_404(User.objects.only('pk'), username=username)
+    if follows.unfollow(request.user, author):
         return redirect('post:follow_index')
     return redirect('post:profile', username=username)
+
+
+@require_POST
+@login_required
+def follow_json(request, username, following):
+    """Follows or unfollows without a redirect, for the follow buttons."""
+    author = get_object_or_404(User.objects.only('pk'), username=username)
+    change = follows.follow if following else follows.unfollow
+    changed = change(request.user, author)
+    return JsonResponse({
+        'author': username,
+        'following': following and author.pk != request.user.pk,
+        'changed': changed,
+    }, json_dumps_params={'ensure_ascii': False})
+
+
+def search_page(request):
+    query = request.GET.get('q', '').strip()
+    results = full_text.backend().search(query)
+    page_obj = Paginator(results, settings.NUM_POSTS_ON_PAGE).get_page(
+        request.GET.get('page'))
+    return query, page_obj
+
+
+def search(request):
+    query, page_obj = search_page(request)
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'page_query': urlencode({'q': query}) + '&',
+    }
+    return render(request, 'posts/search.html', context)
+
+
+def search_json(request):
+    query, page_obj = search_page(request)
+    return JsonResponse({
+        'query': query,
+        'count': page_obj.paginator.count,
+        'page': page_obj.number,
+        'num_pages': page_obj.paginator.num_pages,
+        'results': [{
+            'type': hit.kind,
+            'id': hit.obj.pk,
+            'post_id': hit.post.pk,
+            'author': hit.obj.author.username,
+            'pub_date': hit.obj.pub_date.isoformat(),
+            'snippet': hit.snippet,
+            'url': reverse('post:post_detail', args=[hit.post.pk]),
+        } for hit in page_obj],
+    }, json_dumps_params={'ensure_ascii': False})
@@ -30,16 +30,20 @@ INSTALLED_APPS = [
     'rest_framework.authtoken',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
     'debug_toolbar',
 ]
 
 MIDDLEWARE = [
+    'core.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.edge.EdgeCacheMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.routers.ReplicaStickyMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
@@ -71,8 +75,28 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 60,
     }
 }
+# Listing views read from this alias when it is configured.
+REPLICA_DATABASE = 'replica'
+if os.getenv('REPLICA_DB_NAME'):
+    DATABASES[REPLICA_DATABASE] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('REPLICA_DB_NAME'),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+# After a write the client reads from the primary for this long.
+REPLICA_STICKY_SECONDS = 5
+REPLICA_STICKY_COOKIE = 'primary_reads'
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+}
 
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -112,15 +136,101 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
 STATIC_URL = '/static/'
 NUM_POSTS_ON_PAGE = 10
+# Comments on a post page; the next ones are loaded on demand.
+NUM_COMMENTS_ON_PAGE = 20
+# Replies shown under each thread before a "more replies" link.
+COMMENT_THREAD_REPLIES = 3
+# Replies to deeper comments are attached to the parent of the comment.
+COMMENT_MAX_DEPTH = 8
+# Queued comments are written in one transaction this often, in seconds,
+# or as soon as this many are waiting.
+COMMENT_INGEST_INTERVAL = 0.005
+COMMENT_INGEST_BATCH = 500
+# Failed comments are tried again after a pause, this many times at most.
+COMMENT_INGEST_RETRY_DELAY = 1
+COMMENT_INGEST_ATTEMPTS = 3
+# Keyset pagination by (pub_date, id) with ?after=/?before= tokens.
+CURSOR_PAGINATION = False
+# Authors with more followers are merged into feeds on read.
+TIMELINE_FANOUT_LIMIT = 5000
+# Anonymous pages of these views may be cached by a CDN or reverse proxy.
+EDGE_CACHE_VIEWS = ('post:index', 'post:group_list')
+EDGE_CACHE_SECONDS = 60
+EDGE_STALE_SECONDS = 300
+# Endpoints receiving PURGE with a Surrogate-Key header on content changes.
+EDGE_PURGE_URLS = os.getenv('EDGE_PURGE_URLS', '').split()
+EDGE_PURGE_TIMEOUT = 2
+# Requests slower than this are logged to core.metrics.slow with their SQL.
+METRICS_SLOW_REQUEST_MS = 500
+METRICS_SLOW_SQL_LIMIT = 50
+# Addresses allowed to scrape /metrics/.
+METRICS_ALLOWED_IPS = os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1').split()
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Uploads are hashed while they stream in, for the deduplicating storage.
+FILE_UPLOAD_HANDLERS = [
+    'posts.uploadhandlers.HashingMemoryFileUploadHandler',
+    'posts.uploadhandlers.HashingTemporaryFileUploadHandler',
+]
+# Larger uploads are counted but no longer stored, then rejected by the form.
+POST_IMAGE_MAX_BYTES = 20 * 1024 * 1024
+# Images with more pixels are rejected from their header, before any decode.
+POST_IMAGE_MAX_PIXELS = 40 * 1000 * 1000
+# The image worker downscales stored images with a longer side.
+POST_IMAGE_MAX_SIDE = 2560
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
         'TIMEOUT': 20,
     }
 }
+# A shared cache for all workers, e.g. redis://127.0.0.1:6379/0 or
+# memcached://127.0.0.1:11211. A small local LRU is kept in front of it.
+CACHE_URL = os.getenv('CACHE_URL', '')
+if CACHE_URL.startswith('memcached://'):
+    CACHES['default'] = {
+        'BACKEND': 'core.cache.backends.TieredCache',
+        'LOCATION': CACHE_URL[len('memcached://'):],
+        'OPTIONS': {
+            'SHARED_BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        },
+    }
+elif CACHE_URL:
+    CACHES['default'] = {
+        'BACKEND': 'core.cache.backends.TieredCache',
+        'LOCATION': CACHE_URL,
+        'OPTIONS': {
+            'SHARED_BACKEND': 'core.cache.backends.RedisCache',
+            'POOL_SIZE': int(os.getenv('CACHE_POOL_SIZE', 10)),
+            'SOCKET_TIMEOUT': float(os.getenv('CACHE_SOCKET_TIMEOUT', 1)),
+        },
+    }
+if CACHE_URL:
+    CACHES['default']['TIMEOUT'] = 20
+    CACHES['default']['OPTIONS'].update(
+        LOCAL_MAX_ENTRIES=int(os.getenv('CACHE_LOCAL_MAX_ENTRIES', 1000)),
+        LOCAL_TIMEOUT=float(os.getenv('CACHE_LOCAL_TIMEOUT', 1)),
+    )
+# Post thumbnails are generated by a thread pool after the post is saved.
+POST_THUMBNAIL_GEOMETRY = '960x339'
+POST_THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+THUMBNAIL_WORKERS = 2
+# Jobs waiting in the thumbnail pool; more are left to warm_thumbnails.
+THUMBNAIL_BACKLOG = 100
+THUMBNAIL_KVSTORE = 'posts.kvstore.KVStore'
+# Seconds a thumbnail that is not generated yet is remembered as missing.
+THUMBNAIL_MISS_TIMEOUT = 30
+# srcset variants of post images, formats in order of preference; the ones
+# Pillow cannot encode are skipped.
+POST_IMAGE_WIDTHS = (320, 640, 960)
+POST_IMAGE_FORMATS = ('avif', 'webp', 'jpeg')
+POST_IMAGE_QUALITY = 75
+POST_IMAGE_SIZES = '(max-width: 960px) 100vw, 960px'
+# Full-text search backend by database vendor, others scan with LIKE.
+SEARCH_BACKENDS = {'sqlite': 'posts.search.SQLiteFTSBackend'}
+# Listing fragments are invalidated by the content version, not by age.
+PAGE_CACHE_TIMEOUT = 300
 STATIC_URL = '/static/'
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
@@ -129,5 +239,11 @@ REST_FRAMEWORK = {
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.TokenAuthentication',
-    ]
-} 
\ No newline at end of file
+    ],
+
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.PubDateCursorPagination',
+    'PAGE_SIZE': 20,
+} 
+
+# Items accepted by one request to the bulk write endpoints.
+API_BULK_MAX_ITEMS = 1000